@@ -0,0 +1,213 @@
+"""Sheet数据的分组统计（透视）
+
+按一列或多列的值分组，对其他列计算 sum/avg/count/min/max：
+- 分组键为单元格的字符串值（区分大小写），空单元格的分组键为 None，None 排在最后，其余按字符串排序
+- sum/avg 只统计数字单元格（布尔值、日期、文本不参与），没有数字时结果为 None
+- min/max 依次按数字、日期、文本取分组内存在的第一种类型比较（布尔值不参与），
+  日期结果为 str(datetime) 形式的文本，与入库的单元格值相同
+- count 不指定列时为分组的行数，指定列时为该列非空单元格的个数
+- 分组列和统计列都没有值的行不参与统计
+
+两种存储方式都在用到的列的列式副本（app/columnar.py）上用 NumPy 计算，由 aggregate_vectors 完成；
+值类型的来源不同：按单元格存储取类型化列，行块存储由字符串推断（与排序筛选相同，见 app/sheet_query.py）
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from .columnar import EMPTY_TYPE, TYPE_CODES, ColumnVector, to_datetime
+from .sheet_query import NUMBER, DATE, TEXT
+
+AGGREGATE_FUNCS = ("sum", "avg", "count", "min", "max")
+# 一次最多使用的分组列和统计项数
+MAX_GROUP_COLUMNS = 5
+MAX_AGGREGATES = 20
+# 一次最多返回的分组数
+MAX_GROUPS = 10000
+
+GroupKey = Tuple[Optional[str], ...]
+AggregateValue = Union[int, float, str, None]
+# min/max 比较值类型的优先顺序
+EXTREME_TYPES = (NUMBER, DATE, TEXT)
+
+
+class Aggregate(NamedTuple):
+    """统计项：函数和列号（count 可以不指定列）"""
+    func: str
+    column: Optional[int]
+
+
+def parse_aggregate(text: str) -> Aggregate:
+    """解析 "函数[:列号]"，例如 "sum:3"、"count"；格式错误时抛出 ValueError"""
+    func, sep, column = text.partition(":")
+    if func not in AGGREGATE_FUNCS:
+        raise ValueError(f"统计项格式错误: {text}")
+    if not sep:
+        if func != "count":
+            raise ValueError(f"统计项缺少列号: {text}")
+        return Aggregate(func, None)
+    try:
+        column_index = int(column)
+    except ValueError:
+        raise ValueError(f"统计项格式错误: {text}")
+    if column_index < 0:
+        raise ValueError(f"统计项格式错误: {text}")
+    return Aggregate(func, column_index)
+
+
+def _group_ids(codes: List[np.ndarray], sizes: List[int]) -> Tuple[List[np.ndarray], np.ndarray]:
+    """按各分组列的字典序号分组，返回 (各分组列的分组键序号, 每行所属分组)，分组按键排序
+
+    各列序号按混合进制合并为一个整数；取值范围不大时用 bincount 找出存在的键（线性时间），否则排序去重
+    """
+    radixes = [size + 1 for size in sizes]
+    total = 1
+    for radix in radixes:
+        total *= radix
+    if total >= 2 ** 62:
+        unique, inverse = np.unique(np.stack(codes, axis=1), axis=0, return_inverse=True)
+        return [unique[:, i] for i in range(len(codes))], inverse.reshape(-1)
+
+    combined = np.zeros(len(codes[0]), dtype=np.int64)
+    for column_codes, radix in zip(codes, radixes):
+        combined *= radix
+        combined += column_codes
+    if total <= max(4 * len(combined), 1 << 20):
+        unique = np.flatnonzero(np.bincount(combined, minlength=total))
+        remap = np.zeros(total, dtype=np.int64)
+        remap[unique] = np.arange(len(unique))
+        inverse = remap[combined]
+    else:
+        unique, inverse = np.unique(combined, return_inverse=True)
+
+    keys = []
+    rest = unique
+    for radix in reversed(radixes):
+        keys.append(rest % radix)
+        rest = rest // radix
+    keys.reverse()
+    return keys, inverse
+
+
+class _ColumnResult:
+    """一个统计列在各分组上的结果，按需计算"""
+
+    def __init__(self, vector: ColumnVector, rows: np.ndarray, groups: np.ndarray, group_count: int):
+        self.vector = vector
+        self.rows = rows
+        self.groups = groups
+        self.group_count = group_count
+        self.types = vector.types[rows]
+        self._cache: Dict[Tuple, Any] = {}
+
+    def _typed(self, type_code: int):
+        key = ("typed", type_code)
+        if key not in self._cache:
+            selected = self.types == type_code
+            self._cache[key] = (selected, self.groups[selected])
+        return self._cache[key]
+
+    def counts(self) -> np.ndarray:
+        if "count" not in self._cache:
+            self._cache["count"] = np.bincount(self.groups[self.types != EMPTY_TYPE], minlength=self.group_count)
+        return self._cache["count"]
+
+    def number_counts(self) -> np.ndarray:
+        if "numbers" not in self._cache:
+            _, groups = self._typed(TYPE_CODES[NUMBER])
+            self._cache["numbers"] = np.bincount(groups, minlength=self.group_count)
+        return self._cache["numbers"]
+
+    def sums(self) -> np.ndarray:
+        """只在分组中有数字时使用"""
+        if "sum" not in self._cache:
+            selected, groups = self._typed(TYPE_CODES[NUMBER])
+            values = self.vector.numbers[self.rows][selected]
+            self._cache["sum"] = np.bincount(groups, weights=values, minlength=self.group_count)
+        return self._cache["sum"]
+
+    def _extreme_values(self, func: str) -> List[Tuple[str, np.ndarray, np.ndarray]]:
+        """按 EXTREME_TYPES 顺序，各类型的 (类型, 分组中是否有该类型, 各分组的最小或最大值)"""
+        key = ("extreme", func)
+        if key in self._cache:
+            return self._cache[key]
+        vector = self.vector
+        # 文本按字符串比较，字典按字符串排序，因此比较字典序号即可
+        sources = {NUMBER: vector.numbers, DATE: vector.dates, TEXT: vector.codes}
+        extremes = []
+        for value_type in EXTREME_TYPES:
+            selected, groups = self._typed(TYPE_CODES[value_type])
+            if sources[value_type] is None or len(groups) == 0:
+                continue
+            values = sources[value_type][self.rows][selected]
+            if value_type == NUMBER:
+                sentinel = np.inf if func == "min" else -np.inf
+            else:
+                limits = np.iinfo(values.dtype)
+                sentinel = limits.max if func == "min" else limits.min
+            result = np.full(self.group_count, sentinel, dtype=values.dtype)
+            (np.minimum if func == "min" else np.maximum).at(result, groups, values)
+            present = np.bincount(groups, minlength=self.group_count) > 0
+            extremes.append((value_type, present, result))
+        self._cache[key] = extremes
+        return extremes
+
+    def extreme(self, func: str, group: int) -> AggregateValue:
+        """min/max 的结果：取分组内存在的第一种类型的最小（或最大）值，日期转换为文本"""
+        for value_type, present, values in self._extreme_values(func):
+            if not present[group]:
+                continue
+            if value_type == NUMBER:
+                return float(values[group])
+            if value_type == DATE:
+                return str(to_datetime(values[group]))
+            return self.vector.dictionary[values[group]]
+        return None
+
+
+def aggregate_vectors(
+    group_vectors: List[ColumnVector],
+    measured: Dict[int, ColumnVector],
+    aggregates: List[Aggregate],
+    rows: np.ndarray,
+    limit: int
+) -> List[Tuple[GroupKey, List[AggregateValue]]]:
+    """在列式副本上分组统计，rows 为参与统计的行号（已筛选），返回按分组键排序的前 limit 个 (分组键, 各统计项的值)"""
+    has_value = np.zeros(len(rows), dtype=bool)
+    for vector in group_vectors:
+        has_value |= vector.codes[rows] != vector.empty_code
+    for vector in measured.values():
+        has_value |= vector.types[rows] != EMPTY_TYPE
+    rows = rows[has_value]
+    if len(rows) == 0:
+        return []
+
+    keys, groups = _group_ids(
+        [vector.codes[rows] for vector in group_vectors],
+        [vector.empty_code for vector in group_vectors]
+    )
+    group_count = len(keys[0])
+    row_counts = np.bincount(groups, minlength=group_count)
+    columns = {column: _ColumnResult(vector, rows, groups, group_count) for column, vector in measured.items()}
+
+    results = []
+    for group in range(min(group_count, limit)):
+        key = tuple(vector.text(int(codes[group])) for vector, codes in zip(group_vectors, keys))
+        values: List[AggregateValue] = []
+        for aggregate in aggregates:
+            if aggregate.column is None:
+                values.append(int(row_counts[group]))
+                continue
+            column = columns[aggregate.column]
+            if aggregate.func == "count":
+                values.append(int(column.counts()[group]))
+            elif aggregate.func in ("min", "max"):
+                values.append(column.extreme(aggregate.func, group))
+            elif column.number_counts()[group] == 0:
+                values.append(None)
+            elif aggregate.func == "sum":
+                values.append(float(column.sums()[group]))
+            else:
+                values.append(float(column.sums()[group] / column.number_counts()[group]))
+        results.append((key, values))
+    return results
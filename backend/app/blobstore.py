@@ -0,0 +1,166 @@
+"""原始文件存储：本地文件系统或 S3 兼容对象存储，按内容哈希寻址"""
+import abc
+import os
+import shutil
+import uuid
+from functools import lru_cache
+from typing import BinaryIO, Iterator, Optional
+
+from .config import (
+    BLOB_STORE, BLOB_STORE_PATH,
+    S3_ENDPOINT_URL, S3_BUCKET, S3_ACCESS_KEY, S3_SECRET_KEY, S3_REGION
+)
+
+CHUNK_SIZE = 256 * 1024
+
+
+class BlobStore(abc.ABC):
+    """存储后端接口"""
+
+    @abc.abstractmethod
+    def put_file(self, key: str, path: str) -> None:
+        """保存本地文件（调用后源文件可能被移走）"""
+
+    @abc.abstractmethod
+    def put_bytes(self, key: str, data: bytes) -> None:
+        """保存内存中的数据"""
+
+    @abc.abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """以二进制只读方式打开"""
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        with self.open(key) as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def iter_range(self, key: str, start: int, end: int, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """读取 [start, end] 字节范围（包含 end），定位到起始位置后分块读取"""
+        remaining = end - start + 1
+        with self.open(key) as f:
+            f.seek(start)
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def local_path(self, key: str) -> Optional[str]:
+        """可直接发送的本地文件路径，非本地存储返回 None"""
+        return None
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        """删除对象，不存在时忽略"""
+
+
+class LocalBlobStore(BlobStore):
+    """本地文件系统存储，路径为 root/ab/cd/<key>"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put_file(self, key: str, path: str) -> None:
+        target = self._path(key)
+        if os.path.exists(target):
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # 先写入临时文件再改名，避免读到写了一半的文件
+        tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.replace(path, tmp_path)
+        except OSError:
+            # 跨文件系统时无法直接改名
+            shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, target)
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        target = self._path(key)
+        if os.path.exists(target):
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, target)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self._path(key), "rb")
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+
+    def delete(self, key: str) -> None:
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class S3BlobStore(BlobStore):
+    """S3 兼容对象存储（AWS S3、MinIO 等），需要安装 boto3；client 为已创建的 S3 客户端时直接使用"""
+
+    def __init__(self, bucket: str, endpoint_url: str = None, access_key: str = None,
+                 secret_key: str = None, region: str = None, client=None):
+        self.bucket = bucket
+        if client is not None:
+            self.client = client
+            return
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("使用 S3 存储需要安装 boto3: pip install boto3")
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+            region_name=region or None
+        )
+
+    def put_file(self, key: str, path: str) -> None:
+        self.client.upload_file(path, self.bucket, key)
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+
+    def open(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        body = self.open(key)
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def iter_range(self, key: str, start: int, end: int, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        # 由 S3 按 Range 返回对应部分，不下载整个对象
+        body = self.client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes={start}-{end}")["Body"]
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+@lru_cache(maxsize=1)
+def get_blob_store() -> BlobStore:
+    """按配置创建存储后端"""
+    if BLOB_STORE == "s3":
+        return S3BlobStore(
+            bucket=S3_BUCKET,
+            endpoint_url=S3_ENDPOINT_URL,
+            access_key=S3_ACCESS_KEY,
+            secret_key=S3_SECRET_KEY,
+            region=S3_REGION
+        )
+    return LocalBlobStore(BLOB_STORE_PATH)
@@ -0,0 +1,49 @@
+"""进程内缓存：上传后不再变化的数据（如Sheet元信息）可以一直缓存，按最近使用淘汰"""
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from .config import SHEET_META_CACHE_SIZE, AGGREGATE_CACHE_SIZE, COLUMN_VECTOR_CACHE_SIZE
+
+
+class LRUCache:
+    """线程安全的 LRU 缓存"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+# Sheet元信息（表头、合并单元格、图片、图表、表格区域）和表格区域的表头，
+# 按 sheet_id（区域为 region_id）和列统计生成时间缓存
+sheet_meta_cache = LRUCache(SHEET_META_CACHE_SIZE)
+
+# Sheet对象（合并单元格、图片、图表）的空间索引（app/spatial.py），按 sheet_id 缓存
+sheet_index_cache = LRUCache(SHEET_META_CACHE_SIZE)
+
+# 分组统计结果，按 sheet_id、查询参数和列统计生成时间缓存
+aggregate_cache = LRUCache(AGGREGATE_CACHE_SIZE)
+
+# 解码后的列式副本（app/columnar.py），按 sheet_id、存储方式和列号缓存
+column_vector_cache = LRUCache(COLUMN_VECTOR_CACHE_SIZE)
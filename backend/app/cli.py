@@ -0,0 +1,264 @@
+"""命令行维护工具
+
+用法:
+    python -m app.cli convert-blocks [--sheet-id ID] [--block-size N]
+    python -m app.cli migrate-blobs [--limit N]
+    python -m app.cli make-thumbnails [--limit N]
+    python -m app.cli build-search-index [--sheet-id ID] [--rebuild]
+    python -m app.cli build-column-stats [--sheet-id ID] [--rebuild]
+    python -m app.cli build-column-vectors [--sheet-id ID] [--min-rows N] [--rebuild]
+    python -m app.cli compare-engines FILE [FILE ...]
+"""
+import argparse
+import sys
+
+from .database import SessionLocal
+from .config import ROW_BLOCK_SIZE
+from .blobstore import get_blob_store
+from .parser import parse_xlsx
+from .column_stats import SheetProfiler
+from . import crud, models, thumbnails
+
+
+def convert_blocks(args: argparse.Namespace) -> None:
+    """把 excel_data 中按单元格存储的Sheet转换为行块存储"""
+    db = SessionLocal()
+    try:
+        query = db.query(models.ExcelSheet).filter(models.ExcelSheet.storage_mode == "cells")
+        if args.sheet_id is not None:
+            query = query.filter(models.ExcelSheet.id == args.sheet_id)
+        sheet_ids = [sheet_id for (sheet_id,) in query.with_entities(models.ExcelSheet.id).all()]
+
+        for sheet_id in sheet_ids:
+            db_sheet = crud.get_sheet_by_id(db, sheet_id)
+            count = crud.convert_sheet_to_blocks(db, db_sheet, args.block_size)
+            print(f"Sheet {sheet_id}: 已转换 {count} 个单元格")
+        print(f"完成，共转换 {len(sheet_ids)} 个Sheet")
+    finally:
+        db.close()
+
+
+def migrate_blobs(args: argparse.Namespace) -> None:
+    """把 excel_contents 中的原始文件数据转存到外部存储"""
+    db = SessionLocal()
+    store = get_blob_store()
+    try:
+        query = db.query(models.ExcelContent.id).filter(
+            models.ExcelContent.storage_key.is_(None)
+        ).order_by(models.ExcelContent.id)
+        if args.limit:
+            query = query.limit(args.limit)
+        content_ids = [content_id for (content_id,) in query.all()]
+
+        for content_id in content_ids:
+            # 逐条加载，避免同时持有多个文件的数据
+            db_content = db.query(models.ExcelContent).filter(
+                models.ExcelContent.id == content_id
+            ).one()
+            file_data = db_content.file_data
+            store.put_bytes(db_content.content_hash, file_data)
+            db_content.storage_key = db_content.content_hash
+            db_content.file_size = len(file_data)
+            db_content.file_data = None
+            db.commit()
+            db.expunge_all()
+            print(f"内容 {content_id}: 已转存 {len(file_data)} 字节")
+        print(f"完成，共转存 {len(content_ids)} 个文件")
+    finally:
+        db.close()
+
+
+def make_thumbnails(args: argparse.Namespace) -> None:
+    """为尚未生成缩略图的图片批量生成缩略图"""
+    if not thumbnails.available():
+        sys.exit("生成缩略图需要安装 Pillow: pip install Pillow")
+    db = SessionLocal()
+    try:
+        query = db.query(models.SheetImage.id).filter(
+            models.SheetImage.thumb_format.is_(None)
+        ).order_by(models.SheetImage.id)
+        if args.limit:
+            query = query.limit(args.limit)
+        image_ids = [image_id for (image_id,) in query.all()]
+
+        for image_id in image_ids:
+            # 逐张加载，避免同时持有多张图片的数据
+            db_image = crud.get_sheet_image_by_id(db, image_id)
+            crud.generate_image_thumbnail(db, db_image)
+            db.expunge_all()
+        print(f"完成，共处理 {len(image_ids)} 张图片")
+    finally:
+        db.close()
+
+
+def build_search_index(args: argparse.Namespace) -> None:
+    """为尚未建立搜索索引的Sheet写入搜索词（--rebuild 时重建所有Sheet）"""
+    db = SessionLocal()
+    # 单元格用服务端游标流式读取，占用读取会话的连接，搜索词通过另一个会话写入
+    reader = SessionLocal()
+    try:
+        query = db.query(models.ExcelSheet.id).order_by(models.ExcelSheet.id)
+        if not args.rebuild:
+            query = query.filter(models.ExcelSheet.search_indexed.is_(False))
+        if args.sheet_id is not None:
+            query = query.filter(models.ExcelSheet.id == args.sheet_id)
+        sheet_ids = [sheet_id for (sheet_id,) in query.all()]
+
+        for sheet_id in sheet_ids:
+            db_sheet = crud.get_sheet_by_id(db, sheet_id)
+            user_id = crud.get_sheet_owner_id(db, sheet_id)
+            if user_id is None:
+                # 没有文件引用的内容搜索不到，不建立索引
+                crud.delete_cell_tokens(db, sheet_id)
+                db.commit()
+                continue
+            count = crud.build_sheet_search_index(db, reader, db_sheet, user_id)
+            db.commit()
+            reader.rollback()
+            db.expunge_all()
+            print(f"Sheet {sheet_id}: 已写入 {count} 个搜索词")
+        print(f"完成，共处理 {len(sheet_ids)} 个Sheet")
+    finally:
+        reader.close()
+        db.close()
+
+
+def build_column_stats(args: argparse.Namespace) -> None:
+    """为尚未生成列统计的Sheet统计各列并识别表头（--rebuild 时重建所有Sheet）"""
+    db = SessionLocal()
+    reader = SessionLocal()
+    try:
+        query = db.query(models.ExcelSheet.id).order_by(models.ExcelSheet.id)
+        if not args.rebuild:
+            query = query.filter(models.ExcelSheet.columns_profiled_at.is_(None))
+        if args.sheet_id is not None:
+            query = query.filter(models.ExcelSheet.id == args.sheet_id)
+        sheet_ids = [sheet_id for (sheet_id,) in query.all()]
+
+        for sheet_id in sheet_ids:
+            db_sheet = crud.get_sheet_by_id(db, sheet_id)
+            crud.delete_column_stats(db, sheet_id)
+            # 已入库的值是字符串，按字符串推断类型
+            profiler = SheetProfiler(infer=True)
+            cells = profiler.profile(
+                (record.row_index, record.column_index, record.cell_value)
+                for record in crud.iter_sheet_data(
+                    reader, sheet_id, 0, db_sheet.row_count, db_sheet.storage_mode
+                )
+            )
+            for _ in cells:
+                pass
+            crud.save_column_stats(db, db_sheet, profiler.finish())
+            header_row = db_sheet.header_row
+            db.commit()
+            reader.rollback()
+            db.expunge_all()
+            print(f"Sheet {sheet_id}: 表头行 {header_row if header_row is not None else '无'}")
+        print(f"完成，共处理 {len(sheet_ids)} 个Sheet")
+    finally:
+        reader.close()
+        db.close()
+
+
+def build_column_vectors(args: argparse.Namespace) -> None:
+    """为Sheet预先生成分组统计使用的列式副本，首次统计时不再需要读取整列单元格（--rebuild 时重建已有的副本）"""
+    db = SessionLocal()
+    try:
+        query = db.query(models.ExcelSheet.id).order_by(models.ExcelSheet.id)
+        if args.sheet_id is not None:
+            query = query.filter(models.ExcelSheet.id == args.sheet_id)
+        if args.min_rows:
+            query = query.filter(models.ExcelSheet.row_count >= args.min_rows)
+        sheet_ids = [sheet_id for (sheet_id,) in query.all()]
+
+        for sheet_id in sheet_ids:
+            db_sheet = crud.get_sheet_by_id(db, sheet_id)
+            built = set()
+            if not args.rebuild:
+                built = {column for (column,) in db.query(models.ColumnVector.column_index).filter(
+                    models.ColumnVector.sheet_id == sheet_id
+                ).all()}
+            columns = [column for column in range(db_sheet.column_count) if column not in built]
+            for column in columns:
+                # 逐列生成，内存占用只与单列大小有关
+                crud.save_column_vectors(db, db_sheet, [column])
+            db.expunge_all()
+            print(f"Sheet {sheet_id}: 已生成 {len(columns)} 列")
+        print(f"完成，共处理 {len(sheet_ids)} 个Sheet")
+    finally:
+        db.close()
+
+
+def compare_engines(args: argparse.Namespace) -> None:
+    """用原生引擎和 openpyxl 引擎分别解析 .xlsx 文件并比较结果"""
+    mismatched = 0
+    for file_path in args.files:
+        try:
+            native = parse_xlsx(file_path, engine="native")
+            fallback = parse_xlsx(file_path, engine="openpyxl")
+        except Exception as e:
+            mismatched += 1
+            print(f"{file_path}: 解析失败: {e}")
+            continue
+        diffs = []
+        if len(native) != len(fallback):
+            diffs.append(f"Sheet数不同: {len(native)} != {len(fallback)}")
+        for native_sheet, fallback_sheet in zip(native, fallback):
+            for key, value in fallback_sheet.items():
+                if native_sheet.get(key) != value:
+                    diffs.append(f"Sheet {fallback_sheet['name']}: {key} 不同")
+        if diffs:
+            mismatched += 1
+            print(f"{file_path}: 不一致")
+            for diff in diffs:
+                print(f"    {diff}")
+        else:
+            cell_count = sum(len(sheet["cells"]) for sheet in native)
+            print(f"{file_path}: 一致（{len(native)} 个Sheet，{cell_count} 个单元格）")
+    if mismatched:
+        sys.exit(1)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Excel Manager 维护工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = subparsers.add_parser("convert-blocks", help="将单元格数据转换为行块存储")
+    convert_parser.add_argument("--sheet-id", type=int, default=None, help="只转换指定Sheet")
+    convert_parser.add_argument("--block-size", type=int, default=ROW_BLOCK_SIZE, help="每个行块包含的行数")
+    convert_parser.set_defaults(func=convert_blocks)
+
+    blobs_parser = subparsers.add_parser("migrate-blobs", help="将数据库中的原始文件转存到外部存储")
+    blobs_parser.add_argument("--limit", type=int, default=None, help="最多转存的文件数")
+    blobs_parser.set_defaults(func=migrate_blobs)
+
+    thumbs_parser = subparsers.add_parser("make-thumbnails", help="为已有图片生成缩略图")
+    thumbs_parser.add_argument("--limit", type=int, default=None, help="最多处理的图片数")
+    thumbs_parser.set_defaults(func=make_thumbnails)
+
+    search_parser = subparsers.add_parser("build-search-index", help="为已有Sheet建立全文搜索索引")
+    search_parser.add_argument("--sheet-id", type=int, default=None, help="只处理指定Sheet")
+    search_parser.add_argument("--rebuild", action="store_true", help="重建已建立索引的Sheet")
+    search_parser.set_defaults(func=build_search_index)
+
+    stats_parser = subparsers.add_parser("build-column-stats", help="为已有Sheet生成列统计并识别表头")
+    stats_parser.add_argument("--sheet-id", type=int, default=None, help="只处理指定Sheet")
+    stats_parser.add_argument("--rebuild", action="store_true", help="重建已生成统计的Sheet")
+    stats_parser.set_defaults(func=build_column_stats)
+
+    vectors_parser = subparsers.add_parser("build-column-vectors", help="为已有Sheet预先生成分组统计使用的列式副本")
+    vectors_parser.add_argument("--sheet-id", type=int, default=None, help="只处理指定Sheet")
+    vectors_parser.add_argument("--min-rows", type=int, default=None, help="只处理行数不少于该值的Sheet")
+    vectors_parser.add_argument("--rebuild", action="store_true", help="重建已生成的列式副本")
+    vectors_parser.set_defaults(func=build_column_vectors)
+
+    compare_parser = subparsers.add_parser("compare-engines", help="比较两种 .xlsx 解析引擎的结果")
+    compare_parser.add_argument("files", nargs="+", help=".xlsx 文件路径")
+    compare_parser.set_defaults(func=compare_engines)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
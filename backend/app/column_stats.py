@@ -0,0 +1,353 @@
+"""列统计与表头识别
+
+入库时单元格按 (行, 列) 顺序经过 SheetProfiler，一次遍历得到每列的统计：
+推断类型、空值数、不同值个数（HyperLogLog 估计）、最小/最大值和数值直方图。
+与 TableRegionDetector 一样以空行分隔表格区域，每个区域单独统计，整个Sheet的统计由各区域合并得到
+
+表头识别：区域第一行的值都是文本且互不重复、下面还有数据行时视为表头，不计入统计；
+整个Sheet的表头行取第一个至少有两行的区域的表头
+"""
+import hashlib
+import math
+import random
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .sheet_query import NUMBER, DATE, BOOL, TEXT, typed_value, infer_typed_value
+
+# HyperLogLog 寄存器个数为 2^HLL_PRECISION，标准误差约 1.04/sqrt(2^HLL_PRECISION)（约 3%）
+HLL_PRECISION = 10
+# 不同值不超过该数量时精确计数，超过后转为 HyperLogLog
+HLL_EXACT_LIMIT = 256
+# 每列保留的数值样本数，直方图由样本计算
+SAMPLE_SIZE = 1024
+HISTOGRAM_BINS = 10
+# 某种类型的值占比达到该比例时作为列的推断类型，否则为 mixed
+TYPE_THRESHOLD = 0.9
+# 文本最小/最大值保存的最大长度
+MAX_TEXT_LENGTH = 255
+
+TYPE_NAMES = {NUMBER: "number", DATE: "date", BOOL: "boolean", TEXT: "text"}
+
+_HASH_BITS = 64
+
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class DistinctCounter:
+    """不同值计数：少量值时保存哈希精确计数，超过 HLL_EXACT_LIMIT 后转为 HyperLogLog"""
+
+    def __init__(self):
+        self._exact = set()
+        self._registers: Optional[bytearray] = None
+
+    def _add_hash(self, value_hash: int) -> None:
+        index = value_hash >> (_HASH_BITS - HLL_PRECISION)
+        remaining = (value_hash << HLL_PRECISION) & ((1 << _HASH_BITS) - 1)
+        # 剩余位中前导零的个数 + 1
+        rank = _HASH_BITS - remaining.bit_length() + 1 if remaining else _HASH_BITS - HLL_PRECISION + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def _to_registers(self) -> None:
+        self._registers = bytearray(1 << HLL_PRECISION)
+        for value_hash in self._exact:
+            self._add_hash(value_hash)
+        self._exact = None
+
+    def add(self, text: str) -> None:
+        value_hash = _hash(text)
+        if self._registers is not None:
+            self._add_hash(value_hash)
+            return
+        self._exact.add(value_hash)
+        if len(self._exact) > HLL_EXACT_LIMIT:
+            self._to_registers()
+
+    def merge(self, other: "DistinctCounter") -> None:
+        if self._registers is None and other._registers is None:
+            self._exact |= other._exact
+            if len(self._exact) > HLL_EXACT_LIMIT:
+                self._to_registers()
+            return
+        if self._registers is None:
+            self._to_registers()
+        if other._registers is None:
+            for value_hash in other._exact:
+                self._add_hash(value_hash)
+            return
+        for i, rank in enumerate(other._registers):
+            if rank > self._registers[i]:
+                self._registers[i] = rank
+
+    def count(self) -> int:
+        if self._registers is None:
+            return len(self._exact)
+        m = len(self._registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -rank for rank in self._registers)
+        zeros = self._registers.count(0)
+        # 基数较小时使用线性计数
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        # 转为 HyperLogLog 时已经见过超过 HLL_EXACT_LIMIT 个不同值
+        return max(int(round(estimate)), HLL_EXACT_LIMIT + 1)
+
+
+class ColumnProfile:
+    """一列的统计累加器"""
+
+    def __init__(self, rng: random.Random):
+        self._rng = rng
+        self.count = 0
+        self.type_counts = {NUMBER: 0, DATE: 0, BOOL: 0, TEXT: 0}
+        self.distinct = DistinctCounter()
+        self.min_number = self.max_number = None
+        self.min_date = self.max_date = None
+        self.min_text = self.max_text = None
+        # 数值的蓄水池样本
+        self.sample: List[float] = []
+        self.numbers_seen = 0
+
+    def add(self, value_type: str, number: Optional[float], moment: Optional[datetime], text: str) -> None:
+        self.count += 1
+        self.type_counts[value_type] += 1
+        self.distinct.add(text)
+        if value_type == NUMBER:
+            if self.min_number is None or number < self.min_number:
+                self.min_number = number
+            if self.max_number is None or number > self.max_number:
+                self.max_number = number
+            self.numbers_seen += 1
+            if len(self.sample) < SAMPLE_SIZE:
+                self.sample.append(number)
+            else:
+                slot = self._rng.randrange(self.numbers_seen)
+                if slot < SAMPLE_SIZE:
+                    self.sample[slot] = number
+        elif value_type == DATE:
+            if self.min_date is None or moment < self.min_date:
+                self.min_date = moment
+            if self.max_date is None or moment > self.max_date:
+                self.max_date = moment
+        elif value_type == TEXT:
+            if self.min_text is None or text < self.min_text:
+                self.min_text = text
+            if self.max_text is None or text > self.max_text:
+                self.max_text = text
+
+    def merge(self, other: "ColumnProfile") -> None:
+        self.count += other.count
+        for value_type, count in other.type_counts.items():
+            self.type_counts[value_type] += count
+        self.distinct.merge(other.distinct)
+        self.min_number = _pick(min, self.min_number, other.min_number)
+        self.max_number = _pick(max, self.max_number, other.max_number)
+        self.min_date = _pick(min, self.min_date, other.min_date)
+        self.max_date = _pick(max, self.max_date, other.max_date)
+        self.min_text = _pick(min, self.min_text, other.min_text)
+        self.max_text = _pick(max, self.max_text, other.max_text)
+        self.sample = self._merge_samples(other)
+        self.numbers_seen += other.numbers_seen
+
+    def _merge_samples(self, other: "ColumnProfile") -> List[float]:
+        """合并两个蓄水池样本：都未满时直接合并，否则按各自的数值个数比例抽取"""
+        if len(self.sample) + len(other.sample) <= SAMPLE_SIZE:
+            return self.sample + other.sample
+        total = self.numbers_seen + other.numbers_seen
+        own = min(round(SAMPLE_SIZE * self.numbers_seen / total), len(self.sample))
+        theirs = min(SAMPLE_SIZE - own, len(other.sample))
+        return self._rng.sample(self.sample, own) + self._rng.sample(other.sample, theirs)
+
+    def inferred_type(self) -> str:
+        if self.count == 0:
+            return "empty"
+        value_type, count = max(self.type_counts.items(), key=lambda item: item[1])
+        if count >= self.count * TYPE_THRESHOLD:
+            return TYPE_NAMES[value_type]
+        return "mixed"
+
+    def histogram(self) -> Optional[dict]:
+        """等宽直方图：edges 为 HISTOGRAM_BINS + 1 个边界，counts 按样本比例估计各区间的数值个数"""
+        if not self.sample:
+            return None
+        low, high = self.min_number, self.max_number
+        if low == high:
+            return {"edges": [low, high], "counts": [self.numbers_seen]}
+        width = (high - low) / HISTOGRAM_BINS
+        bins = [0] * HISTOGRAM_BINS
+        for number in self.sample:
+            bins[min(int((number - low) / width), HISTOGRAM_BINS - 1)] += 1
+        scale = self.numbers_seen / len(self.sample)
+        return {
+            "edges": [low + (high - low) * i / HISTOGRAM_BINS for i in range(HISTOGRAM_BINS + 1)],
+            "counts": [int(round(count * scale)) for count in bins]
+        }
+
+    def bounds(self, inferred_type: str) -> Tuple[Optional[str], Optional[str]]:
+        """推断类型对应的最小值和最大值（文本形式）"""
+        if inferred_type == "number":
+            return _format_number(self.min_number), _format_number(self.max_number)
+        if inferred_type == "date":
+            return self.min_date.isoformat(sep=" "), self.max_date.isoformat(sep=" ")
+        if inferred_type == "text":
+            return self.min_text[:MAX_TEXT_LENGTH], self.max_text[:MAX_TEXT_LENGTH]
+        return None, None
+
+
+def _pick(func, left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    return func(left, right)
+
+
+def _format_number(number: float) -> str:
+    return str(int(number)) if number.is_integer() else repr(number)
+
+
+class RegionProfile:
+    """一个表格区域（以空行分隔的连续行）的统计"""
+
+    def __init__(self, start_row: int, rng: random.Random):
+        self._rng = rng
+        self.start_row = start_row
+        self.end_row = start_row
+        self.first_row: Optional[Dict[int, Tuple[Any, str]]] = None
+        self.columns: Dict[int, ColumnProfile] = {}
+        self.data_rows = 0
+        self.header_rows = 0
+        self.headers: Dict[int, str] = {}
+
+    def _add_values(self, values: Dict[int, Tuple[Any, str]]) -> None:
+        for col_idx, ((value_type, number, moment), text) in values.items():
+            profile = self.columns.get(col_idx)
+            if profile is None:
+                profile = self.columns[col_idx] = ColumnProfile(self._rng)
+            profile.add(value_type, number, moment, text)
+        self.data_rows += 1
+
+    def add_row(self, row_idx: int, values: Dict[int, Tuple[Any, str]]) -> None:
+        self.end_row = row_idx
+        # 第一行是否为表头要看完整个区域才能确定，先单独保存
+        if self.first_row is None:
+            self.first_row = values
+        else:
+            self._add_values(values)
+
+    def finish(self) -> None:
+        texts = [text.strip().lower() for (typed, text) in self.first_row.values() if typed[0] == TEXT]
+        is_header = (
+            self.data_rows > 0
+            and len(texts) == len(self.first_row)
+            and len(set(texts)) == len(texts)
+        )
+        if is_header:
+            self.header_rows = 1
+            self.headers = {col_idx: text for col_idx, (_, text) in self.first_row.items()}
+        else:
+            self._add_values(self.first_row)
+
+
+class SheetProfile:
+    """整个Sheet的统计结果"""
+
+    def __init__(self, regions: List[RegionProfile]):
+        self.regions = regions
+        header_region = next((region for region in regions if region.end_row > region.start_row), None)
+        if header_region is None and regions:
+            header_region = regions[0]
+        self.header_row = header_region.start_row if header_region and header_region.header_rows else None
+        self.headers = header_region.headers if header_region else {}
+        self.data_rows = sum(region.data_rows for region in regions)
+        self.columns: Dict[int, ColumnProfile] = {}
+        rng = random.Random(0)
+        for region in regions:
+            for col_idx, profile in region.columns.items():
+                merged = self.columns.get(col_idx)
+                if merged is None:
+                    merged = self.columns[col_idx] = ColumnProfile(rng)
+                merged.merge(profile)
+
+    def region(self, start_row: int) -> Optional[RegionProfile]:
+        """按起始行查找区域（与 TableRegionDetector 检测到的区域一一对应）"""
+        return next((region for region in self.regions if region.start_row == start_row), None)
+
+
+def column_stats(
+    columns: Dict[int, ColumnProfile],
+    headers: Dict[int, str],
+    data_rows: int,
+    start_col: int,
+    end_col: int
+) -> List[dict]:
+    """[start_col, end_col) 各列的统计结果（字段与 column_stats 表一致）"""
+    empty = ColumnProfile(random.Random(0))
+    stats = []
+    for col_idx in range(start_col, end_col):
+        profile = columns.get(col_idx, empty)
+        inferred_type = profile.inferred_type()
+        min_value, max_value = profile.bounds(inferred_type)
+        header = headers.get(col_idx)
+        stats.append({
+            "column_index": col_idx,
+            "header": header[:MAX_TEXT_LENGTH] if header else None,
+            "inferred_type": inferred_type,
+            "non_null_count": profile.count,
+            "null_count": data_rows - profile.count,
+            # 估计值可能超过实际的值个数
+            "distinct_count": min(profile.distinct.count(), profile.count),
+            "min_value": min_value,
+            "max_value": max_value,
+            "histogram": profile.histogram() if inferred_type == "number" else None
+        })
+    return stats
+
+
+class SheetProfiler:
+    """按 (行, 列) 顺序接收单元格并统计
+    infer 为 True 时单元格值是存储的字符串（重建已有Sheet的统计），按字符串推断类型
+    """
+
+    def __init__(self, infer: bool = False):
+        self._infer = infer
+        self._rng = random.Random(0)
+        self._regions: List[RegionProfile] = []
+        self._row_idx: Optional[int] = None
+        self._row_values: Dict[int, Tuple[Any, str]] = {}
+
+    def _flush_row(self) -> None:
+        if not self._row_values:
+            return
+        current = self._regions[-1] if self._regions else None
+        # 与上一个非空行之间有空行，开始新的区域
+        if current is None or self._row_idx > current.end_row + 1:
+            current = RegionProfile(self._row_idx, self._rng)
+            self._regions.append(current)
+        current.add_row(self._row_idx, self._row_values)
+        self._row_values = {}
+
+    def profile(self, cells: Iterable[Tuple[int, int, Any]]) -> Iterator[Tuple[int, int, Any]]:
+        """原样返回单元格，同时累加统计"""
+        for cell in cells:
+            row_idx, col_idx, value = cell
+            if row_idx != self._row_idx:
+                self._flush_row()
+                self._row_idx = row_idx
+            if value is not None:
+                text = str(value)
+                # 空白单元格与区域检测一样视为空值
+                if text.strip():
+                    typed = infer_typed_value(text) if self._infer else typed_value(value)
+                    self._row_values[col_idx] = (typed, text)
+            yield cell
+
+    def finish(self) -> SheetProfile:
+        """结束输入，确定各区域的表头并合并整个Sheet的统计"""
+        self._flush_row()
+        for region in self._regions:
+            region.finish()
+        return SheetProfile(self._regions)
@@ -0,0 +1,218 @@
+"""Sheet列的列式副本，供分组统计使用（app/aggregation.py）
+
+每列按行号展开为长度等于Sheet行数的数组：
+- codes: 单元格字符串在该列字典中的序号。字典按字符串排序，空单元格的序号为 len(dictionary)，
+  因此序号的大小顺序与字符串顺序一致（区分大小写），空值排在最后
+- types: 值类型编码（TYPE_CODES，空单元格为 EMPTY_TYPE）
+- numbers: 数字单元格的值（布尔值为 0/1，按值类型区分），其余为 NaN；该列没有数字和布尔值时为 None
+- dates: 日期单元格距 1970-01-01 的微秒数；该列没有日期时为 None
+
+按单元格存储时值类型取入库时记录的类型化列，行块存储由字符串推断（与排序筛选相同，见 app/sheet_query.py）。
+编码后的列式副本保存在 column_vectors 表中，首次统计该列时生成，服务重启后不需要重新读取单元格。
+筛选条件也在列式副本上判断（filter_mask），规则与 data 接口相同
+"""
+import warnings
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import msgpack
+import numpy as np
+
+from .sheet_query import NUMBER, BOOL, DATE, TEXT, CellFilter, compare_values, filter_operand, infer_typed_value
+
+EMPTY_TYPE = 0
+TYPE_CODES = {NUMBER: 1, BOOL: 2, DATE: 3, TEXT: 4}
+
+# 编码格式版本，格式变化后旧记录按缺失处理并重新生成
+FORMAT_VERSION = 1
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class ColumnVector:
+    """一列的列式副本"""
+    __slots__ = ("codes", "types", "numbers", "dates", "dictionary")
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        types: np.ndarray,
+        numbers: Optional[np.ndarray],
+        dates: Optional[np.ndarray],
+        dictionary: List[str]
+    ):
+        self.codes = codes
+        self.types = types
+        self.numbers = numbers
+        self.dates = dates
+        self.dictionary = dictionary
+
+    @property
+    def empty_code(self) -> int:
+        return len(self.dictionary)
+
+    def text(self, code: int) -> Optional[str]:
+        """序号对应的字符串，空单元格为 None"""
+        return self.dictionary[code] if code < len(self.dictionary) else None
+
+
+def to_datetime(micros: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(micros))
+
+
+def _micros(moment: datetime) -> int:
+    # 带时区的时间按其中的本地时间处理（与 str(datetime) 显示的时间相同）
+    return (moment.replace(tzinfo=None) - _EPOCH) // _MICROSECOND
+
+
+# 值类型字母（ASCII）到类型编码的查找表
+_TYPE_TABLE = np.zeros(256, dtype=np.uint8)
+for _letter, _code in TYPE_CODES.items():
+    _TYPE_TABLE[ord(_letter)] = _code
+
+
+def _parse_dates(texts: List[str]) -> np.ndarray:
+    """日期单元格的字符串（str(datetime) 或 ISO 格式）转换为微秒数"""
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            return np.array(texts, dtype="datetime64[us]").astype(np.int64)
+    except (ValueError, Warning):
+        # NumPy 不支持的 ISO 写法（如带时区）逐个解析
+        return np.array([_micros(datetime.fromisoformat(text)) for text in texts], dtype=np.int64)
+
+
+class ColumnCells:
+    """收集一列的非空单元格：行号、字符串、值类型和数值（数字和布尔值，其余为 None）
+    值类型为 None 的单元格（行块存储、类型化列上线前入库的数据）由字符串推断；日期由字符串解析
+    """
+    __slots__ = ("rows", "texts", "types", "numbers")
+
+    def __init__(self):
+        self.rows: List[int] = []
+        self.texts: List[str] = []
+        self.types: List[Optional[str]] = []
+        self.numbers: List[Optional[float]] = []
+
+    def append(self, row_idx: int, text: str, value_type: Optional[str] = None, number: Optional[float] = None) -> None:
+        self.rows.append(row_idx)
+        self.texts.append(text)
+        self.types.append(value_type)
+        self.numbers.append(number)
+
+    def extend(self, cells: Iterable[Tuple[int, str, Optional[str], Optional[float]]]) -> None:
+        columns = tuple(zip(*cells))
+        if columns:
+            self.rows.extend(columns[0])
+            self.texts.extend(columns[1])
+            self.types.extend(columns[2])
+            self.numbers.extend(columns[3])
+
+    def to_vector(self, row_count: int) -> ColumnVector:
+        texts = self.texts
+        types = self.types
+        numbers = self.numbers
+        if None in types:
+            for i, value_type in enumerate(types):
+                if value_type is None:
+                    types[i], numbers[i], _ = infer_typed_value(texts[i])
+        rows = np.array(self.rows, dtype=np.int64)
+        if len(rows):
+            row_count = max(row_count, int(rows.max()) + 1)
+
+        # 按出现顺序编号，再把字典改为按字符串排序
+        lookup: Dict[str, int] = {}
+        first_codes = np.array([lookup.setdefault(text, len(lookup)) for text in texts], dtype=np.int64)
+        words = list(lookup)
+        order = sorted(range(len(words)), key=words.__getitem__)
+        rank = np.empty(len(words), dtype=np.int32)
+        rank[order] = np.arange(len(words), dtype=np.int32)
+        codes = np.full(row_count, len(words), dtype=np.int32)
+        codes[rows] = rank[first_codes]
+
+        cell_types = _TYPE_TABLE[np.frombuffer("".join(types).encode("ascii"), dtype=np.uint8)]
+        column_types = np.full(row_count, EMPTY_TYPE, dtype=np.uint8)
+        column_types[rows] = cell_types
+        column_numbers = None
+        has_number = (cell_types == TYPE_CODES[NUMBER]) | (cell_types == TYPE_CODES[BOOL])
+        if has_number.any():
+            column_numbers = np.full(row_count, np.nan)
+            column_numbers[rows[has_number]] = np.array(numbers, dtype=np.float64)[has_number]
+        column_dates = None
+        is_date = cell_types == TYPE_CODES[DATE]
+        if is_date.any():
+            column_dates = np.zeros(row_count, dtype=np.int64)
+            column_dates[rows[is_date]] = _parse_dates([texts[i] for i in np.flatnonzero(is_date)])
+        return ColumnVector(codes, column_types, column_numbers, column_dates, [words[i] for i in order])
+
+
+def filter_mask(vector: ColumnVector, cell_filter: CellFilter, rows: np.ndarray) -> np.ndarray:
+    """rows 中各行是否满足条件的正向形式（ne/empty 按 eq/notempty 判断，由调用方取反）
+
+    规则与 sheet_query._positive_match 和按单元格存储时的数据库筛选相同，值类型取列式副本中的类型：
+    数字、布尔值、日期比较值只与同类型的单元格比较，其余条件对列字典中的每个字符串判断一次
+    """
+    types = vector.types[rows]
+    op = cell_filter.op
+    if op in ("empty", "notempty"):
+        return types != EMPTY_TYPE
+    if op == "ne":
+        op = "eq"
+    if op in ("contains", "startswith"):
+        operand = cell_filter.value.lower()
+        if op == "contains":
+            matches = [operand in text.lower() for text in vector.dictionary]
+        else:
+            matches = [text.lower().startswith(operand) for text in vector.dictionary]
+        return _by_code(vector, matches, rows)
+
+    operand_type, operand = filter_operand(cell_filter.value)
+    if operand_type in (NUMBER, BOOL, DATE):
+        values = vector.dates if operand_type == DATE else vector.numbers
+        if values is None:
+            return np.zeros(len(rows), dtype=bool)
+        if operand_type == DATE:
+            operand = _micros(operand)
+        with np.errstate(invalid="ignore"):
+            return (types == TYPE_CODES[operand_type]) & compare_values(op, values[rows], operand)
+    if op == "eq":
+        operand = operand.lower()
+        return _by_code(vector, [text.lower() == operand for text in vector.dictionary], rows)
+    matches = [compare_values(op, text, operand) for text in vector.dictionary]
+    return (types == TYPE_CODES[TEXT]) & _by_code(vector, matches, rows)
+
+
+def _by_code(vector: ColumnVector, matches: List[bool], rows: np.ndarray) -> np.ndarray:
+    """按字典序号把每个字符串的判断结果映射到各行，空单元格不满足"""
+    return np.array(matches + [False], dtype=bool)[vector.codes[rows]]
+
+
+def encode_vector(vector: ColumnVector) -> bytes:
+    payload = {
+        "version": FORMAT_VERSION,
+        "rows": len(vector.codes),
+        "dictionary": vector.dictionary,
+        "codes": vector.codes.tobytes(),
+        "types": vector.types.tobytes(),
+        "numbers": vector.numbers.tobytes() if vector.numbers is not None else None,
+        "dates": vector.dates.tobytes() if vector.dates is not None else None,
+    }
+    return zlib.compress(msgpack.packb(payload, use_bin_type=True), 1)
+
+
+def decode_vector(data: bytes) -> Optional[ColumnVector]:
+    """解码列式副本，编码格式版本不同时返回 None"""
+    payload = msgpack.unpackb(zlib.decompress(data), raw=False)
+    if payload.get("version") != FORMAT_VERSION:
+        return None
+    numbers = payload["numbers"]
+    dates = payload["dates"]
+    return ColumnVector(
+        np.frombuffer(payload["codes"], dtype=np.int32),
+        np.frombuffer(payload["types"], dtype=np.uint8),
+        np.frombuffer(numbers, dtype=np.float64) if numbers is not None else None,
+        np.frombuffer(dates, dtype=np.int64) if dates is not None else None,
+        payload["dictionary"]
+    )
@@ -0,0 +1,263 @@
+"""响应压缩中间件：按 Accept-Encoding 协商 zstd / br / gzip
+
+- 只压缩文本类响应（JSON、NDJSON、MessagePack 等），图片和 Excel 文件本身已经压缩，直接发送
+- 小于 COMPRESSION_MIN_SIZE 的响应不压缩
+- 可压缩类型的响应都带 Vary: Accept-Encoding（包括太小没有压缩和客户端不接受压缩的），缓存按请求的编码分别保存
+- 流式响应逐块压缩并立即刷新，不影响首行到达时间
+- zstd 需要安装 zstandard，br 需要安装 brotli，未安装时不参与协商
+"""
+import threading
+import zlib
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import (
+    COMPRESSION_ENCODINGS, COMPRESSION_MIN_SIZE,
+    GZIP_LEVEL, BROTLI_QUALITY, ZSTD_LEVEL
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 需要压缩的 Content-Type（其余类型直接发送）
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/x-msgpack",
+    "application/javascript",
+    "application/xml",
+)
+
+
+class _GzipCompressor:
+    def __init__(self):
+        self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self):
+        self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class _ZstdCompressor:
+    def __init__(self):
+        self._obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+_COMPRESSORS = {
+    "gzip": _GzipCompressor,
+    "br": _BrotliCompressor if brotli is not None else None,
+    "zstd": _ZstdCompressor if zstandard is not None else None,
+}
+
+
+def available_encodings(names: List[str]) -> List[str]:
+    """按配置顺序返回已安装的编码"""
+    return [name for name in names if _COMPRESSORS.get(name) is not None]
+
+
+def negotiate_encoding(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """选择压缩编码：取 q 值最高的编码，相同时按服务端配置的顺序"""
+    qualities: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        param_name, _, value = params.partition("=")
+        if param_name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[name] = quality
+
+    best, best_quality = None, 0.0
+    for name in encodings:
+        quality = qualities.get(name, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+class CompressionStats:
+    """压缩统计（每个服务进程单独计数）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._encodings: Dict[str, Dict[str, int]] = {}
+            self._skipped = {"small": 0, "type": 0}
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, responses: int = 0) -> None:
+        with self._lock:
+            stats = self._encodings.setdefault(encoding, {"responses": 0, "bytes_in": 0, "bytes_out": 0})
+            stats["responses"] += responses
+            stats["bytes_in"] += bytes_in
+            stats["bytes_out"] += bytes_out
+
+    def skip(self, reason: str) -> None:
+        with self._lock:
+            self._skipped[reason] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            encodings = {}
+            for name, stats in self._encodings.items():
+                saved = stats["bytes_in"] - stats["bytes_out"]
+                encodings[name] = {
+                    **stats,
+                    "bytes_saved": saved,
+                    "ratio": round(stats["bytes_out"] / stats["bytes_in"], 4) if stats["bytes_in"] else None
+                }
+            return {
+                "encodings": encodings,
+                "bytes_saved": sum(e["bytes_saved"] for e in encodings.values()),
+                "skipped": dict(self._skipped)
+            }
+
+
+compression_stats = CompressionStats()
+
+
+class CompressionMiddleware:
+    """按 Accept-Encoding 压缩响应"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE,
+                 encodings: Optional[List[str]] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = available_encodings(encodings if encodings is not None else COMPRESSION_ENCODINGS)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        encoding = negotiate_encoding(accept_encoding, self.encodings)
+        responder = _CompressionResponder(self.app, encoding, self.minimum_size)
+        await responder(scope, receive, send)
+
+
+class _CompressionResponder:
+    """处理单个响应：等到第一块响应体到达后再决定是否压缩；encoding 为 None 时客户端不接受压缩，只添加 Vary"""
+
+    def __init__(self, app: ASGIApp, encoding: Optional[str], minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.start_message: Optional[Message] = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        status = self.start_message["status"]
+        if status < 200 or status in (204, 206, 304):
+            return False
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        content_type = headers.get("content-type", "").lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if not self._compressible(headers):
+                compression_stats.skip("type")
+                self.passthrough = True
+            else:
+                # 是否压缩取决于 Accept-Encoding，不压缩时也要告诉缓存
+                headers.add_vary_header("Accept-Encoding")
+                if self.encoding is None:
+                    self.passthrough = True
+                elif not more_body and len(body) < self.minimum_size:
+                    compression_stats.skip("small")
+                    self.passthrough = True
+            if self.passthrough:
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+
+            self.compressor = _COMPRESSORS[self.encoding]()
+            headers["Content-Encoding"] = self.encoding
+            # 压缩后字节不同，与 nginx 一样把强 ETag 改为弱 ETag（If-None-Match 按弱比较仍然匹配）
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            if more_body:
+                del headers["Content-Length"]
+                data = self.compressor.compress(body) + self.compressor.flush()
+            else:
+                data = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(data))
+            compression_stats.record(self.encoding, len(body), len(data), responses=1)
+            await self.send(self.start_message)
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        # 流式响应的后续数据块：压缩后立即刷新
+        if more_body:
+            data = self.compressor.compress(body) + self.compressor.flush()
+        else:
+            data = self.compressor.compress(body) + self.compressor.finish()
+        compression_stats.record(self.encoding, len(body), len(data))
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
@@ -21,3 +21,45 @@ PASSWORD_MIN_LENGTH = 6
 MAX_PAGE_SIZE = 50000
 DEFAULT_PAGE_SIZE = 50
 MAX_LIST_LIMIT = 100
+SHEET_META_CACHE_SIZE = int(os.getenv("SHEET_META_CACHE_SIZE", "512"))  # 每个服务进程缓存的Sheet元信息数量，0 为不缓存
+AGGREGATE_CACHE_SIZE = int(os.getenv("AGGREGATE_CACHE_SIZE", "256"))  # 每个服务进程缓存的分组统计结果数量，0 为不缓存
+COLUMN_VECTOR_CACHE_SIZE = int(os.getenv("COLUMN_VECTOR_CACHE_SIZE", "32"))  # 每个服务进程缓存的解码后列式副本数量（分组统计使用），0 为不缓存
+
+# 后台解析配置
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))  # 解析进程数
+INGEST_QUEUE_DEPTH = int(os.getenv("INGEST_QUEUE_DEPTH", "20"))  # 每个服务进程允许排队的最大任务数
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", "/tmp/excel_uploads")  # 待解析文件暂存目录
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "5000"))  # 单元格分批插入的批大小
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "1"))  # 单个文件按Sheet并行解析的进程数，1 为顺序解析
+PARSE_PARALLEL_MAX_SHEET_MB = int(os.getenv("PARSE_PARALLEL_MAX_SHEET_MB", "16"))  # 并行解析时，数据超过该大小（未压缩）的Sheet在当前进程中流式解析
+XLSX_ENGINE = os.getenv("XLSX_ENGINE", "native")  # .xlsx 解析引擎: native 直接读取XML; openpyxl 使用 openpyxl 只读模式
+
+# 单元格存储配置
+CELL_STORAGE_MODE = os.getenv("CELL_STORAGE_MODE", "cells")  # cells: 每个单元格一行; blocks: 压缩行块
+ROW_BLOCK_SIZE = int(os.getenv("ROW_BLOCK_SIZE", "1024"))  # 每个行块包含的行数
+
+# 响应压缩配置
+COMPRESSION_ENCODINGS = [
+    name.strip() for name in os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",") if name.strip()
+]  # 可用的压缩编码及优先顺序，留空关闭压缩
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # 小于该字节数的响应不压缩
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))  # 1-9
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))  # 0-11
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))  # 1-22
+
+# 全文搜索配置
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "1") == "1"  # 入库时是否写入单元格搜索索引
+MAX_SEARCH_LIMIT = 100  # 一次搜索最多返回的结果数
+
+# 图片缩略图配置（需要安装 Pillow）
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "256"))  # 缩略图最大边长（像素）
+THUMBNAIL_FORMAT = os.getenv("THUMBNAIL_FORMAT", "webp")  # 缩略图格式: webp 或 png
+
+# 原始文件存储配置
+BLOB_STORE = os.getenv("BLOB_STORE", "local")  # local: 本地文件系统; s3: S3 兼容对象存储
+BLOB_STORE_PATH = os.getenv("BLOB_STORE_PATH", "data/blobs")  # 本地存储根目录
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")  # 例如 MinIO: http://minio:9000
+S3_BUCKET = os.getenv("S3_BUCKET", "excel-manager")
+S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY", "")
+S3_SECRET_KEY = os.getenv("S3_SECRET_KEY", "")
+S3_REGION = os.getenv("S3_REGION", "")
@@ -1,9 +1,21 @@
-from typing import List, Optional, Tuple, Any
+import bisect
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Any
 from datetime import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, aliased
+import numpy as np
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.exc import IntegrityError
 
-from . import models
+from . import models, row_blocks, thumbnails, sheet_query, aggregation, columnar
+from .cache import column_vector_cache
+from .search import QueryTerm, iter_cell_tokens
+from .column_stats import SheetProfile, column_stats
+from .blobstore import get_blob_store
+from .config import INGEST_BATCH_SIZE, ROW_BLOCK_SIZE
+
+# 流式读取时每次从游标取回的记录数（单元格 / 行块）
+STREAM_FETCH_SIZE = 2000
+STREAM_BLOCK_FETCH_SIZE = 8
 
 
 # ===== 用户相关 CRUD =====
@@ -95,23 +107,79 @@ def cleanup_expired_sessions(db: Session) -> int:
     return count
 
 
+def create_excel_content(
+    db: Session,
+    content_hash: str,
+    storage_key: str,
+    file_size: int
+) -> models.ExcelContent:
+    """创建文件内容记录（原始文件已保存到外部存储；只flush获取ID，由调用方统一提交）"""
+    db_content = models.ExcelContent(
+        content_hash=content_hash,
+        storage_key=storage_key,
+        file_size=file_size,
+        ref_count=1
+    )
+    db.add(db_content)
+    db.flush()
+    return db_content
+
+
 def create_excel_file(
     db: Session,
     filename: str,
-    file_data: bytes,
+    content_id: int,
+    content_hash: str,
     file_size: int,
     sheet_count: int,
     user_id: int
 ) -> models.ExcelFile:
-    """创建Excel文件记录"""
+    """创建Excel文件记录（只flush获取ID，由调用方统一提交）"""
     db_file = models.ExcelFile(
         user_id=user_id,
+        content_id=content_id,
         filename=filename,
-        file_data=file_data,
+        content_hash=content_hash,
         file_size=file_size,
         sheet_count=sheet_count
     )
     db.add(db_file)
+    db.flush()
+    return db_file
+
+
+def get_user_file_by_hash(
+    db: Session,
+    user_id: int,
+    content_hash: str
+) -> Optional[models.ExcelFile]:
+    """查找用户已上传的相同内容的文件"""
+    return db.query(models.ExcelFile).filter(
+        models.ExcelFile.user_id == user_id,
+        models.ExcelFile.content_hash == content_hash
+    ).first()
+
+
+def create_file_reference(
+    db: Session,
+    source_file: models.ExcelFile,
+    filename: str,
+    user_id: int
+) -> models.ExcelFile:
+    """创建引用已有内容的文件记录（内容引用计数加一）并提交"""
+    db.query(models.ExcelContent).filter(
+        models.ExcelContent.id == source_file.content_id
+    ).update({models.ExcelContent.ref_count: models.ExcelContent.ref_count + 1},
+             synchronize_session=False)
+    db_file = create_excel_file(
+        db=db,
+        filename=filename,
+        content_id=source_file.content_id,
+        content_hash=source_file.content_hash,
+        file_size=source_file.file_size,
+        sheet_count=source_file.sheet_count,
+        user_id=user_id
+    )
     db.commit()
     db.refresh(db_file)
     return db_file
@@ -119,43 +187,127 @@ def create_excel_file(
 
 def create_excel_sheet(
     db: Session,
-    file_id: int,
+    content_id: int,
     sheet_name: str,
     sheet_index: int,
     row_count: int,
-    column_count: int
+    column_count: int,
+    storage_mode: str = "cells"
 ) -> models.ExcelSheet:
-    """创建Sheet记录"""
+    """创建Sheet记录（只flush获取ID，由调用方统一提交）"""
     db_sheet = models.ExcelSheet(
-        file_id=file_id,
+        content_id=content_id,
         sheet_name=sheet_name,
         sheet_index=sheet_index,
         row_count=row_count,
-        column_count=column_count
+        column_count=column_count,
+        storage_mode=storage_mode
     )
     db.add(db_sheet)
-    db.commit()
-    db.refresh(db_sheet)
+    db.flush()
     return db_sheet
 
 
 def bulk_create_excel_data(
     db: Session,
     sheet_id: int,
-    data: List[Tuple[int, int, Any]]
-) -> None:
-    """批量创建单元格数据"""
-    db_data_list = [
-        models.ExcelData(
-            sheet_id=sheet_id,
-            row_index=row_idx,
-            column_index=col_idx,
-            cell_value=str(value) if value is not None else None
-        )
+    data: Iterable[Tuple[int, int, Any]],
+    batch_size: int = INGEST_BATCH_SIZE
+) -> int:
+    """批量创建单元格数据（Core executemany 分批插入，不提交事务）
+    按值的原生类型同时写入类型化值，返回插入的单元格数
+    """
+    table = models.ExcelData.__table__
+    insert_stmt = table.insert()
+    total = 0
+    batch = []
+    for row_idx, col_idx, value in data:
+        value_type, num_value, date_value = sheet_query.typed_value(value)
+        batch.append({
+            "sheet_id": sheet_id,
+            "row_index": row_idx,
+            "column_index": col_idx,
+            "cell_value": str(value) if value is not None else None,
+            "value_type": value_type,
+            "num_value": num_value,
+            "date_value": date_value
+        })
+        if len(batch) >= batch_size:
+            db.execute(insert_stmt, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        db.execute(insert_stmt, batch)
+        total += len(batch)
+    return total
+
+
+def bulk_create_row_blocks(
+    db: Session,
+    sheet_id: int,
+    data: Iterable[Tuple[int, int, Any]],
+    block_size: int = ROW_BLOCK_SIZE
+) -> int:
+    """按行块编码并批量插入单元格数据（不提交事务）
+    data 需按 (行, 列) 有序，返回写入的单元格数
+    """
+    insert_stmt = models.SheetRowBlock.__table__.insert()
+    cells = (
+        (row_idx, col_idx, str(value) if value is not None else None)
         for row_idx, col_idx, value in data
-    ]
-    db.bulk_save_objects(db_data_list)
+    )
+    total = 0
+    batch = []
+    for start_row, end_row, block_cells in row_blocks.iter_blocks(cells, block_size):
+        batch.append({
+            "sheet_id": sheet_id,
+            "start_row": start_row,
+            "end_row": end_row,
+            "cell_count": len(block_cells),
+            "block_data": row_blocks.encode_block(block_cells, start_row)
+        })
+        total += len(block_cells)
+        # 行块本身已经较大，按较小的批次提交
+        if len(batch) >= 16:
+            db.execute(insert_stmt, batch)
+            batch = []
+    if batch:
+        db.execute(insert_stmt, batch)
+    return total
+
+
+def convert_sheet_to_blocks(
+    db: Session,
+    db_sheet: models.ExcelSheet,
+    block_size: int = ROW_BLOCK_SIZE
+) -> int:
+    """把按单元格存储的Sheet转换为行块存储并提交，返回转换的单元格数"""
+    total = 0
+    # 每次读取若干个完整行块的数据，避免一次性加载整个Sheet
+    window = block_size * 16
+    for window_start in range(0, db_sheet.row_count, window):
+        cells = db.query(
+            models.ExcelData.row_index,
+            models.ExcelData.column_index,
+            models.ExcelData.cell_value
+        ).filter(
+            models.ExcelData.sheet_id == db_sheet.id,
+            models.ExcelData.row_index >= window_start,
+            models.ExcelData.row_index < window_start + window
+        ).order_by(
+            models.ExcelData.row_index,
+            models.ExcelData.column_index
+        ).all()
+        total += bulk_create_row_blocks(db, db_sheet.id, cells, block_size)
+
+    db.query(models.ExcelData).filter(
+        models.ExcelData.sheet_id == db_sheet.id
+    ).delete(synchronize_session=False)
+    # 行块存储的值类型由字符串推断，列式副本需要重新生成
+    delete_column_vectors(db, db_sheet.id)
+    db_sheet.storage_mode = "blocks"
     db.commit()
+    return total
 
 
 def get_files(
@@ -193,43 +345,512 @@ def get_sheet_by_id(db: Session, sheet_id: int) -> Optional[models.ExcelSheet]:
     return db.query(models.ExcelSheet).filter(models.ExcelSheet.id == sheet_id).first()
 
 
-def get_sheet_data(
+def get_file_sheet(
+    db: Session,
+    file_id: int,
+    sheet_id: int,
+    user_id: int
+) -> Optional[models.ExcelSheet]:
+    """获取用户文件中的Sheet，一次查询同时校验文件归属（只读取元数据）"""
+    return db.query(models.ExcelSheet).join(
+        models.ExcelFile, models.ExcelFile.content_id == models.ExcelSheet.content_id
+    ).filter(
+        models.ExcelSheet.id == sheet_id,
+        models.ExcelFile.id == file_id,
+        models.ExcelFile.user_id == user_id
+    ).first()
+
+
+def get_user_sheet(db: Session, sheet_id: int, user_id: int) -> Optional[models.ExcelSheet]:
+    """获取用户任一文件中的Sheet（同一内容的Sheet由引用它的所有文件共享）"""
+    return db.query(models.ExcelSheet).join(
+        models.ExcelFile, models.ExcelFile.content_id == models.ExcelSheet.content_id
+    ).filter(
+        models.ExcelSheet.id == sheet_id,
+        models.ExcelFile.user_id == user_id
+    ).first()
+
+
+def user_file_exists(db: Session, file_id: int, user_id: int) -> bool:
+    """用户是否拥有该文件"""
+    return db.query(models.ExcelFile.id).filter(
+        models.ExcelFile.id == file_id,
+        models.ExcelFile.user_id == user_id
+    ).first() is not None
+
+
+def _cell_query(
     db: Session,
     sheet_id: int,
-    page: int = 1,
-    page_size: int = 50
-) -> Tuple[List[models.ExcelData], int]:
-    """获取Sheet数据（分页）"""
-    # 计算总行数
-    total_rows = db.query(func.max(models.ExcelData.row_index)).filter(
-        models.ExcelData.sheet_id == sheet_id
-    ).scalar() or 0
-
-    # 计算分页的行范围
-    start_row = (page - 1) * page_size
-    end_row = start_row + page_size
-
-    # 查询指定行范围的数据
-    data = db.query(models.ExcelData).filter(
+    start_row: int,
+    end_row: int,
+    start_col: int,
+    end_col: Optional[int]
+):
+    """[start_row, end_row) 行、[start_col, end_col) 列范围内单元格的查询，按 (行, 列) 排序
+    行列范围都在 (sheet_id, row_index, column_index) 复合索引内过滤，只回表读取窗口内的单元格
+    """
+    query = db.query(
+        models.ExcelData.row_index,
+        models.ExcelData.column_index,
+        models.ExcelData.cell_value
+    ).filter(
         models.ExcelData.sheet_id == sheet_id,
         models.ExcelData.row_index >= start_row,
         models.ExcelData.row_index < end_row
-    ).order_by(
+    )
+    if start_col > 0:
+        query = query.filter(models.ExcelData.column_index >= start_col)
+    if end_col is not None:
+        query = query.filter(models.ExcelData.column_index < end_col)
+    return query.order_by(
         models.ExcelData.row_index,
         models.ExcelData.column_index
-    ).all()
+    )
+
 
-    return data, total_rows
+def _block_query(db: Session, sheet_id: int, start_row: int, end_row: int):
+    """与 [start_row, end_row) 行范围重叠的行块"""
+    return db.query(
+        models.SheetRowBlock.start_row,
+        models.SheetRowBlock.block_data
+    ).filter(
+        models.SheetRowBlock.sheet_id == sheet_id,
+        models.SheetRowBlock.start_row < end_row,
+        models.SheetRowBlock.end_row >= start_row
+    ).order_by(models.SheetRowBlock.start_row)
+
+
+def _iter_block_records(
+    block_start: int,
+    block_data: bytes,
+    start_row: int,
+    end_row: int,
+    start_col: int,
+    end_col: Optional[int]
+) -> Iterator[row_blocks.CellRecord]:
+    """解码一个行块，只返回窗口内的单元格"""
+    for record in row_blocks.decode_block(block_data, block_start):
+        if (start_row <= record.row_index < end_row
+                and record.column_index >= start_col
+                and (end_col is None or record.column_index < end_col)):
+            yield record
+
+
+def get_sheet_data(
+    db: Session,
+    sheet_id: int,
+    start_row: int,
+    end_row: int,
+    storage_mode: str = "cells",
+    start_col: int = 0,
+    end_col: Optional[int] = None
+) -> List[Any]:
+    """获取Sheet中 [start_row, end_row) 行、[start_col, end_col) 列范围的数据（end_col 为空表示到最后一列）
+    返回的记录均带有 row_index/column_index/cell_value 属性
+    """
+    if storage_mode == "blocks":
+        # 只解码与该范围重叠的块
+        data = []
+        for block_start, block_data in _block_query(db, sheet_id, start_row, end_row).all():
+            data.extend(_iter_block_records(block_start, block_data, start_row, end_row, start_col, end_col))
+        return data
+
+    # 按复合索引做范围扫描，深分页与首页代价相同
+    return _cell_query(db, sheet_id, start_row, end_row, start_col, end_col).all()
+
+
+def iter_sheet_data(
+    db: Session,
+    sheet_id: int,
+    start_row: int,
+    end_row: int,
+    storage_mode: str = "cells",
+    start_col: int = 0,
+    end_col: Optional[int] = None
+) -> Iterator[Any]:
+    """按 (行, 列) 顺序逐条返回窗口内的数据，范围含义与 get_sheet_data 相同
+    使用服务端游标分批读取，内存占用与范围大小无关；游标占用连接直到遍历结束，调用方应使用单独的会话
+    """
+    if storage_mode == "blocks":
+        blocks = _block_query(db, sheet_id, start_row, end_row).yield_per(STREAM_BLOCK_FETCH_SIZE)
+        for block_start, block_data in blocks:
+            yield from _iter_block_records(block_start, block_data, start_row, end_row, start_col, end_col)
+        return
+
+    yield from _cell_query(db, sheet_id, start_row, end_row, start_col, end_col).yield_per(STREAM_FETCH_SIZE)
+
+
+def _filter_predicate(cell_filter: sheet_query.CellFilter):
+    """单元格满足筛选条件正向形式的 SQL 条件（ne/empty 由调用方取反）"""
+    data = models.ExcelData
+    non_empty = and_(data.cell_value.isnot(None), data.cell_value != "")
+    op = cell_filter.op
+    if op in ("empty", "notempty"):
+        return non_empty
+    if op == "ne":
+        op = "eq"
+    if op == "contains":
+        return data.cell_value.icontains(cell_filter.value, autoescape=True)
+    if op == "startswith":
+        return data.cell_value.istartswith(cell_filter.value, autoescape=True)
+
+    operand_type, operand = sheet_query.filter_operand(cell_filter.value)
+    if operand_type in (sheet_query.NUMBER, sheet_query.BOOL):
+        column, type_condition = data.num_value, data.value_type == operand_type
+    elif operand_type == sheet_query.DATE:
+        column, type_condition = data.date_value, data.value_type == sheet_query.DATE
+    elif op == "eq":
+        return and_(non_empty, func.lower(data.cell_value) == operand.lower())
+    else:
+        column, type_condition = data.cell_value, data.value_type == sheet_query.TEXT
+    comparisons = {
+        "eq": column == operand,
+        "gt": column > operand,
+        "ge": column >= operand,
+        "lt": column < operand,
+        "le": column <= operand
+    }
+    return and_(type_condition, comparisons[op])
+
+
+def _row_subquery(sheet_id: int, column_index: int, condition):
+    """某一列满足条件的单元格所在行号的子查询"""
+    data = models.ExcelData
+    return select(data.row_index).where(
+        data.sheet_id == sheet_id,
+        data.column_index == column_index,
+        condition
+    )
+
+
+def _apply_row_filters(query, sheet_id: int, filters: List[sheet_query.CellFilter]):
+    """每个筛选条件对应一个 (sheet_id, column_index) 上的行号子查询"""
+    data = models.ExcelData
+    for cell_filter in filters:
+        matched_rows = _row_subquery(sheet_id, cell_filter.column, _filter_predicate(cell_filter))
+        if sheet_query.negated(cell_filter):
+            query = query.filter(data.row_index.notin_(matched_rows))
+        else:
+            query = query.filter(data.row_index.in_(matched_rows))
+    return query
+
+
+def _sort_segments(sheet_id: int, sort_column: int, descending: bool) -> List[Tuple[Any, Any]]:
+    """排序列按值类型分段，每段为 (条件, 排序值列)，顺序规则见 app/sheet_query.py"""
+    data = models.ExcelData
+    segments = [
+        (data.value_type.in_((sheet_query.NUMBER, sheet_query.BOOL)), data.num_value),
+        (data.value_type == sheet_query.DATE, data.date_value),
+        (and_(data.value_type == sheet_query.TEXT, data.cell_value != ""), data.cell_value)
+    ]
+    if descending:
+        segments.reverse()
+    return [
+        (and_(data.column_index == sort_column, condition), value.desc() if descending else value)
+        for condition, value in segments
+    ]
+
+
+def _page_segments(segments: List[Tuple[Any, List[Any]]], offset: int, limit: int) -> Tuple[int, List[int]]:
+    """依次排列的各段查询 (查询, 排序) 中取 [offset, offset + limit) 的行号，先计数再只读取页面所在的段"""
+    total = 0
+    rows = []
+    for query, order_by in segments:
+        count = query.count()
+        start = max(offset - total, 0)
+        if count > start and len(rows) < limit:
+            rows.extend(
+                row_idx for row_idx, in
+                query.order_by(*order_by).offset(start).limit(limit - len(rows)).all()
+            )
+        total += count
+    return total, rows
+
+
+def query_sheet_rows(
+    db: Session,
+    sheet_id: int,
+    start_row: int,
+    end_row: int,
+    filters: List[sheet_query.CellFilter],
+    sort_column: Optional[int] = None,
+    descending: bool = False,
+    offset: int = 0,
+    limit: int = 100,
+    storage_mode: str = "cells"
+) -> Tuple[int, List[int]]:
+    """筛选并排序 [start_row, end_row) 范围内有数据的行，返回 (匹配的行数, 第 offset 起的 limit 个行号)
+    按单元格存储时在数据库中完成，行块存储时解码范围内的行块在 Python 中处理
+    """
+    if storage_mode == "blocks":
+        wanted = {f.column for f in filters}
+        if sort_column is not None:
+            wanted.add(sort_column)
+        rows = {}
+        for record in iter_sheet_data(db, sheet_id, start_row, end_row, storage_mode):
+            values = rows.setdefault(record.row_index, {})
+            if record.column_index in wanted:
+                values[record.column_index] = record.cell_value
+        ordered = sheet_query.sort_filter_rows(rows.items(), filters, sort_column, descending)
+        return len(ordered), ordered[offset:offset + limit]
+
+    data = models.ExcelData
+    in_range = db.query(data.row_index).filter(
+        data.sheet_id == sheet_id,
+        data.row_index >= start_row,
+        data.row_index < end_row
+    )
+    in_range = _apply_row_filters(in_range, sheet_id, filters)
+    if sort_column is None:
+        return _page_segments([(in_range.distinct(), [data.row_index])], offset, limit)
+
+    segments = [
+        (in_range.filter(condition), [value, data.row_index])
+        for condition, value in _sort_segments(sheet_id, sort_column, descending)
+    ]
+    # 排序列没有值的行排在最后
+    has_value = _row_subquery(sheet_id, sort_column, and_(data.cell_value.isnot(None), data.cell_value != ""))
+    missing = in_range.filter(data.row_index.notin_(has_value)).distinct()
+    segments.append((missing, [data.row_index]))
+    return _page_segments(segments, offset, limit)
+
+
+def get_rows_data(
+    db: Session,
+    sheet_id: int,
+    rows: List[int],
+    start_col: int = 0,
+    end_col: Optional[int] = None,
+    storage_mode: str = "cells"
+) -> List[Any]:
+    """读取指定行在 [start_col, end_col) 列范围内的数据，按 (行, 列) 排序"""
+    if not rows:
+        return []
+    wanted = set(rows)
+    if storage_mode == "blocks":
+        # 先按行号找出包含这些行的行块，只读取和解码这些块
+        spans = db.query(
+            models.SheetRowBlock.id,
+            models.SheetRowBlock.start_row,
+            models.SheetRowBlock.end_row
+        ).filter(
+            models.SheetRowBlock.sheet_id == sheet_id,
+            models.SheetRowBlock.start_row <= max(wanted),
+            models.SheetRowBlock.end_row >= min(wanted)
+        ).all()
+        ordered_rows = sorted(wanted)
+        block_ids = []
+        for block_id, block_start, block_end in spans:
+            # 块内第一个不小于起始行的目标行仍在块内，说明该块包含目标行
+            i = bisect.bisect_left(ordered_rows, block_start)
+            if i < len(ordered_rows) and ordered_rows[i] <= block_end:
+                block_ids.append(block_id)
+        if not block_ids:
+            return []
+        blocks = db.query(
+            models.SheetRowBlock.start_row,
+            models.SheetRowBlock.block_data
+        ).filter(models.SheetRowBlock.id.in_(block_ids)).order_by(models.SheetRowBlock.start_row).all()
+        return [
+            record
+            for block_start, block_data in blocks
+            for record in row_blocks.decode_block(block_data, block_start)
+            if record.row_index in wanted
+            and record.column_index >= start_col
+            and (end_col is None or record.column_index < end_col)
+        ]
+
+    query = db.query(
+        models.ExcelData.row_index,
+        models.ExcelData.column_index,
+        models.ExcelData.cell_value
+    ).filter(
+        models.ExcelData.sheet_id == sheet_id,
+        models.ExcelData.row_index.in_(wanted)
+    )
+    if start_col > 0:
+        query = query.filter(models.ExcelData.column_index >= start_col)
+    if end_col is not None:
+        query = query.filter(models.ExcelData.column_index < end_col)
+    return query.order_by(models.ExcelData.row_index, models.ExcelData.column_index).all()
+
+
+def aggregate_sheet_rows(
+    db: Session,
+    db_sheet: models.ExcelSheet,
+    start_row: int,
+    end_row: int,
+    group_by: List[int],
+    aggregates: List[aggregation.Aggregate],
+    filters: List[sheet_query.CellFilter],
+    limit: int
+) -> List[Tuple[aggregation.GroupKey, List[aggregation.AggregateValue]]]:
+    """对 [start_row, end_row) 范围内满足筛选条件的行分组统计，返回按分组键排序的前 limit 个 (分组键, 各统计项的值)
+    筛选和统计都在用到的列的列式副本上计算（两种存储方式相同），筛选规则与 data 接口相同。统计规则见 app/aggregation.py
+    """
+    measured = sorted({a.column for a in aggregates if a.column is not None})
+    columns = set(group_by) | set(measured) | {f.column for f in filters}
+    vectors = get_column_vectors(db, db_sheet, sorted(columns))
+    rows = np.arange(start_row, max(min(end_row, db_sheet.row_count), start_row), dtype=np.int64)
+    keep = np.ones(len(rows), dtype=bool)
+    for cell_filter in filters:
+        matched = columnar.filter_mask(vectors[cell_filter.column], cell_filter, rows)
+        keep &= ~matched if sheet_query.negated(cell_filter) else matched
+    return aggregation.aggregate_vectors(
+        [vectors[column] for column in group_by],
+        {column: vectors[column] for column in measured},
+        aggregates, rows[keep], limit
+    )
+
+
+def get_column_vectors(
+    db: Session,
+    db_sheet: models.ExcelSheet,
+    columns: List[int]
+) -> Dict[int, columnar.ColumnVector]:
+    """读取各列的列式副本：依次查找进程内缓存和 column_vectors 表，都没有时从单元格生成并保存"""
+    vectors = {}
+    for column in columns:
+        vector = column_vector_cache.get((db_sheet.id, db_sheet.storage_mode, column))
+        if vector is not None:
+            vectors[column] = vector
+    missing = [column for column in columns if column not in vectors]
+    if missing:
+        stored = db.query(models.ColumnVector.column_index, models.ColumnVector.vector_data).filter(
+            models.ColumnVector.sheet_id == db_sheet.id,
+            models.ColumnVector.column_index.in_(missing)
+        ).all()
+        for column, vector_data in stored:
+            vector = columnar.decode_vector(vector_data)
+            if vector is not None:
+                vectors[column] = vector
+        missing = [column for column in columns if column not in vectors]
+    if missing:
+        vectors.update(save_column_vectors(db, db_sheet, missing))
+    for column, vector in vectors.items():
+        column_vector_cache.put((db_sheet.id, db_sheet.storage_mode, column), vector)
+    return vectors
+
+
+def save_column_vectors(
+    db: Session,
+    db_sheet: models.ExcelSheet,
+    columns: List[int]
+) -> Dict[int, columnar.ColumnVector]:
+    """从单元格生成各列的列式副本并保存（替换已有的记录，包括编码格式过期的记录），提交事务"""
+    built = _build_column_vectors(db, db_sheet, columns)
+    db.query(models.ColumnVector).filter(
+        models.ColumnVector.sheet_id == db_sheet.id,
+        models.ColumnVector.column_index.in_(columns)
+    ).delete(synchronize_session=False)
+    db.add_all([
+        models.ColumnVector(sheet_id=db_sheet.id, column_index=column, vector_data=columnar.encode_vector(vector))
+        for column, vector in built.items()
+    ])
+    try:
+        db.commit()
+    except IntegrityError:
+        # 其他请求同时生成了同一列，使用本次生成的结果即可
+        db.rollback()
+    return built
+
+
+def delete_column_vectors(db: Session, sheet_id: int) -> None:
+    """删除Sheet的列式副本（不提交事务）"""
+    db.query(models.ColumnVector).filter(
+        models.ColumnVector.sheet_id == sheet_id
+    ).delete(synchronize_session=False)
+
+
+def _build_column_vectors(
+    db: Session,
+    db_sheet: models.ExcelSheet,
+    columns: List[int]
+) -> Dict[int, columnar.ColumnVector]:
+    """从单元格生成列式副本：按单元格存储逐列读取类型化列，行块存储解码行块后由字符串推断类型"""
+    collected = {column: columnar.ColumnCells() for column in columns}
+    if db_sheet.storage_mode == "blocks":
+        for record in iter_sheet_data(db, db_sheet.id, 0, db_sheet.row_count, "blocks"):
+            cells = collected.get(record.column_index)
+            if cells is not None and record.cell_value:
+                cells.append(record.row_index, record.cell_value)
+    else:
+        data = models.ExcelData
+        for column in columns:
+            # 在连接上执行（不经过 ORM 的结果处理）；不读取 date_value，日期由单元格字符串（str(datetime)）批量解析
+            result = db.connection().execute(
+                select(data.row_index, data.cell_value, data.value_type, data.num_value).where(
+                    data.sheet_id == db_sheet.id,
+                    data.column_index == column,
+                    data.cell_value.isnot(None),
+                    data.cell_value != ""
+                ).execution_options(yield_per=STREAM_FETCH_SIZE)
+            )
+            for partition in result.partitions():
+                collected[column].extend(partition)
+    return {column: cells.to_vector(db_sheet.row_count) for column, cells in collected.items()}
+
+
+def get_sheet_table_region(db: Session, sheet_id: int, region_id: int) -> Optional[models.TableRegion]:
+    """获取Sheet中的一个表格区域"""
+    return db.query(models.TableRegion).filter(
+        models.TableRegion.id == region_id,
+        models.TableRegion.sheet_id == sheet_id
+    ).first()
 
 
 def delete_file(db: Session, file_id: int) -> bool:
-    """删除文件（级联删除Sheet和数据）"""
+    """删除文件，内容不再被引用时级联删除Sheet和数据"""
     db_file = get_file_by_id(db, file_id)
-    if db_file:
-        db.delete(db_file)
+    if not db_file:
+        return False
+
+    content_id = db_file.content_id
+    db.delete(db_file)
+    db.flush()
+    db.query(models.ExcelContent).filter(
+        models.ExcelContent.id == content_id
+    ).update({models.ExcelContent.ref_count: models.ExcelContent.ref_count - 1},
+             synchronize_session=False)
+    ref_count, storage_key = db.query(
+        models.ExcelContent.ref_count,
+        models.ExcelContent.storage_key
+    ).filter(models.ExcelContent.id == content_id).one()
+    if ref_count > 0:
         db.commit()
         return True
-    return False
+
+    db.query(models.ExcelContent).filter(
+        models.ExcelContent.id == content_id
+    ).delete(synchronize_session=False)
+    # 外部存储按内容哈希寻址，其他内容记录仍引用同一对象时保留。
+    # 解析任务在事务开始时插入内容记录、提交前才转存原始文件，这里在提交前加锁检查并删除对象：
+    # 相同内容的任务未提交时等待其提交后再检查（看到引用则保留）；先加锁时任务的插入等待本事务结束，之后重新转存
+    if storage_key and not is_storage_key_used(db, storage_key, lock=True):
+        get_blob_store().delete(storage_key)
+    db.commit()
+    return True
+
+
+def is_storage_key_used(db: Session, storage_key: str, lock: bool = False) -> bool:
+    """外部存储对象是否仍被内容记录引用；lock 为 True 时对引用该对象的内容记录（及索引间隙）加锁直到事务结束"""
+    query = db.query(models.ExcelContent.id).filter(
+        models.ExcelContent.storage_key == storage_key
+    )
+    if lock:
+        query = query.with_for_update()
+    return query.first() is not None
+
+
+def user_has_sheet(db: Session, sheet_id: int, user_id: int) -> bool:
+    """用户是否拥有包含该Sheet的文件（只查询ID，不加载任何记录）"""
+    return db.query(models.ExcelSheet.id).join(
+        models.ExcelFile, models.ExcelFile.content_id == models.ExcelSheet.content_id
+    ).filter(
+        models.ExcelSheet.id == sheet_id,
+        models.ExcelFile.user_id == user_id
+    ).first() is not None
 
 
 def bulk_create_merged_cells(
@@ -237,77 +858,84 @@ def bulk_create_merged_cells(
     sheet_id: int,
     merged_cells: List[Tuple[int, int, int, int]]
 ) -> None:
-    """批量创建合并单元格记录"""
+    """批量创建合并单元格记录（不提交事务）"""
     if not merged_cells:
         return
-    db_merged_list = [
-        models.MergedCell(
-            sheet_id=sheet_id,
-            start_row=start_row,
-            start_col=start_col,
-            end_row=end_row,
-            end_col=end_col
-        )
+    db.execute(models.MergedCell.__table__.insert(), [
+        {
+            "sheet_id": sheet_id,
+            "start_row": start_row,
+            "start_col": start_col,
+            "end_row": end_row,
+            "end_col": end_col
+        }
         for start_row, start_col, end_row, end_col in merged_cells
-    ]
-    db.bulk_save_objects(db_merged_list)
-    db.commit()
+    ])
 
 
-def create_sheet_image(
+def bulk_create_sheet_images(
     db: Session,
     sheet_id: int,
-    image_data: bytes,
-    image_format: str,
-    anchor_row: int,
-    anchor_col: int,
-    width: int = None,
-    height: int = None,
-    anchor_type: str = "oneCellAnchor"
-) -> models.SheetImage:
-    """创建图片记录"""
-    db_image = models.SheetImage(
-        sheet_id=sheet_id,
-        image_data=image_data,
-        image_format=image_format,
-        anchor_type=anchor_type,
-        anchor_row=anchor_row,
-        anchor_col=anchor_col,
-        width=width,
-        height=height
+    images: List[dict]
+) -> None:
+    """批量创建图片记录（不提交事务）
+    images: 解析结果中的图片信息(data/format/anchor_row/anchor_col/width/height，可选 thumb_data/thumb_format)
+    """
+    if not images:
+        return
+    db.execute(models.SheetImage.__table__.insert(), [
+        {
+            "sheet_id": sheet_id,
+            "image_data": img["data"],
+            "image_format": img["format"],
+            "anchor_type": img.get("anchor_type", "oneCellAnchor"),
+            "anchor_row": img["anchor_row"],
+            "anchor_col": img["anchor_col"],
+            "width": img.get("width"),
+            "height": img.get("height"),
+            "thumb_data": img.get("thumb_data"),
+            "thumb_format": img.get("thumb_format")
+        }
+        for img in images
+    ])
+
+
+def generate_image_thumbnail(db: Session, db_image: models.SheetImage) -> None:
+    """为尚未生成缩略图的图片生成并保存缩略图（提交事务）
+    不需要缩略图时只记录格式，之后直接使用原图
+    """
+    thumb = thumbnails.make_thumbnail(db_image.image_data)
+    thumb_data, thumb_format = thumb if thumb else (None, db_image.image_format)
+    db.query(models.SheetImage).filter(models.SheetImage.id == db_image.id).update(
+        {"thumb_data": thumb_data, "thumb_format": thumb_format},
+        synchronize_session=False
     )
-    db.add(db_image)
     db.commit()
-    db.refresh(db_image)
-    return db_image
 
 
-def create_sheet_chart(
+def bulk_create_sheet_charts(
     db: Session,
     sheet_id: int,
-    chart_type: str,
-    anchor_row: int,
-    anchor_col: int,
-    chart_title: str = None,
-    chart_data: dict = None,
-    width: int = None,
-    height: int = None
-) -> models.SheetChart:
-    """创建图表记录"""
-    db_chart = models.SheetChart(
-        sheet_id=sheet_id,
-        chart_type=chart_type,
-        chart_title=chart_title,
-        chart_data=chart_data,
-        anchor_row=anchor_row,
-        anchor_col=anchor_col,
-        width=width,
-        height=height
-    )
-    db.add(db_chart)
-    db.commit()
-    db.refresh(db_chart)
-    return db_chart
+    charts: List[dict]
+) -> None:
+    """批量创建图表记录（不提交事务）
+    charts: 解析结果中的图表信息(type/title/data/anchor_row/anchor_col/width/height)
+    """
+    if not charts:
+        return
+    db.execute(models.SheetChart.__table__.insert(), [
+        {
+            "sheet_id": sheet_id,
+            "chart_type": chart["type"],
+            "chart_title": chart.get("title"),
+            "chart_data": chart.get("data"),
+            "anchor_row": chart["anchor_row"],
+            "anchor_col": chart["anchor_col"],
+            "width": chart.get("width"),
+            "height": chart.get("height")
+        }
+        for chart in charts
+    ])
 
 
 def bulk_create_table_regions(
@@ -315,26 +943,24 @@ def bulk_create_table_regions(
     sheet_id: int,
     regions: List[Tuple[int, int, int, int, int, int, str]]
 ) -> None:
-    """批量创建表格区域记录
+    """批量创建表格区域记录（不提交事务）
     regions: List of (region_index, start_row, start_col, end_row, end_col, header_rows, table_name)
     """
     if not regions:
         return
-    db_regions = [
-        models.TableRegion(
-            sheet_id=sheet_id,
-            region_index=region_index,
-            start_row=start_row,
-            start_col=start_col,
-            end_row=end_row,
-            end_col=end_col,
-            header_rows=header_rows,
-            table_name=table_name
-        )
+    db.execute(models.TableRegion.__table__.insert(), [
+        {
+            "sheet_id": sheet_id,
+            "region_index": region_index,
+            "start_row": start_row,
+            "start_col": start_col,
+            "end_row": end_row,
+            "end_col": end_col,
+            "header_rows": header_rows,
+            "table_name": table_name
+        }
         for region_index, start_row, start_col, end_row, end_col, header_rows, table_name in regions
-    ]
-    db.bulk_save_objects(db_regions)
-    db.commit()
+    ])
 
 
 def get_sheet_merged_cells(db: Session, sheet_id: int) -> List[models.MergedCell]:
@@ -351,8 +977,41 @@ def get_sheet_images(db: Session, sheet_id: int) -> List[models.SheetImage]:
     ).all()
 
 
+def _blob_length(db: Session, column, row_id: int) -> int:
+    """二进制列的字节数，由数据库计算，不读取数据"""
+    model = column.class_
+    return db.query(func.length(column)).filter(model.id == row_id).scalar() or 0
+
+
+def _read_blob_range(db: Session, column, row_id: int, start: int, length: int) -> bytes:
+    """读取二进制列中从 start 开始的 length 个字节，由数据库截取（SUBSTRING 从 1 开始计数）"""
+    model = column.class_
+    data = db.query(func.substring(column, start + 1, length)).filter(model.id == row_id).scalar()
+    return bytes(data or b"")
+
+
+def get_image_data_length(db: Session, image_id: int) -> int:
+    """图片数据的字节数"""
+    return _blob_length(db, models.SheetImage.image_data, image_id)
+
+
+def read_image_data_range(db: Session, image_id: int, start: int, length: int) -> bytes:
+    """读取图片数据的一段"""
+    return _read_blob_range(db, models.SheetImage.image_data, image_id, start, length)
+
+
+def get_content_data_length(db: Session, content_id: int) -> int:
+    """保存在数据库中的原始文件（未迁移到外部存储的旧数据）的字节数"""
+    return _blob_length(db, models.ExcelContent.file_data, content_id)
+
+
+def read_content_data_range(db: Session, content_id: int, start: int, length: int) -> bytes:
+    """读取保存在数据库中的原始文件的一段"""
+    return _read_blob_range(db, models.ExcelContent.file_data, content_id, start, length)
+
+
 def get_sheet_image_by_id(db: Session, image_id: int) -> Optional[models.SheetImage]:
-    """根据ID获取图片"""
+    """根据ID获取图片（图片数据延迟加载，访问 image_data 时才读取）"""
     return db.query(models.SheetImage).filter(models.SheetImage.id == image_id).first()
 
 
@@ -368,3 +1027,263 @@ def get_sheet_table_regions(db: Session, sheet_id: int) -> List[models.TableRegi
     return db.query(models.TableRegion).filter(
         models.TableRegion.sheet_id == sheet_id
     ).order_by(models.TableRegion.region_index).all()
+
+
+# ===== 搜索相关 CRUD =====
+
+def bulk_create_cell_tokens(
+    db: Session,
+    user_id: int,
+    sheet_id: int,
+    tokens: Iterable[Tuple[str, int, int]],
+    batch_size: int = INGEST_BATCH_SIZE
+) -> int:
+    """批量写入 (搜索词, 行, 列)（不提交事务），返回写入的条数；user_id 为文件所属用户"""
+    insert_stmt = models.CellToken.__table__.insert()
+    total = 0
+    batch = []
+    for token, row_idx, col_idx in tokens:
+        batch.append({
+            "user_id": user_id, "sheet_id": sheet_id, "token": token, "row_index": row_idx, "column_index": col_idx
+        })
+        if len(batch) >= batch_size:
+            db.execute(insert_stmt, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        db.execute(insert_stmt, batch)
+        total += len(batch)
+    return total
+
+
+def build_sheet_search_index(db: Session, reader: Session, db_sheet: models.ExcelSheet, user_id: int) -> int:
+    """重新写入Sheet的搜索词（不提交事务），返回写入的搜索词数
+    单元格用服务端游标流式读取，占用 reader 会话的连接，搜索词通过 db 会话写入
+    """
+    delete_cell_tokens(db, db_sheet.id)
+    cells = (
+        (record.row_index, record.column_index, record.cell_value)
+        for record in iter_sheet_data(reader, db_sheet.id, 0, db_sheet.row_count, db_sheet.storage_mode)
+    )
+    count = bulk_create_cell_tokens(db, user_id, db_sheet.id, iter_cell_tokens(cells))
+    db_sheet.search_indexed = True
+    return count
+
+
+def delete_cell_tokens(db: Session, sheet_id: int) -> None:
+    """删除Sheet的搜索词（不提交事务）"""
+    db.query(models.CellToken).filter(
+        models.CellToken.sheet_id == sheet_id
+    ).delete(synchronize_session=False)
+
+
+def get_sheet_owner_id(db: Session, sheet_id: int) -> Optional[int]:
+    """Sheet所属用户（文件内容只在同一用户的文件间共享），没有文件引用时为 None"""
+    row = db.query(models.ExcelFile.user_id).join(
+        models.ExcelSheet, models.ExcelSheet.content_id == models.ExcelFile.content_id
+    ).filter(models.ExcelSheet.id == sheet_id).first()
+    return row.user_id if row else None
+
+
+def _token_filter(token_table, term: QueryTerm):
+    # 搜索词只包含字母、数字和文字，不含 LIKE 通配符，无需转义
+    if term.prefix:
+        return token_table.token.like(term.token + "%")
+    return token_table.token == term.token
+
+
+def search_cells(
+    db: Session,
+    user_id: int,
+    terms: List[QueryTerm],
+    file_id: Optional[int] = None,
+    limit: int = 50,
+    after: Optional[Tuple[int, int, int, int]] = None
+) -> List[Any]:
+    """在用户的文件中查找匹配全部词项的候选单元格，按 (文件倒序, Sheet, 行, 列) 顺序取 limit 个
+    after 为上一批最后一个候选的 (file_id, sheet_id, row_index, column_index)，只取排在它之后的候选（键集分页）
+    第一个词项从 (user_id, token, sheet_id, row_index, column_index) 索引取候选，
+    其余词项各自用同一索引检查同一单元格上是否存在（EXISTS），都只在当前用户的数据中查找
+    返回带有 file_id/filename/sheet_id/sheet_name/storage_mode/row_index/column_index 属性的记录
+    """
+    first = aliased(models.CellToken)
+    query = db.query(
+        models.ExcelFile.id.label("file_id"),
+        models.ExcelFile.filename,
+        models.ExcelSheet.id.label("sheet_id"),
+        models.ExcelSheet.sheet_name,
+        models.ExcelSheet.storage_mode,
+        first.row_index,
+        first.column_index
+    ).join(
+        models.ExcelSheet, models.ExcelSheet.id == first.sheet_id
+    ).join(
+        models.ExcelFile, models.ExcelFile.content_id == models.ExcelSheet.content_id
+    ).filter(
+        models.ExcelFile.user_id == user_id,
+        first.user_id == user_id,
+        _token_filter(first, terms[0])
+    )
+    for term in terms[1:]:
+        other = aliased(models.CellToken)
+        query = query.filter(select(other.id).where(
+            other.user_id == user_id,
+            _token_filter(other, term),
+            other.sheet_id == first.sheet_id,
+            other.row_index == first.row_index,
+            other.column_index == first.column_index
+        ).exists())
+    if file_id is not None:
+        query = query.filter(models.ExcelFile.id == file_id)
+    if after is not None:
+        after_file, after_sheet, after_row, after_col = after
+        query = query.filter(or_(
+            models.ExcelFile.id < after_file,
+            and_(models.ExcelFile.id == after_file, or_(
+                models.ExcelSheet.id > after_sheet,
+                and_(models.ExcelSheet.id == after_sheet, or_(
+                    first.row_index > after_row,
+                    and_(first.row_index == after_row, first.column_index > after_col)
+                ))
+            ))
+        ))
+    # 前缀匹配时同一单元格可能有多个词命中
+    return query.distinct().order_by(
+        models.ExcelFile.id.desc(),
+        models.ExcelSheet.id,
+        first.row_index,
+        first.column_index
+    ).limit(limit).all()
+
+
+def get_cell_values(
+    db: Session,
+    sheet_id: int,
+    cells: Iterable[Tuple[int, int]],
+    storage_mode: str = "cells"
+) -> Dict[Tuple[int, int], Optional[str]]:
+    """读取指定 (行, 列) 单元格的值"""
+    wanted = set(cells)
+    if not wanted:
+        return {}
+    rows = sorted({row_idx for row_idx, _ in wanted})
+    if storage_mode == "blocks":
+        blocks = db.query(
+            models.SheetRowBlock.start_row,
+            models.SheetRowBlock.block_data
+        ).filter(
+            models.SheetRowBlock.sheet_id == sheet_id,
+            or_(*(and_(models.SheetRowBlock.start_row <= row_idx, models.SheetRowBlock.end_row >= row_idx)
+                  for row_idx in rows))
+        ).all()
+        records = (
+            record
+            for block_start, block_data in blocks
+            for record in row_blocks.decode_block(block_data, block_start)
+        )
+    else:
+        records = db.query(
+            models.ExcelData.row_index,
+            models.ExcelData.column_index,
+            models.ExcelData.cell_value
+        ).filter(
+            models.ExcelData.sheet_id == sheet_id,
+            models.ExcelData.row_index.in_(rows),
+            models.ExcelData.column_index.in_({col_idx for _, col_idx in wanted})
+        ).all()
+    return {
+        (record.row_index, record.column_index): record.cell_value
+        for record in records
+        if (record.row_index, record.column_index) in wanted
+    }
+
+
+# ===== 列统计相关 CRUD =====
+
+def save_column_stats(db: Session, db_sheet: models.ExcelSheet, profile: SheetProfile) -> None:
+    """写入整个Sheet和各表格区域的列统计，并记录识别出的表头行（不提交事务）
+    表格区域需已写入，区域的 header_rows 按识别结果更新
+    """
+    table = models.ColumnStat.__table__
+    rows = [
+        {**stat, "sheet_id": db_sheet.id, "region_index": None}
+        for stat in column_stats(profile.columns, profile.headers, profile.data_rows, 0, db_sheet.column_count)
+    ]
+    for region in get_sheet_table_regions(db, db_sheet.id):
+        region_profile = profile.region(region.start_row)
+        if region_profile is None:
+            continue
+        region.header_rows = region_profile.header_rows
+        rows.extend(
+            {**stat, "sheet_id": db_sheet.id, "region_index": region.region_index}
+            for stat in column_stats(
+                region_profile.columns, region_profile.headers, region_profile.data_rows,
+                region.start_col, region.end_col + 1
+            )
+        )
+    for start in range(0, len(rows), INGEST_BATCH_SIZE):
+        db.execute(table.insert(), rows[start:start + INGEST_BATCH_SIZE])
+    db_sheet.header_row = profile.header_row
+    db_sheet.columns_profiled_at = datetime.now()
+
+
+def delete_column_stats(db: Session, sheet_id: int) -> None:
+    """删除Sheet的列统计（不提交事务）"""
+    db.query(models.ColumnStat).filter(
+        models.ColumnStat.sheet_id == sheet_id
+    ).delete(synchronize_session=False)
+
+
+def get_column_stats(db: Session, sheet_id: int, region_index: Optional[int] = None) -> List[models.ColumnStat]:
+    """获取整个Sheet（region_index 为空）或一个表格区域的列统计"""
+    query = db.query(models.ColumnStat).filter(models.ColumnStat.sheet_id == sheet_id)
+    if region_index is None:
+        query = query.filter(models.ColumnStat.region_index.is_(None))
+    else:
+        query = query.filter(models.ColumnStat.region_index == region_index)
+    return query.order_by(models.ColumnStat.column_index).all()
+
+
+# ===== 解析任务相关 CRUD =====
+
+def create_ingest_job(
+    db: Session,
+    user_id: int,
+    filename: str,
+    file_size: int,
+    spool_path: str,
+    content_hash: str = None
+) -> models.IngestJob:
+    """创建解析任务"""
+    db_job = models.IngestJob(
+        user_id=user_id,
+        filename=filename,
+        file_size=file_size,
+        spool_path=spool_path,
+        content_hash=content_hash,
+        status="queued"
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+
+def get_ingest_job(
+    db: Session,
+    job_id: int,
+    user_id: int = None
+) -> Optional[models.IngestJob]:
+    """根据ID获取解析任务"""
+    query = db.query(models.IngestJob).filter(models.IngestJob.id == job_id)
+    if user_id is not None:
+        query = query.filter(models.IngestJob.user_id == user_id)
+    return query.first()
+
+
+def update_ingest_job(db: Session, job_id: int, **fields) -> None:
+    """更新解析任务状态"""
+    db.query(models.IngestJob).filter(
+        models.IngestJob.id == job_id
+    ).update(fields, synchronize_session=False)
+    db.commit()
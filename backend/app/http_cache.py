@@ -0,0 +1,111 @@
+"""HTTP 缓存：ETag 生成、条件请求（If-None-Match）和字节范围请求（Range）处理
+
+上传后的内容不再变化：
+- 图片和原始文件按 ID/内容哈希生成强 ETag，允许浏览器一直缓存
+- Sheet数据等 JSON 响应的结构可能随版本调整，ETag 带上 API_VERSION，浏览器每次重新验证
+"""
+import hashlib
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+from starlette.requests import Request
+
+# JSON 响应结构变化时修改，使旧的 ETag 失效
+API_VERSION = 5
+
+# 内容不会变化：浏览器可以一直使用缓存（响应与用户相关，只允许私有缓存）
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# 可以缓存，但每次使用前需要用 ETag 重新验证
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """由若干标识拼接强 ETag"""
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def api_etag(*parts) -> str:
+    """JSON 接口响应的 ETag，包含 API_VERSION"""
+    return make_etag(f"v{API_VERSION}", *parts)
+
+
+def query_digest(*parts) -> str:
+    """查询参数的摘要，用作 ETag 的一部分：参数中可能有非 ASCII 字符、引号和逗号，不能直接放进 ETag"""
+    text = "\x1f".join(str(part) for part in parts)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match 是否与 ETag 匹配（按 RFC 9110 使用弱比较）"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def not_modified(etag: str, cache_control: str, vary: Optional[str] = None) -> Response:
+    """304 响应，带上与 200 响应相同的缓存头"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if vary:
+        headers["Vary"] = vary
+    return Response(status_code=304, headers=headers)
+
+
+def parse_range(request: Request, size: int, etag: str) -> Optional[Tuple[int, int]]:
+    """解析 Range 请求头，返回请求的字节范围 (起始, 结束)，包含结束位置
+    没有 Range、If-Range 与当前 ETag 不匹配或请求多个范围时返回 None，发送完整内容；
+    范围无法满足时返回 416
+    """
+    header = request.headers.get("range")
+    if not header:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        return None
+
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, sep, last = ranges.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # bytes=-N：最后 N 个字节
+            suffix = int(last)
+            if suffix == 0:
+                raise _range_not_satisfiable(size)
+            start = max(size - suffix, 0)
+            end = size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise _range_not_satisfiable(size)
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _range_not_satisfiable(size: int) -> HTTPException:
+    return HTTPException(
+        status_code=416,
+        detail="请求的范围无效",
+        headers={"Content-Range": f"bytes */{size}"}
+    )
+
+
+def partial_headers(start: int, end: int, size: int) -> dict:
+    """206 响应的范围相关头"""
+    return {
+        "Content-Range": f"bytes {start}-{end}/{size}",
+        "Content-Length": str(end - start + 1),
+        "Accept-Ranges": "bytes"
+    }
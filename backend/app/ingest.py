@@ -0,0 +1,305 @@
+"""后台解析任务：暂存到磁盘的上传文件交给进程池解析入库"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from typing import Iterable, Iterator, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal, engine
+from .config import (
+    INGEST_WORKERS, INGEST_QUEUE_DEPTH, CELL_STORAGE_MODE, SEARCH_INDEX_ENABLED, PARSE_WORKERS
+)
+from .parser import iter_workbook
+from .uploads import SpooledUpload
+from .blobstore import get_blob_store
+from .thumbnails import add_thumbnails
+from .column_stats import SheetProfiler
+from . import crud, models
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending: Set[Future] = set()
+_lock = threading.Lock()
+
+
+def job_parse_workers(parse_workers: int, ingest_workers: int, cpu_count: int) -> int:
+    """单个解析任务按Sheet并行解析的进程数
+    任务本身在 ingest_workers 个进程之一中运行，并行解析时每个任务再启动自己的进程池，
+    总进程数为 ingest_workers × (1 + 返回值)；按 CPU 核数平均分给各任务，不足 2 个时顺序解析
+    """
+    share = cpu_count // max(ingest_workers, 1)
+    workers = min(parse_workers, share)
+    return workers if workers > 1 else 1
+
+
+JOB_PARSE_WORKERS = job_parse_workers(PARSE_WORKERS, INGEST_WORKERS, os.cpu_count() or 1)
+
+
+class IngestQueueFull(Exception):
+    """解析队列已满"""
+
+
+class IngestParseError(Exception):
+    """Excel文件解析失败"""
+
+
+def _init_worker() -> None:
+    """子进程初始化：丢弃从父进程继承的数据库连接"""
+    engine.dispose(close=False)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=max(INGEST_WORKERS, 1),
+            initializer=_init_worker
+        )
+    return _executor
+
+
+def queue_is_full() -> bool:
+    """当前进程排队中的任务是否已达上限"""
+    return len(_pending) >= INGEST_QUEUE_DEPTH
+
+
+def shutdown() -> None:
+    """关闭进程池（应用退出时调用）"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _index_file(db: Session, db_file: models.ExcelFile) -> None:
+    """文件提交后为各Sheet写入搜索索引，每个Sheet单独提交
+    失败时只记录日志：文件已经可用，未建立索引的Sheet可以用 python -m app.cli build-search-index 补建
+    """
+    file_id, user_id = db_file.id, db_file.user_id
+    # 单元格用服务端游标流式读取，占用读取会话的连接，搜索词通过 db 写入
+    reader = SessionLocal()
+    try:
+        for db_sheet in db_file.content.sheets:
+            crud.build_sheet_search_index(db, reader, db_sheet, user_id)
+            db.commit()
+            reader.rollback()
+    except Exception:
+        db.rollback()
+        logger.exception("文件 %s 建立搜索索引失败", file_id)
+    finally:
+        reader.close()
+
+
+def save_parsed_workbook(
+    db: Session,
+    filename: str,
+    file_size: int,
+    content_hash: str,
+    user_id: int,
+    sheets_data: Iterable[dict]
+) -> Tuple[models.ExcelFile, int]:
+    """将解析结果写入数据库（整个文件在同一个事务中，由调用方提交）
+    sheets_data 可以是逐个产生Sheet的迭代器，每个Sheet的 cells 可以是生成器，
+    单元格按固定批大小写入，内存占用与Sheet大小无关
+    返回 (文件记录, 插入的单元格数)
+    """
+    # 保存文件内容和文件信息
+    db_content = crud.create_excel_content(db, content_hash, content_hash, file_size)
+    db_file = crud.create_excel_file(
+        db=db,
+        filename=filename,
+        content_id=db_content.id,
+        content_hash=content_hash,
+        file_size=file_size,
+        sheet_count=0,
+        user_id=user_id
+    )
+
+    # 保存Sheet和数据
+    cell_count = 0
+    sheet_count = 0
+    for sheet_info in sheets_data:
+        sheet_count += 1
+        db_sheet = crud.create_excel_sheet(
+            db=db,
+            content_id=db_content.id,
+            sheet_name=sheet_info["name"],
+            sheet_index=sheet_info["index"],
+            row_count=0,
+            column_count=0,
+            storage_mode=CELL_STORAGE_MODE
+        )
+
+        # 单元格边解析边分批写入，同时统计各列（搜索索引在文件提交后写入，见 run_ingest_job）
+        profiler = SheetProfiler()
+        cells = profiler.profile(sheet_info["cells"])
+        if CELL_STORAGE_MODE == "blocks":
+            cell_count += crud.bulk_create_row_blocks(db, db_sheet.id, cells)
+        else:
+            cell_count += crud.bulk_create_excel_data(db, db_sheet.id, cells)
+
+        # 流式解析的行列数和以下信息在单元格遍历结束后才完整
+        db_sheet.row_count = sheet_info["row_count"]
+        db_sheet.column_count = sheet_info["column_count"]
+
+        # 批量保存合并单元格、图片、图表和表格区域
+        crud.bulk_create_merged_cells(db, db_sheet.id, sheet_info.get("merged_cells"))
+        crud.bulk_create_sheet_images(db, db_sheet.id, add_thumbnails(sheet_info.get("images")))
+        crud.bulk_create_sheet_charts(db, db_sheet.id, sheet_info.get("charts"))
+        crud.bulk_create_table_regions(db, db_sheet.id, sheet_info.get("table_regions"))
+        crud.save_column_stats(db, db_sheet, profiler.finish())
+
+    db_file.sheet_count = sheet_count
+    db.flush()
+    return db_file, cell_count
+
+
+def _checked(items: Iterator) -> Iterator:
+    """把解析过程中的异常转换为 IngestParseError，与入库异常区分"""
+    while True:
+        try:
+            item = next(items)
+        except StopIteration:
+            return
+        except Exception as e:
+            raise IngestParseError(f"Excel文件解析失败: {str(e)}")
+        yield item
+
+
+def _checked_parse(sheets: Iterator[dict]) -> Iterator[dict]:
+    """流式解析时单元格在入库过程中才逐行解析，Sheet和单元格都需要检查"""
+    for sheet_info in _checked(sheets):
+        sheet_info["cells"] = _checked(iter(sheet_info["cells"]))
+        yield sheet_info
+
+
+def run_ingest_job(job_id: int) -> None:
+    """在解析进程中执行：读取暂存文件、解析并入库"""
+    db = SessionLocal()
+    # 任务进度使用单独的会话提交，不影响正在写入的文件事务
+    status_db = SessionLocal()
+    job = crud.get_ingest_job(db, job_id)
+    if not job:
+        db.close()
+        status_db.close()
+        return
+    try:
+        crud.update_ingest_job(status_db, job_id, status="parsing")
+
+        def on_sheet(index: int, total: int) -> None:
+            # 单元格边解析边写入，从第一个Sheet开始即处于写入阶段
+            crud.update_ingest_job(status_db, job_id, status="inserting", current_sheet=index + 1, sheet_count=total)
+
+        ext = os.path.splitext(job.filename)[1].lower()
+        try:
+            sheets = iter_workbook(job.spool_path, ext, on_sheet, workers=JOB_PARSE_WORKERS)
+        except Exception as e:
+            raise IngestParseError(f"Excel文件解析失败: {str(e)}")
+
+        # 边解析边写入，Sheet按顺序到达
+        started = time.perf_counter()
+        db_file, cell_count = save_parsed_workbook(
+            db, job.filename, job.file_size, job.content_hash, job.user_id, _checked_parse(sheets)
+        )
+        # 原始文件转存到外部存储（按内容哈希寻址），数据库只保存对象键。
+        # 内容记录在事务开始时已插入，删除文件时对同一对象键加锁检查引用，不会删除这里刚转存的对象（见 crud.delete_file）
+        get_blob_store().put_file(job.content_hash, job.spool_path)
+        db.commit()
+        elapsed = time.perf_counter() - started
+        insert_rate = int(cell_count / elapsed) if elapsed > 0 else cell_count
+        logger.info("解析任务 %s 写入 %d 个单元格，耗时 %.2fs（%d 行/秒）",
+                    job_id, cell_count, elapsed, insert_rate)
+        crud.update_ingest_job(
+            status_db, job_id,
+            status="done",
+            file_id=db_file.id,
+            sheet_count=db_file.sheet_count,
+            cell_count=cell_count,
+            insert_rate=insert_rate
+        )
+        if SEARCH_INDEX_ENABLED:
+            # 搜索索引不在入库事务中写入：每个单元格最多 MAX_CELL_TOKENS 个搜索词，写入量是单元格的数倍。
+            # 任务完成后才开始写入，写入完成前该文件搜索不到
+            _index_file(db, db_file)
+    except Exception as e:
+        if isinstance(e, IngestParseError):
+            logger.warning("解析任务 %s 失败: %s", job_id, e)
+        else:
+            logger.exception("解析任务 %s 失败", job_id)
+        # 整个文件在同一事务中写入，回滚即可丢弃已写入的部分
+        # （已转存的原始文件按内容哈希共享，可能正被其他任务使用，不在这里删除）
+        db.rollback()
+        status_db.rollback()
+        crud.update_ingest_job(status_db, job_id, status="failed", error=str(e))
+    finally:
+        if job.spool_path and os.path.exists(job.spool_path):
+            os.remove(job.spool_path)
+        db.close()
+        status_db.close()
+
+
+def _on_job_done(job_id: int, future: Future) -> None:
+    with _lock:
+        _pending.discard(future)
+    if future.cancelled() or future.exception() is not None:
+        # 解析进程异常退出，任务自身没有机会记录失败状态
+        db = SessionLocal()
+        try:
+            crud.update_ingest_job(db, job_id, status="failed", error="解析进程异常退出")
+        finally:
+            db.close()
+
+
+def enqueue_upload(
+    db: Session,
+    user_id: int,
+    upload: SpooledUpload
+) -> models.IngestJob:
+    """为已暂存的上传文件提交解析任务
+    用户已上传过相同内容时直接引用已解析的数据，任务立即完成
+    """
+    existing = crud.get_user_file_by_hash(db, user_id, upload.sha256)
+    if existing:
+        db_file = crud.create_file_reference(db, existing, upload.filename, user_id)
+        upload.discard()
+        job = crud.create_ingest_job(
+            db=db,
+            user_id=user_id,
+            filename=upload.filename,
+            file_size=upload.size,
+            spool_path=None,
+            content_hash=upload.sha256
+        )
+        crud.update_ingest_job(
+            db, job.id,
+            status="done",
+            file_id=db_file.id,
+            sheet_count=db_file.sheet_count,
+            current_sheet=db_file.sheet_count
+        )
+        db.refresh(job)
+        return job
+
+    job = crud.create_ingest_job(
+        db=db,
+        user_id=user_id,
+        filename=upload.filename,
+        file_size=upload.size,
+        spool_path=upload.path,
+        content_hash=upload.sha256
+    )
+
+    with _lock:
+        if len(_pending) >= INGEST_QUEUE_DEPTH:
+            upload.discard()
+            crud.update_ingest_job(db, job.id, status="failed", error="解析队列已满")
+            raise IngestQueueFull()
+        future = _get_executor().submit(run_ingest_job, job.id)
+        _pending.add(future)
+    future.add_done_callback(partial(_on_job_done, job.id))
+    return job
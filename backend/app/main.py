@@ -1,9 +1,12 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
 from .database import engine, Base
-from .routers import excel, auth
+from .routers import excel, auth, jobs, search
+from . import ingest, models
+from .auth import get_current_user
+from .compression import CompressionMiddleware, compression_stats
 from .config import SESSION_SECRET
 
 # 创建数据库表
@@ -31,11 +34,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩（最外层，压缩最终发送的内容）
+app.add_middleware(CompressionMiddleware)
+
 # 注册路由
 app.include_router(excel.router)
 app.include_router(auth.router)
+app.include_router(jobs.router)
+app.include_router(search.router)
+
+
+@app.on_event("shutdown")
+def shutdown_ingest_workers():
+    ingest.shutdown()
 
 
 @app.get("/")
 def root():
     return {"message": "Excel Manager API", "docs": "/docs"}
+
+
+@app.get("/api/metrics/compression")
+def compression_metrics(current_user: models.User = Depends(get_current_user)):
+    """响应压缩统计（当前服务进程）：各编码压缩前后的字节数和节省的字节数"""
+    return compression_stats.snapshot()
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, BigInteger, DateTime, Text, LargeBinary, ForeignKey, JSON, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, Double, Text, LargeBinary, ForeignKey, JSON, Boolean, Index
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 
 from .database import Base
@@ -35,21 +35,52 @@ class Session(Base):
     user = relationship("User")
 
 
+class ExcelContent(Base):
+    """Excel文件内容表(同一用户重复上传的相同文件共享原始数据和解析结果)"""
+    __tablename__ = "excel_contents"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    content_hash = Column(String(64), nullable=False, index=True, comment="文件内容SHA-256")
+    storage_key = Column(String(255), nullable=True, index=True, comment="外部存储中的对象键")
+    # 二进制字段延迟加载，查询元数据和校验权限时不读取
+    file_data = deferred(Column(LargeBinary(length=2**32-1), nullable=True, comment="文件二进制数据(未迁移到外部存储的旧数据)"))
+    file_size = Column(BigInteger, nullable=True, comment="文件大小(字节)")
+    ref_count = Column(Integer, nullable=False, default=1, comment="引用该内容的文件数")
+    created_at = Column(DateTime, server_default=func.now(), comment="创建时间")
+
+    # 关联
+    files = relationship("ExcelFile", back_populates="content")
+    # 内容删除时由数据库外键级联删除Sheet及其数据，避免逐行加载
+    sheets = relationship("ExcelSheet", back_populates="content",
+                          cascade="all, delete-orphan", passive_deletes=True)
+
+
 class ExcelFile(Base):
     """Excel文件信息表"""
     __tablename__ = "excel_files"
+    __table_args__ = (
+        Index("idx_excel_files_user_hash", "user_id", "content_hash"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"),
                      nullable=False, index=True)
+    content_id = Column(Integer, ForeignKey("excel_contents.id"), nullable=False, index=True)
     filename = Column(String(255), nullable=False, comment="原始文件名")
-    file_data = Column(LargeBinary(length=2**32-1), nullable=False, comment="文件二进制数据")
+    content_hash = Column(String(64), nullable=False, comment="文件内容SHA-256")
     file_size = Column(BigInteger, nullable=False, comment="文件大小(字节)")
     sheet_count = Column(Integer, nullable=False, default=0, comment="Sheet数量")
     created_at = Column(DateTime, server_default=func.now(), comment="上传时间")
 
-    # 关联Sheet
-    sheets = relationship("ExcelSheet", back_populates="file", cascade="all, delete-orphan")
+    # 关联内容
+    content = relationship("ExcelContent", back_populates="files")
+    # 关联Sheet（通过共享的内容）
+    sheets = relationship(
+        "ExcelSheet",
+        primaryjoin="ExcelFile.content_id == foreign(ExcelSheet.content_id)",
+        order_by="ExcelSheet.sheet_index",
+        viewonly=True
+    )
     # 关联User
     user = relationship("User", back_populates="excel_files")
 
@@ -59,15 +90,21 @@ class ExcelSheet(Base):
     __tablename__ = "excel_sheets"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    file_id = Column(Integer, ForeignKey("excel_files.id", ondelete="CASCADE"), nullable=False)
+    content_id = Column(Integer, ForeignKey("excel_contents.id", ondelete="CASCADE"), nullable=False, index=True)
     sheet_name = Column(String(255), nullable=False, comment="Sheet名称")
     sheet_index = Column(Integer, nullable=False, comment="Sheet序号")
     row_count = Column(Integer, nullable=False, default=0, comment="行数")
     column_count = Column(Integer, nullable=False, default=0, comment="列数")
+    storage_mode = Column(String(10), nullable=False, default="cells", comment="单元格存储方式(cells/blocks)")
+    search_indexed = Column(Boolean, nullable=False, default=False, comment="单元格是否已写入搜索索引")
+    # 列统计和表头识别结果（app/column_stats.py），未生成统计的旧数据仍以第一行作为表头
+    header_row = Column(Integer, nullable=True, comment="表头所在行号(没有表头时为空)")
+    columns_profiled_at = Column(DateTime, nullable=True, comment="生成列统计的时间")
 
     # 关联
-    file = relationship("ExcelFile", back_populates="sheets")
+    content = relationship("ExcelContent", back_populates="sheets")
     data = relationship("ExcelData", back_populates="sheet", cascade="all, delete-orphan")
+    row_blocks = relationship("SheetRowBlock", back_populates="sheet", cascade="all, delete-orphan")
     merged_cells = relationship("MergedCell", back_populates="sheet", cascade="all, delete-orphan")
     images = relationship("SheetImage", back_populates="sheet", cascade="all, delete-orphan")
     charts = relationship("SheetChart", back_populates="sheet", cascade="all, delete-orphan")
@@ -77,17 +114,48 @@ class ExcelSheet(Base):
 class ExcelData(Base):
     """Excel单元格数据表"""
     __tablename__ = "excel_data"
+    __table_args__ = (
+        # 分页按行范围读取，复合索引同时满足过滤和排序
+        Index("idx_excel_data_sheet_row_col", "sheet_id", "row_index", "column_index"),
+        # 按列排序和筛选：每种类型化值一个索引，数据库按索引顺序读取，不需要额外排序
+        Index("idx_excel_data_sheet_col_num", "sheet_id", "column_index", "num_value"),
+        Index("idx_excel_data_sheet_col_date", "sheet_id", "column_index", "date_value"),
+        Index("idx_excel_data_sheet_col_text", "sheet_id", "column_index", "cell_value",
+              mysql_length={"cell_value": 64}),
+    )
 
     id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
-    sheet_id = Column(Integer, ForeignKey("excel_sheets.id", ondelete="CASCADE"), nullable=False, index=True)
+    sheet_id = Column(Integer, ForeignKey("excel_sheets.id", ondelete="CASCADE"), nullable=False)
     row_index = Column(Integer, nullable=False, comment="行号")
     column_index = Column(Integer, nullable=False, comment="列号")
     cell_value = Column(Text, nullable=True, comment="单元格值")
+    # 类型化值，取值规则见 app/sheet_query.py
+    value_type = Column(String(1), nullable=True, comment="值类型(n 数字/d 日期/b 布尔/s 文本)")
+    num_value = Column(Double, nullable=True, comment="数字值(布尔值为 0/1)")
+    date_value = Column(DateTime, nullable=True, comment="日期时间值")
 
     # 关联
     sheet = relationship("ExcelSheet", back_populates="data")
 
 
+class SheetRowBlock(Base):
+    """Sheet单元格行块表(按列编码并压缩的N行数据)"""
+    __tablename__ = "sheet_row_blocks"
+    __table_args__ = (
+        Index("idx_row_blocks_sheet_start", "sheet_id", "start_row"),
+    )
+
+    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+    sheet_id = Column(Integer, ForeignKey("excel_sheets.id", ondelete="CASCADE"), nullable=False)
+    start_row = Column(Integer, nullable=False, comment="起始行号")
+    end_row = Column(Integer, nullable=False, comment="结束行号(包含)")
+    cell_count = Column(Integer, nullable=False, default=0, comment="块内单元格数")
+    block_data = Column(LargeBinary(length=2**24-1), nullable=False, comment="压缩后的列式编码数据")
+
+    # 关联
+    sheet = relationship("ExcelSheet", back_populates="row_blocks")
+
+
 class MergedCell(Base):
     """合并单元格信息表"""
     __tablename__ = "merged_cells"
@@ -109,13 +177,15 @@ class SheetImage(Base):
 
     id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
     sheet_id = Column(Integer, ForeignKey("excel_sheets.id", ondelete="CASCADE"), nullable=False, index=True)
-    image_data = Column(LargeBinary(length=2**24-1), nullable=False, comment="图片二进制数据")
+    image_data = deferred(Column(LargeBinary(length=2**24-1), nullable=False, comment="图片二进制数据"))
     image_format = Column(String(20), nullable=False, comment="图片格式(png/jpeg/gif等)")
     anchor_type = Column(String(20), nullable=False, default="oneCellAnchor", comment="锚定类型")
     anchor_row = Column(Integer, nullable=False, comment="锚定行号")
     anchor_col = Column(Integer, nullable=False, comment="锚定列号")
     width = Column(Integer, nullable=True, comment="图片宽度(像素)")
     height = Column(Integer, nullable=True, comment="图片高度(像素)")
+    thumb_data = deferred(Column(LargeBinary(length=2**24-1), nullable=True, comment="缩略图二进制数据"))
+    thumb_format = Column(String(20), nullable=True, comment="缩略图格式，为空表示尚未生成；没有缩略图数据时使用原图")
 
     # 关联
     sheet = relationship("ExcelSheet", back_populates="images")
@@ -155,3 +225,78 @@ class TableRegion(Base):
 
     # 关联
     sheet = relationship("ExcelSheet", back_populates="table_regions")
+
+
+class CellToken(Base):
+    """单元格搜索词表(倒排索引)，入库时由单元格值分词生成，分词规则见 app/search.py"""
+    __tablename__ = "cell_tokens"
+    __table_args__ = (
+        # 在用户自己的数据中按词（或词前缀）查找，同时覆盖多个词在同一单元格上的检查，不需要回表
+        Index("idx_cell_tokens_user_token_cell", "user_id", "token", "sheet_id", "row_index", "column_index"),
+    )
+
+    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False, comment="文件所属用户(文件内容只在同一用户的文件间共享)")
+    sheet_id = Column(Integer, ForeignKey("excel_sheets.id", ondelete="CASCADE"), nullable=False, index=True)
+    token = Column(String(32), nullable=False, comment="搜索词（小写）")
+    row_index = Column(Integer, nullable=False, comment="行号")
+    column_index = Column(Integer, nullable=False, comment="列号")
+
+
+class ColumnVector(Base):
+    """列式副本表：分组统计使用的整列数据（app/columnar.py），首次统计该列时生成"""
+    __tablename__ = "column_vectors"
+    __table_args__ = (
+        Index("idx_column_vectors_sheet_col", "sheet_id", "column_index", unique=True),
+    )
+
+    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+    sheet_id = Column(Integer, ForeignKey("excel_sheets.id", ondelete="CASCADE"), nullable=False)
+    column_index = Column(Integer, nullable=False, comment="列号")
+    vector_data = Column(LargeBinary(length=2**32-1), nullable=False, comment="压缩后的列式数据")
+    created_at = Column(DateTime, server_default=func.now(), comment="生成时间")
+
+
+class ColumnStat(Base):
+    """列统计表：每列一条，region_index 为空时为整个Sheet的统计，否则为对应表格区域的统计"""
+    __tablename__ = "column_stats"
+    __table_args__ = (
+        Index("idx_column_stats_sheet_region_col", "sheet_id", "region_index", "column_index"),
+    )
+
+    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+    sheet_id = Column(Integer, ForeignKey("excel_sheets.id", ondelete="CASCADE"), nullable=False)
+    region_index = Column(Integer, nullable=True, comment="表格区域序号(为空表示整个Sheet)")
+    column_index = Column(Integer, nullable=False, comment="列号")
+    header = Column(String(255), nullable=True, comment="表头")
+    inferred_type = Column(String(16), nullable=False, comment="推断类型(number/date/boolean/text/mixed/empty)")
+    non_null_count = Column(Integer, nullable=False, default=0, comment="非空值个数")
+    null_count = Column(Integer, nullable=False, default=0, comment="空值个数")
+    distinct_count = Column(Integer, nullable=False, default=0, comment="不同值个数(估计)")
+    min_value = Column(String(255), nullable=True, comment="最小值")
+    max_value = Column(String(255), nullable=True, comment="最大值")
+    histogram = Column(JSON, nullable=True, comment="数值直方图")
+
+
+class IngestJob(Base):
+    """文件解析任务表"""
+    __tablename__ = "ingest_jobs"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"),
+                     nullable=False, index=True)
+    file_id = Column(Integer, ForeignKey("excel_files.id", ondelete="SET NULL"),
+                     nullable=True, comment="解析完成后生成的文件ID")
+    filename = Column(String(255), nullable=False, comment="原始文件名")
+    file_size = Column(BigInteger, nullable=False, comment="文件大小(字节)")
+    spool_path = Column(String(1024), nullable=True, comment="待解析文件暂存路径")
+    content_hash = Column(String(64), nullable=True, comment="文件内容SHA-256")
+    status = Column(String(20), nullable=False, default="queued",
+                    comment="任务状态(queued/parsing/inserting/done/failed)")
+    current_sheet = Column(Integer, nullable=False, default=0, comment="正在解析的Sheet序号(从1开始)")
+    sheet_count = Column(Integer, nullable=False, default=0, comment="Sheet总数")
+    cell_count = Column(BigInteger, nullable=False, default=0, comment="写入的单元格数")
+    insert_rate = Column(Integer, nullable=True, comment="单元格写入速度(行/秒)")
+    error = Column(Text, nullable=True, comment="失败原因")
+    created_at = Column(DateTime, server_default=func.now(), comment="创建时间")
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment="更新时间")
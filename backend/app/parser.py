@@ -0,0 +1,660 @@
+"""Excel 文件解析"""
+import os
+from collections import deque
+from struct import unpack_from
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Tuple, Optional
+
+import openpyxl
+import xlrd
+from openpyxl.drawing.spreadsheet_drawing import SpreadsheetDrawing
+from openpyxl.packaging.relationship import get_dependents, get_rels_path
+from openpyxl.reader.drawings import find_images
+from openpyxl.utils.cell import range_boundaries
+from openpyxl.worksheet._reader import WorkSheetParser
+
+from .config import PARSE_PARALLEL_MAX_SHEET_MB, PARSE_WORKERS, XLSX_ENGINE
+from .xlsx_reader import XlsxReader, XlsxSheet
+
+# 解析进度回调: (当前Sheet序号, Sheet总数)
+ProgressCallback = Callable[[int, int], None]
+
+
+class TableRegionDetector:
+    """
+    增量检测单个Sheet内的多个表格区域
+    按行号递增的顺序逐行输入，通过识别空行来分割不同的表格；
+    未输入的行视为空行，因此只需输入有数据的行
+    """
+
+    def __init__(self):
+        self._regions = []
+        self._current_start = None
+        self._current_name = None
+        self._last_row = None
+
+    def add_row(self, row_idx: int, values: Iterable) -> None:
+        """输入一行数据"""
+        # 检查这一行是否全为空，同时取第一个非空单元格作为可能的表格名称
+        first_value = None
+        for cell in values:
+            if cell is not None and str(cell).strip():
+                first_value = str(cell).strip()[:50]  # 限制长度
+                break
+        if first_value is None:
+            return
+
+        # 与上一个非空行之间有空行，结束当前区域
+        if self._current_start is not None and row_idx > self._last_row + 1:
+            self._close()
+
+        # 如果还没有开始新区域，标记开始，表格名称取区域第一行的第一个非空单元格
+        if self._current_start is None:
+            self._current_start = row_idx
+            self._current_name = first_value
+        self._last_row = row_idx
+
+    def _close(self) -> None:
+        self._regions.append((self._current_start, self._last_row, self._current_name))
+        self._current_start = None
+        self._current_name = None
+
+    def finish(self, column_count: int) -> List[Tuple[int, int, int, int, int, int, str]]:
+        """
+        结束输入并返回检测结果
+        返回: List of (region_index, start_row, start_col, end_row, end_col, header_rows, table_name)
+        """
+        # 处理最后一个区域
+        if self._current_start is not None:
+            self._close()
+
+        # 如果只检测到一个区域，说明整个Sheet就是一个表格，不需要特别标记
+        if len(self._regions) <= 1:
+            return []
+
+        return [
+            (region_index, start_row, 0, end_row, column_count - 1, 1, table_name)  # 默认1行表头
+            for region_index, (start_row, end_row, table_name) in enumerate(self._regions)
+        ]
+
+
+def detect_table_regions(rows: List[List], column_count: int) -> List[Tuple[int, int, int, int, int, int, str]]:
+    """
+    检测单个Sheet内的多个表格区域（一次性输入所有行）
+    返回: List of (region_index, start_row, start_col, end_row, end_col, header_rows, table_name)
+    """
+    detector = TableRegionDetector()
+    for row_idx, row in enumerate(rows):
+        detector.add_row(row_idx, row)
+    return detector.finish(column_count)
+
+
+def get_chart_type_name(chart) -> str:
+    """获取图表类型名称"""
+    chart_type_map = {
+        'BarChart': 'bar',
+        'BarChart3D': 'bar3d',
+        'LineChart': 'line',
+        'LineChart3D': 'line3d',
+        'PieChart': 'pie',
+        'PieChart3D': 'pie3d',
+        'AreaChart': 'area',
+        'AreaChart3D': 'area3d',
+        'ScatterChart': 'scatter',
+        'RadarChart': 'radar',
+        'DoughnutChart': 'doughnut',
+        'BubbleChart': 'bubble',
+        'StockChart': 'stock',
+        'SurfaceChart': 'surface',
+        'SurfaceChart3D': 'surface3d',
+    }
+    return chart_type_map.get(type(chart).__name__, 'unknown')
+
+
+def extract_chart_data(chart) -> Optional[dict]:
+    """提取图表数据"""
+    try:
+        chart_data = {
+            'title': chart.title.text if chart.title else None,
+            'series': []
+        }
+
+        for series in chart.series:
+            series_info = {
+                'title': str(series.title) if series.title else None,
+            }
+            chart_data['series'].append(series_info)
+
+        return chart_data
+    except Exception:
+        return None
+
+
+def _collect_images(sheet_images) -> List[dict]:
+    """提取 openpyxl 图片对象的数据、格式、锚定位置和尺寸"""
+    images = []
+    for img in sheet_images:
+        try:
+            # 获取图片数据
+            img_data = img._data() if callable(img._data) else img._data
+            # 获取锚定位置
+            anchor_row = 0
+            anchor_col = 0
+            if hasattr(img, 'anchor'):
+                if hasattr(img.anchor, '_from'):
+                    anchor_row = img.anchor._from.row
+                    anchor_col = img.anchor._from.col
+                elif hasattr(img.anchor, 'row'):
+                    anchor_row = img.anchor.row
+                    anchor_col = img.anchor.col
+
+            # 获取图片格式
+            img_format = 'png'
+            if hasattr(img, 'format'):
+                img_format = img.format.lower()
+            elif hasattr(img, 'path') and img.path:
+                img_format = os.path.splitext(img.path)[1].lstrip('.').lower() or 'png'
+
+            # 获取尺寸
+            width = int(img.width) if hasattr(img, 'width') and img.width else None
+            height = int(img.height) if hasattr(img, 'height') and img.height else None
+
+            images.append({
+                'data': img_data,
+                'format': img_format,
+                'anchor_row': anchor_row,
+                'anchor_col': anchor_col,
+                'width': width,
+                'height': height
+            })
+        except Exception:
+            continue
+    return images
+
+
+def _collect_charts(sheet_charts) -> List[dict]:
+    """提取 openpyxl 图表对象的类型、标题、数据、锚定位置和尺寸"""
+    charts = []
+    for chart in sheet_charts:
+        try:
+            anchor_row = 0
+            anchor_col = 0
+            if hasattr(chart, 'anchor'):
+                if hasattr(chart.anchor, '_from'):
+                    anchor_row = chart.anchor._from.row
+                    anchor_col = chart.anchor._from.col
+
+            chart_type = get_chart_type_name(chart)
+            chart_title = chart.title.text if chart.title else None
+            chart_data = extract_chart_data(chart)
+
+            # 获取图表尺寸
+            width = int(chart.width * 96) if hasattr(chart, 'width') else None  # 转换为像素
+            height = int(chart.height * 96) if hasattr(chart, 'height') else None
+
+            charts.append({
+                'type': chart_type,
+                'title': chart_title,
+                'data': chart_data,
+                'anchor_row': anchor_row,
+                'anchor_col': anchor_col,
+                'width': width,
+                'height': height
+            })
+        except Exception:
+            continue
+    return charts
+
+
+def _stream_xlsx_sheet(workbook, idx: int) -> dict:
+    """从只读模式打开的.xlsx工作簿中流式解析一个Sheet
+    返回的 cells 是逐行产生 (row_index, column_index, value) 的生成器；
+    行列数、合并单元格、图片、图表和表格区域在 cells 遍历结束后才填入
+    """
+    sheet_name = workbook.sheetnames[idx]
+    sheet_info = {
+        "name": sheet_name,
+        "index": idx,
+        "row_count": 0,
+        "column_count": 0,
+        "cells": iter(()),
+        "merged_cells": [],
+        "images": [],
+        "charts": [],
+        "table_regions": []
+    }
+    sheet = workbook[sheet_name]
+    worksheet_path = getattr(sheet, "_worksheet_path", None)
+    if worksheet_path is not None:
+        # 图表Sheet没有单元格数据；只读模式的共享字符串表保存在各Sheet上，workbook.shared_strings 为空
+        sheet_info["cells"] = _iter_xlsx_cells(workbook, worksheet_path, sheet._shared_strings, sheet_info)
+    return sheet_info
+
+
+def _iter_xlsx_cells(
+    workbook,
+    worksheet_path: str,
+    shared_strings: list,
+    sheet_info: dict
+) -> Iterator[Tuple[int, int, object]]:
+    """逐行读取Sheet的XML，行列号与非只读模式一致（从第1行第1列开始），
+    合并单元格在同一次遍历中取得，图片和图表从该Sheet关联的绘图部件中读取
+    """
+    archive = workbook._archive
+    detector = TableRegionDetector()
+    row_count = 0
+    column_count = 0
+
+    src = archive.open(worksheet_path)
+    try:
+        ws_parser = WorkSheetParser(
+            src, shared_strings,
+            data_only=True, epoch=workbook.epoch,
+            date_formats=workbook._date_formats,
+            timedelta_formats=workbook._timedelta_formats
+        )
+        for row_no, row_cells in ws_parser.parse():
+            if not row_cells:
+                continue
+            row_idx = row_no - 1
+            row_count = row_no
+            column_count = max(column_count, row_cells[-1]["column"])
+            detector.add_row(row_idx, (cell["value"] for cell in row_cells))
+            for cell in row_cells:
+                if cell["value"] is not None:
+                    yield row_idx, cell["column"] - 1, cell["value"]
+        merge_cells = ws_parser.merged_cells
+    finally:
+        src.close()
+
+    # 收集合并单元格信息
+    merged_cells = []
+    if merge_cells is not None:
+        for merge_cell in merge_cells.mergeCell:
+            min_col, min_row, max_col, max_row = range_boundaries(merge_cell.ref)
+            merged_cells.append((min_row - 1, min_col - 1, max_row - 1, max_col - 1))  # 转换为0索引
+
+    # 合并区域内的空单元格也计入行列数（与非只读模式一致）
+    row_count, column_count = _extend_to_merged(row_count, column_count, merged_cells)
+    images, charts = _read_sheet_drawings(archive, worksheet_path)
+    sheet_info.update({
+        "row_count": row_count,
+        "column_count": column_count,
+        "merged_cells": merged_cells,
+        "images": images,
+        "charts": charts,
+        "table_regions": detector.finish(column_count)
+    })
+
+
+def _extend_to_merged(
+    row_count: int,
+    column_count: int,
+    merged_cells: List[Tuple[int, int, int, int]]
+) -> Tuple[int, int]:
+    """行列数扩展到包含所有合并区域"""
+    for _, _, end_row, end_col in merged_cells:
+        row_count = max(row_count, end_row + 1)
+        column_count = max(column_count, end_col + 1)
+    return row_count, column_count
+
+
+def _read_sheet_drawings(archive, worksheet_path: str) -> Tuple[List[dict], List[dict]]:
+    """图片和图表位于Sheet关联的绘图部件中，只读取这些小的XML部件"""
+    sheet_images = []
+    sheet_charts = []
+    rels_path = get_rels_path(worksheet_path)
+    if rels_path in archive.namelist():
+        rels = get_dependents(archive, rels_path)
+        for rel in rels.find(SpreadsheetDrawing._rel_type):
+            charts, images = find_images(archive, rel.target)
+            sheet_charts.extend(charts)
+            sheet_images.extend(images)
+    return _collect_images(sheet_images), _collect_charts(sheet_charts)
+
+
+def _stream_native_sheet(reader: XlsxReader, idx: int) -> dict:
+    """使用原生读取器流式解析一个Sheet，字段含义与 _stream_xlsx_sheet 相同"""
+    sheet = reader.sheets[idx]
+    sheet_info = {
+        "name": sheet.name,
+        "index": idx,
+        "row_count": 0,
+        "column_count": 0,
+        "cells": iter(()),
+        "merged_cells": [],
+        "images": [],
+        "charts": [],
+        "table_regions": []
+    }
+    if sheet.path is not None:
+        sheet_info["cells"] = _iter_native_cells(reader, sheet, sheet_info)
+    return sheet_info
+
+
+def _iter_native_cells(reader: XlsxReader, sheet: XlsxSheet, sheet_info: dict) -> Iterator[Tuple[int, int, object]]:
+    detector = TableRegionDetector()
+    row_count = 0
+    column_count = 0
+    for row_idx, values in sheet.rows():
+        row_count = row_idx + 1
+        column_count = max(column_count, values[-1][0] + 1)
+        detector.add_row(row_idx, (value for _, value in values))
+        for col_idx, value in values:
+            if value is not None:
+                yield row_idx, col_idx, value
+
+    row_count, column_count = _extend_to_merged(row_count, column_count, sheet.merged_cells)
+    images, charts = _read_sheet_drawings(reader.archive, sheet.path)
+    sheet_info.update({
+        "row_count": row_count,
+        "column_count": column_count,
+        "merged_cells": sheet.merged_cells,
+        "images": images,
+        "charts": charts,
+        "table_regions": detector.finish(column_count)
+    })
+
+
+# BIFF 记录类型
+XL_BOF_CODES = (0x0809, 0x0409, 0x0209, 0x0009)
+XL_EOF = 0x000A
+XL_DIMENSIONS = 0x0200
+XL_MERGEDCELLS = 0x00E5
+
+
+def _scan_xls_sheet_records(workbook, idx: int) -> Tuple[List[Tuple[int, int, int, int]], int, int]:
+    """直接扫描Sheet的 BIFF8 记录流，读取合并单元格和已用区域大小，不需要加载格式信息
+    返回 (合并单元格, 行数, 列数)，合并单元格为 (起始行, 起始列, 结束行, 结束列)，结束位置为包含的索引；
+    已用区域包含只有格式的空单元格，与加载格式信息时 xlrd 给出的行列数一致
+    """
+    mem = workbook.mem
+    pos = workbook._sh_abs_posn[idx]
+    depth = 0
+    merged_cells = []
+    row_count = column_count = 0
+    while pos + 4 <= len(mem):
+        code, length = unpack_from("<HH", mem, pos)
+        data_pos = pos + 4
+        pos = data_pos + length
+        if code in XL_BOF_CODES:
+            # Sheet内嵌的图表等子流也以 BOF/EOF 包围
+            depth += 1
+        elif code == XL_EOF:
+            depth -= 1
+            if depth <= 0:
+                break
+        elif depth != 1:
+            continue
+        elif code == XL_DIMENSIONS and length >= 12:
+            _, row_count, _, column_count = unpack_from("<IIHH", mem, data_pos)
+        elif code == XL_MERGEDCELLS:
+            count = unpack_from("<H", mem, data_pos)[0]
+            for i in range(count):
+                row_start, row_end, col_start, col_end = unpack_from("<HHHH", mem, data_pos + 2 + 8 * i)
+                merged_cells.append((row_start, col_start, row_end, col_end))
+    return merged_cells, row_count, column_count
+
+
+def _stream_xls_sheet(workbook, idx: int) -> dict:
+    """流式解析.xls工作簿中的一个Sheet，cells 为生成器，表格区域在遍历结束后填入"""
+    sheet = workbook.sheet_by_index(idx)
+    row_count, column_count = sheet.nrows, sheet.ncols
+
+    # 收集合并单元格信息
+    merged_cells = []
+    if workbook.formatting_info:
+        for merged_range in sheet.merged_cells:
+            # xlrd的格式是 (row_start, row_end, col_start, col_end)
+            # 其中end是不包含的
+            row_start, row_end, col_start, col_end = merged_range
+            merged_cells.append((
+                row_start,
+                col_start,
+                row_end - 1,  # 转换为包含的索引
+                col_end - 1
+            ))
+    else:
+        merged_cells, used_rows, used_cols = _scan_xls_sheet_records(workbook, idx)
+        row_count = max(row_count, used_rows)
+        column_count = max(column_count, used_cols)
+
+    sheet_info = {
+        "name": sheet.name,
+        "index": idx,
+        "row_count": row_count,
+        "column_count": column_count,
+        "cells": None,
+        "merged_cells": merged_cells,
+        "images": [],  # xls格式图片提取较复杂，暂不支持
+        "charts": [],  # xls格式图表提取较复杂，暂不支持
+        "table_regions": []
+    }
+    sheet_info["cells"] = _iter_xls_cells(workbook, sheet, idx, sheet_info)
+    return sheet_info
+
+
+def _iter_xls_cells(workbook, sheet, idx: int, sheet_info: dict) -> Iterator[Tuple[int, int, object]]:
+    """一次遍历每行的值，同时产生单元格和检测表格区域"""
+    detector = TableRegionDetector()
+    datemode = workbook.datemode
+    for row_idx in range(sheet.nrows):
+        values = sheet.row_values(row_idx)
+        detector.add_row(row_idx, values)
+        types = sheet.row_types(row_idx)
+        for col_idx, value in enumerate(values):
+            if value != "":
+                # 日期和布尔值在 .xls 中存为数字，按单元格类型还原，与 .xlsx 的解析结果一致
+                cell_type = types[col_idx]
+                if cell_type == xlrd.XL_CELL_DATE:
+                    try:
+                        value = xlrd.xldate.xldate_as_datetime(value, datemode)
+                    except xlrd.xldate.XLDateError:
+                        pass
+                elif cell_type == xlrd.XL_CELL_BOOLEAN:
+                    value = bool(value)
+                yield row_idx, col_idx, value
+    sheet_info["table_regions"] = detector.finish(sheet_info["column_count"])
+    # on_demand 模式下释放已处理完的Sheet
+    workbook.unload_sheet(idx)
+
+
+def _materialize(sheet_info: dict) -> dict:
+    """把流式解析的Sheet展开为完整的字典（cells 为列表）"""
+    sheet_info["cells"] = list(sheet_info["cells"])
+    return sheet_info
+
+
+def _open_xlsx_read_only(file_path: str):
+    return openpyxl.load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+
+
+def _open_xls_on_demand(file_path: str):
+    # on_demand 模式只在访问时加载对应Sheet；不加载格式信息，合并单元格直接从记录流读取
+    workbook = xlrd.open_workbook(file_path, on_demand=True)
+    if workbook.biff_version < 80:
+        # BIFF8 之前的旧格式仍由 xlrd 读取合并单元格，需要格式信息
+        workbook.release_resources()
+        workbook = xlrd.open_workbook(file_path, formatting_info=True, on_demand=True)
+    return workbook
+
+
+def iter_xlsx(
+    file_path: str,
+    on_sheet: Optional[ProgressCallback] = None,
+    engine: str = XLSX_ENGINE
+) -> Iterator[dict]:
+    """流式解析.xlsx文件，支持合并单元格、图片和图表
+    engine: native 直接读取压缩包中的XML；openpyxl 使用 openpyxl 只读模式
+    需在取下一个Sheet之前遍历完当前Sheet的 cells
+    """
+    open_workbook, stream_sheet = xlsx_engine(engine)
+    workbook = open_workbook(file_path)
+    try:
+        total = len(workbook.sheetnames)
+        for idx in range(total):
+            if on_sheet:
+                on_sheet(idx, total)
+            yield stream_sheet(workbook, idx)
+    finally:
+        workbook.close()
+
+
+def iter_xls(file_path: str, on_sheet: Optional[ProgressCallback] = None) -> Iterator[dict]:
+    """流式解析.xls文件，支持合并单元格"""
+    workbook = _open_xls_on_demand(file_path)
+    try:
+        for idx in range(workbook.nsheets):
+            if on_sheet:
+                on_sheet(idx, workbook.nsheets)
+            yield _stream_xls_sheet(workbook, idx)
+    finally:
+        workbook.release_resources()
+
+
+def parse_xlsx(
+    file_path: str,
+    on_sheet: Optional[ProgressCallback] = None,
+    engine: str = XLSX_ENGINE
+) -> List[dict]:
+    """解析.xlsx文件，一次性返回所有Sheet"""
+    return [_materialize(sheet_info) for sheet_info in iter_xlsx(file_path, on_sheet, engine)]
+
+
+def parse_xls(file_path: str, on_sheet: Optional[ProgressCallback] = None) -> List[dict]:
+    """解析.xls文件，一次性返回所有Sheet"""
+    return [_materialize(sheet_info) for sheet_info in iter_xls(file_path, on_sheet)]
+
+
+# .xlsx 解析引擎: (打开工作簿, 流式解析单个Sheet)
+_XLSX_ENGINES = {
+    "native": (XlsxReader, _stream_native_sheet),
+    "openpyxl": (_open_xlsx_read_only, _stream_xlsx_sheet),
+}
+
+
+
+def xlsx_engine(name: str) -> tuple:
+    """按名称取 .xlsx 解析引擎，名称未知时抛出 ValueError"""
+    try:
+        return _XLSX_ENGINES[name]
+    except KeyError:
+        raise ValueError(f"未知的 .xlsx 解析引擎 {name!r}，可选: {', '.join(_XLSX_ENGINES)}") from None
+
+
+# 按Sheet并行解析时使用的 (打开工作簿, 流式解析单个Sheet) 函数；
+# 导入时校验 XLSX_ENGINE，配置错误时服务启动失败，不会静默改用其他引擎
+_SHEET_READERS = {
+    ".xlsx": xlsx_engine(XLSX_ENGINE),
+    ".xls": (_open_xls_on_demand, _stream_xls_sheet),
+}
+
+# 并行解析进程中打开的工作簿，每个进程只打开一次
+_worker_workbook = None
+_worker_read_sheet = None
+
+
+def _init_sheet_worker(file_path: str, ext: str) -> None:
+    global _worker_workbook, _worker_read_sheet
+    open_workbook, _worker_read_sheet = _SHEET_READERS[ext]
+    _worker_workbook = open_workbook(file_path)
+
+
+def _parse_sheet_in_worker(idx: int) -> dict:
+    # 结果需要传回主进程，展开为完整的字典
+    return _materialize(_worker_read_sheet(_worker_workbook, idx))
+
+
+def _close_workbook(workbook, ext: str) -> None:
+    if ext == ".xlsx":
+        workbook.close()
+    else:
+        workbook.release_resources()
+
+
+def _sheet_sizes(file_path: str, ext: str) -> List[int]:
+    """各Sheet数据的未压缩字节数，用于估计整张Sheet展开后的内存占用"""
+    open_workbook, _ = _SHEET_READERS[ext]
+    workbook = open_workbook(file_path)
+    try:
+        if ext == ".xls":
+            # on_demand 模式下记录了各Sheet在工作簿流中的起始位置
+            starts = workbook._sh_abs_posn
+            ends = starts[1:] + [len(workbook.mem)]
+            return [end - start for start, end in zip(starts, ends)]
+        if isinstance(workbook, XlsxReader):
+            archive = workbook.archive
+            paths = [sheet.path for sheet in workbook.sheets]
+        else:
+            archive = workbook._archive
+            paths = [getattr(workbook[name], "_worksheet_path", None) for name in workbook.sheetnames]
+        # 图表Sheet没有单元格数据
+        return [archive.getinfo(path).file_size if path else 0 for path in paths]
+    finally:
+        _close_workbook(workbook, ext)
+
+
+def iter_sheets_parallel(
+    file_path: str,
+    ext: str,
+    workers: int,
+    on_sheet: Optional[ProgressCallback] = None,
+    max_sheet_bytes: int = PARSE_PARALLEL_MAX_SHEET_MB * 1024 * 1024
+) -> Iterator[dict]:
+    """按Sheet并行解析：每个进程各自打开文件，只解析分配给它的Sheet
+    结果按Sheet顺序逐个返回，调用方可以边接收边入库；
+    最多同时保留 2 倍进程数的已提交任务，避免结果在内存中堆积
+
+    子进程的结果需要整体序列化传回主进程，每个Sheet都会完整展开，内存占用与Sheet大小成正比；
+    数据超过 max_sheet_bytes 的Sheet不交给子进程，轮到它时在当前进程中流式解析，
+    此时子进程继续解析后面的小Sheet
+    """
+    sizes = _sheet_sizes(file_path, ext)
+    total = len(sizes)
+    parallel = deque(idx for idx, size in enumerate(sizes) if size <= max_sheet_bytes)
+    if not parallel:
+        yield from iter_workbook(file_path, ext, on_sheet, workers=1)
+        return
+
+    open_workbook, stream_sheet = _SHEET_READERS[ext]
+    workbook = None
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(parallel)),
+        initializer=_init_sheet_worker,
+        initargs=(file_path, ext)
+    ) as executor:
+        window = max(workers, 1) * 2
+        futures = {}
+        try:
+            for idx in range(total):
+                while parallel and len(futures) < window:
+                    next_idx = parallel.popleft()
+                    futures[next_idx] = executor.submit(_parse_sheet_in_worker, next_idx)
+                if on_sheet:
+                    on_sheet(idx, total)
+                future = futures.pop(idx, None)
+                if future is not None:
+                    yield future.result()
+                    continue
+                if workbook is None:
+                    workbook = open_workbook(file_path)
+                yield stream_sheet(workbook, idx)
+        finally:
+            if workbook is not None:
+                _close_workbook(workbook, ext)
+
+
+def iter_workbook(
+    file_path: str,
+    ext: str,
+    on_sheet: Optional[ProgressCallback] = None,
+    workers: int = PARSE_WORKERS
+) -> Iterator[dict]:
+    """逐个返回解析后的Sheet，调用方需在取下一个Sheet之前遍历完 cells
+    workers 大于 1 时按Sheet并行解析，否则在当前进程中流式解析
+    """
+    if workers > 1:
+        return iter_sheets_parallel(file_path, ext, workers, on_sheet)
+    if ext == ".xlsx":
+        return iter_xlsx(file_path, on_sheet)
+    return iter_xls(file_path, on_sheet)
@@ -1,419 +1,83 @@
 import os
-import base64
-from io import BytesIO
-from typing import List, Tuple, Optional
+import json
+from itertools import groupby
+from operator import attrgetter
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple
 from urllib.parse import quote
 
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query
-from fastapi.responses import StreamingResponse, Response
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse, Response
 from sqlalchemy.orm import Session
-import openpyxl
-from openpyxl.drawing.image import Image as OpenpyxlImage
-from openpyxl.chart import BarChart, LineChart, PieChart, AreaChart, ScatterChart
-import xlrd
-
-from ..database import get_db
-from ..config import MAX_FILE_SIZE, ALLOWED_EXTENSIONS, MAX_PAGE_SIZE, DEFAULT_PAGE_SIZE, MAX_LIST_LIMIT
-from .. import crud, schemas, models
+from starlette.requests import Request
+
+from ..database import get_db, SessionLocal
+from ..config import MAX_PAGE_SIZE, DEFAULT_PAGE_SIZE, MAX_LIST_LIMIT
+from .. import crud, schemas, models, ingest, row_blocks, wire, http_cache, thumbnails, spatial, sheet_query, aggregation
 from ..auth import get_current_user
+from ..uploads import receive_upload
+from ..blobstore import get_blob_store
+from ..cache import sheet_meta_cache, sheet_index_cache, aggregate_cache
+from ..http_cache import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL
 
 router = APIRouter(prefix="/api", tags=["excel"])
 
 
+# NDJSON 响应攒够该字节数再发送一次
+NDJSON_FLUSH_SIZE = 64 * 1024
+# 下载保存在数据库中的旧数据时每次截取的字节数
+LEGACY_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
 def get_file_extension(filename: str) -> str:
     """获取文件扩展名"""
     return os.path.splitext(filename)[1].lower()
 
 
-def detect_table_regions(rows: List[List], column_count: int) -> List[Tuple[int, int, int, int, int, int, str]]:
-    """
-    检测单个Sheet内的多个表格区域
-    通过识别空行来分割不同的表格
-    返回: List of (region_index, start_row, start_col, end_row, end_col, header_rows, table_name)
-    """
-    if not rows:
-        return []
-
-    regions = []
-    current_start = None
-    region_index = 0
-
-    for row_idx, row in enumerate(rows):
-        # 检查这一行是否全为空
-        is_empty_row = all(cell is None or str(cell).strip() == "" for cell in row)
-
-        if is_empty_row:
-            # 如果当前有活跃的表格区域，结束它
-            if current_start is not None:
-                end_row = row_idx - 1
-                if end_row >= current_start:
-                    # 尝试从第一个非空单元格获取表格名称
-                    table_name = None
-                    first_row = rows[current_start]
-                    for cell in first_row:
-                        if cell is not None and str(cell).strip():
-                            table_name = str(cell).strip()[:50]  # 限制长度
-                            break
-
-                    regions.append((
-                        region_index,
-                        current_start,
-                        0,
-                        end_row,
-                        column_count - 1,
-                        1,  # 默认1行表头
-                        table_name
-                    ))
-                    region_index += 1
-                current_start = None
-        else:
-            # 如果还没有开始新区域，标记开始
-            if current_start is None:
-                current_start = row_idx
-
-    # 处理最后一个区域
-    if current_start is not None:
-        end_row = len(rows) - 1
-        table_name = None
-        first_row = rows[current_start]
-        for cell in first_row:
-            if cell is not None and str(cell).strip():
-                table_name = str(cell).strip()[:50]
-                break
-
-        regions.append((
-            region_index,
-            current_start,
-            0,
-            end_row,
-            column_count - 1,
-            1,
-            table_name
-        ))
-
-    # 如果只检测到一个区域，说明整个Sheet就是一个表格，不需要特别标记
-    if len(regions) == 1:
-        return []
-
-    return regions
-
-
-def get_chart_type_name(chart) -> str:
-    """获取图表类型名称"""
-    chart_type_map = {
-        'BarChart': 'bar',
-        'BarChart3D': 'bar3d',
-        'LineChart': 'line',
-        'LineChart3D': 'line3d',
-        'PieChart': 'pie',
-        'PieChart3D': 'pie3d',
-        'AreaChart': 'area',
-        'AreaChart3D': 'area3d',
-        'ScatterChart': 'scatter',
-        'RadarChart': 'radar',
-        'DoughnutChart': 'doughnut',
-        'BubbleChart': 'bubble',
-        'StockChart': 'stock',
-        'SurfaceChart': 'surface',
-        'SurfaceChart3D': 'surface3d',
-    }
-    return chart_type_map.get(type(chart).__name__, 'unknown')
-
-
-def extract_chart_data(chart) -> Optional[dict]:
-    """提取图表数据"""
-    try:
-        chart_data = {
-            'title': chart.title.text if chart.title else None,
-            'series': []
-        }
-
-        for series in chart.series:
-            series_info = {
-                'title': str(series.title) if series.title else None,
+@router.post(
+    "/upload",
+    response_model=schemas.UploadResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"]
+                    }
+                }
             }
-            chart_data['series'].append(series_info)
-
-        return chart_data
-    except Exception:
-        return None
-
-
-def parse_xlsx(file_data: bytes) -> List[dict]:
-    """解析.xlsx文件，支持合并单元格、图片和图表"""
-    # 使用非只读模式以获取合并单元格、图片和图表信息
-    workbook = openpyxl.load_workbook(BytesIO(file_data), data_only=True)
-    sheets_data = []
-
-    for idx, sheet_name in enumerate(workbook.sheetnames):
-        sheet = workbook[sheet_name]
-
-        # 获取所有行数据
-        rows = []
-        for row in sheet.iter_rows(values_only=True):
-            rows.append(list(row))
-
-        # 计算实际行列数
-        row_count = len(rows)
-        column_count = max((len(row) for row in rows), default=0) if rows else 0
-
-        # 收集单元格数据
-        cells = []
-        for row_idx, row in enumerate(rows):
-            for col_idx, value in enumerate(row):
-                if value is not None:
-                    cells.append((row_idx, col_idx, value))
-
-        # 收集合并单元格信息
-        merged_cells = []
-        for merged_range in sheet.merged_cells.ranges:
-            merged_cells.append((
-                merged_range.min_row - 1,  # 转换为0索引
-                merged_range.min_col - 1,
-                merged_range.max_row - 1,
-                merged_range.max_col - 1
-            ))
-
-        # 收集图片信息
-        images = []
-        if hasattr(sheet, '_images'):
-            for img in sheet._images:
-                try:
-                    # 获取图片数据
-                    img_data = img._data() if callable(img._data) else img._data
-                    # 获取锚定位置
-                    anchor_row = 0
-                    anchor_col = 0
-                    if hasattr(img, 'anchor'):
-                        if hasattr(img.anchor, '_from'):
-                            anchor_row = img.anchor._from.row
-                            anchor_col = img.anchor._from.col
-                        elif hasattr(img.anchor, 'row'):
-                            anchor_row = img.anchor.row
-                            anchor_col = img.anchor.col
-
-                    # 获取图片格式
-                    img_format = 'png'
-                    if hasattr(img, 'format'):
-                        img_format = img.format.lower()
-                    elif hasattr(img, 'path') and img.path:
-                        img_format = os.path.splitext(img.path)[1].lstrip('.').lower() or 'png'
-
-                    # 获取尺寸
-                    width = int(img.width) if hasattr(img, 'width') and img.width else None
-                    height = int(img.height) if hasattr(img, 'height') and img.height else None
-
-                    images.append({
-                        'data': img_data,
-                        'format': img_format,
-                        'anchor_row': anchor_row,
-                        'anchor_col': anchor_col,
-                        'width': width,
-                        'height': height
-                    })
-                except Exception:
-                    continue
-
-        # 收集图表信息
-        charts = []
-        if hasattr(sheet, '_charts'):
-            for chart in sheet._charts:
-                try:
-                    anchor_row = 0
-                    anchor_col = 0
-                    if hasattr(chart, 'anchor'):
-                        if hasattr(chart.anchor, '_from'):
-                            anchor_row = chart.anchor._from.row
-                            anchor_col = chart.anchor._from.col
-
-                    chart_type = get_chart_type_name(chart)
-                    chart_title = chart.title.text if chart.title else None
-                    chart_data = extract_chart_data(chart)
-
-                    # 获取图表尺寸
-                    width = int(chart.width * 96) if hasattr(chart, 'width') else None  # 转换为像素
-                    height = int(chart.height * 96) if hasattr(chart, 'height') else None
-
-                    charts.append({
-                        'type': chart_type,
-                        'title': chart_title,
-                        'data': chart_data,
-                        'anchor_row': anchor_row,
-                        'anchor_col': anchor_col,
-                        'width': width,
-                        'height': height
-                    })
-                except Exception:
-                    continue
-
-        # 检测多表格区域
-        table_regions = detect_table_regions(rows, column_count)
-
-        sheets_data.append({
-            "name": sheet_name,
-            "index": idx,
-            "row_count": row_count,
-            "column_count": column_count,
-            "cells": cells,
-            "merged_cells": merged_cells,
-            "images": images,
-            "charts": charts,
-            "table_regions": table_regions
-        })
-
-    workbook.close()
-    return sheets_data
-
-
-def parse_xls(file_data: bytes) -> List[dict]:
-    """解析.xls文件，支持合并单元格"""
-    workbook = xlrd.open_workbook(file_contents=file_data, formatting_info=True)
-    sheets_data = []
-
-    for idx in range(workbook.nsheets):
-        sheet = workbook.sheet_by_index(idx)
-
-        # 收集所有行数据用于表格区域检测
-        rows = []
-        for row_idx in range(sheet.nrows):
-            row = []
-            for col_idx in range(sheet.ncols):
-                value = sheet.cell_value(row_idx, col_idx)
-                row.append(value if value != "" else None)
-            rows.append(row)
-
-        # 收集单元格数据
-        cells = []
-        for row_idx in range(sheet.nrows):
-            for col_idx in range(sheet.ncols):
-                value = sheet.cell_value(row_idx, col_idx)
-                if value != "":
-                    cells.append((row_idx, col_idx, value))
-
-        # 收集合并单元格信息
-        merged_cells = []
-        for merged_range in sheet.merged_cells:
-            # xlrd的格式是 (row_start, row_end, col_start, col_end)
-            # 其中end是不包含的
-            row_start, row_end, col_start, col_end = merged_range
-            merged_cells.append((
-                row_start,
-                col_start,
-                row_end - 1,  # 转换为包含的索引
-                col_end - 1
-            ))
-
-        # 检测多表格区域
-        table_regions = detect_table_regions(rows, sheet.ncols)
-
-        sheets_data.append({
-            "name": sheet.name,
-            "index": idx,
-            "row_count": sheet.nrows,
-            "column_count": sheet.ncols,
-            "cells": cells,
-            "merged_cells": merged_cells,
-            "images": [],  # xls格式图片提取较复杂，暂不支持
-            "charts": [],  # xls格式图表提取较复杂，暂不支持
-            "table_regions": table_regions
-        })
-
-    return sheets_data
-
-
-@router.post("/upload", response_model=schemas.UploadResponse)
+        }
+    }
+)
 async def upload_file(
-    file: UploadFile = File(...),
+    request: Request,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    """上传Excel文件"""
-    # 检查文件扩展名
-    ext = get_file_extension(file.filename)
-    if ext not in ALLOWED_EXTENSIONS:
-        raise HTTPException(status_code=400, detail=f"不支持的文件格式，仅支持: {', '.join(ALLOWED_EXTENSIONS)}")
-
-    # 读取文件内容
-    file_data = await file.read()
-    file_size = len(file_data)
+    """上传Excel文件：流式写入暂存文件，解析在后台进程中进行"""
+    if ingest.queue_is_full():
+        raise HTTPException(status_code=503, detail="解析队列已满，请稍后再试")
 
-    # 检查文件大小
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail=f"文件大小超出限制（最大{MAX_FILE_SIZE // 1024 // 1024}MB）")
+    # 边接收边检查大小和扩展名，并计算 SHA-256
+    upload = await receive_upload(request)
 
-    # 解析Excel
+    # 提交解析任务（数据库操作放到线程池，避免阻塞事件循环）
     try:
-        if ext == ".xlsx":
-            sheets_data = parse_xlsx(file_data)
-        else:
-            sheets_data = parse_xls(file_data)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Excel文件解析失败: {str(e)}")
-
-    # 保存文件信息
-    db_file = crud.create_excel_file(
-        db=db,
-        filename=file.filename,
-        file_data=file_data,
-        file_size=file_size,
-        sheet_count=len(sheets_data),
-        user_id=current_user.id
-    )
-
-    # 保存Sheet和数据
-    for sheet_info in sheets_data:
-        db_sheet = crud.create_excel_sheet(
-            db=db,
-            file_id=db_file.id,
-            sheet_name=sheet_info["name"],
-            sheet_index=sheet_info["index"],
-            row_count=sheet_info["row_count"],
-            column_count=sheet_info["column_count"]
-        )
-
-        # 批量保存单元格数据
-        if sheet_info["cells"]:
-            crud.bulk_create_excel_data(db, db_sheet.id, sheet_info["cells"])
-
-        # 批量保存合并单元格信息
-        if sheet_info.get("merged_cells"):
-            crud.bulk_create_merged_cells(db, db_sheet.id, sheet_info["merged_cells"])
-
-        # 保存图片
-        for img_info in sheet_info.get("images", []):
-            crud.create_sheet_image(
-                db=db,
-                sheet_id=db_sheet.id,
-                image_data=img_info["data"],
-                image_format=img_info["format"],
-                anchor_row=img_info["anchor_row"],
-                anchor_col=img_info["anchor_col"],
-                width=img_info.get("width"),
-                height=img_info.get("height")
-            )
-
-        # 保存图表
-        for chart_info in sheet_info.get("charts", []):
-            crud.create_sheet_chart(
-                db=db,
-                sheet_id=db_sheet.id,
-                chart_type=chart_info["type"],
-                anchor_row=chart_info["anchor_row"],
-                anchor_col=chart_info["anchor_col"],
-                chart_title=chart_info.get("title"),
-                chart_data=chart_info.get("data"),
-                width=chart_info.get("width"),
-                height=chart_info.get("height")
-            )
-
-        # 保存表格区域
-        if sheet_info.get("table_regions"):
-            crud.bulk_create_table_regions(db, db_sheet.id, sheet_info["table_regions"])
+        job = await run_in_threadpool(ingest.enqueue_upload, db, current_user.id, upload)
+    except ingest.IngestQueueFull:
+        raise HTTPException(status_code=503, detail="解析队列已满，请稍后再试")
+    except Exception:
+        upload.discard()
+        raise
 
     return schemas.UploadResponse(
-        id=db_file.id,
-        filename=db_file.filename,
-        message="上传成功"
+        job_id=job.id,
+        filename=job.filename,
+        status=job.status,
+        message="上传成功，正在后台解析"
     )
 
 
@@ -445,137 +109,700 @@ def get_file_detail(
     return schemas.FileDetail.model_validate(db_file)
 
 
-@router.get("/files/{file_id}/sheets/{sheet_id}/data", response_model=schemas.SheetDataResponse)
-def get_sheet_data(
-    file_id: int,
-    sheet_id: int,
-    page: int = Query(1, ge=1),
-    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
-):
-    """获取Sheet数据（分页），包含合并单元格、图片、图表和表格区域信息"""
-    # 验证文件存在
-    db_file = crud.get_file_by_id(db, file_id, user_id=current_user.id)
-    if not db_file:
-        raise HTTPException(status_code=404, detail="文件不存在")
+class Viewport(NamedTuple):
+    """一次查询的窗口：行 [start_row, end_row)、列 [start_col, end_col)
+    排序或筛选时 rows 为当前页按顺序排列的行号（取自 [start_row, end_row) 范围），matched_rows 为匹配的行数
+    """
+    page: int
+    start_row: int
+    end_row: int
+    start_col: int
+    end_col: int
+    next_after_row: Optional[int]
+    rows: Optional[List[int]] = None
+    matched_rows: Optional[int] = None
+
+
+def _sheet_bounds(db: Session, db_sheet: models.ExcelSheet, region_id: Optional[int]) -> Tuple[int, int, int, int]:
+    """可查询的范围 (起始行, 结束行, 起始列, 结束列)，不含结束位置；指定表格区域时为区域与Sheet的交集"""
+    row_lo, row_hi = 0, db_sheet.row_count
+    col_lo, col_hi = 0, db_sheet.column_count
+    if region_id is not None:
+        region = crud.get_sheet_table_region(db, db_sheet.id, region_id)
+        if not region:
+            raise HTTPException(status_code=404, detail="表格区域不存在")
+        row_lo, row_hi = region.start_row, min(region.end_row + 1, row_hi)
+        col_lo, col_hi = region.start_col, min(region.end_col + 1, col_hi)
+    return row_lo, row_hi, col_lo, col_hi
+
+
+def _column_window(col_lo: int, col_hi: int, col_start: Optional[int], col_end: Optional[int]) -> Tuple[int, int]:
+    """请求的列范围（col_end 包含在内）与可查询范围的交集 [起始列, 结束列)"""
+    start_col = max(col_start, col_lo) if col_start is not None else col_lo
+    end_col = min(col_end + 1, col_hi) if col_end is not None else col_hi
+    return start_col, max(end_col, start_col)
+
+
+def _parse_filters(filter_texts: List[str]) -> List[sheet_query.CellFilter]:
+    try:
+        return [sheet_query.parse_filter(text) for text in filter_texts]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _sorted_viewport(
+    db: Session,
+    db_sheet: models.ExcelSheet,
+    page: int,
+    page_size: int,
+    col_start: Optional[int],
+    col_end: Optional[int],
+    region_id: Optional[int],
+    sort_by: Optional[int],
+    descending: bool,
+    filters: List[sheet_query.CellFilter]
+) -> Viewport:
+    """排序或筛选时的窗口：对表头行之后的全部数据行排序筛选后按 page 分页"""
+    row_lo, row_hi, col_lo, col_hi = _sheet_bounds(db, db_sheet, region_id)
+    columns = [f.column for f in filters] + ([sort_by] if sort_by is not None else [])
+    if any(not col_lo <= col_idx < col_hi for col_idx in columns):
+        raise HTTPException(status_code=400, detail="排序或筛选的列超出范围")
+
+    header_row = _header_row(db, db_sheet, region_id)
+    start_row = min(header_row + 1 if header_row is not None else row_lo, row_hi)
+    matched_rows, rows = crud.query_sheet_rows(
+        db, db_sheet.id, start_row, row_hi, filters, sort_by, descending,
+        offset=(page - 1) * page_size, limit=page_size, storage_mode=db_sheet.storage_mode
+    )
+    start_col, end_col = _column_window(col_lo, col_hi, col_start, col_end)
+    return Viewport(
+        page=page,
+        start_row=start_row,
+        end_row=row_hi,
+        start_col=start_col,
+        end_col=end_col,
+        next_after_row=None,
+        rows=rows,
+        matched_rows=matched_rows
+    )
 
-    # 验证Sheet存在且属于该文件
-    db_sheet = crud.get_sheet_by_id(db, sheet_id)
-    if not db_sheet or db_sheet.file_id != file_id:
-        raise HTTPException(status_code=404, detail="Sheet不存在")
 
-    # 获取分页数据
-    data_records, total_rows = crud.get_sheet_data(db, sheet_id, page, page_size)
+def _resolve_viewport(
+    db: Session,
+    db_sheet: models.ExcelSheet,
+    page: int,
+    page_size: int,
+    after_row: Optional[int],
+    row_start: Optional[int],
+    row_end: Optional[int],
+    col_start: Optional[int],
+    col_end: Optional[int],
+    region_id: Optional[int],
+    sort_by: Optional[int] = None,
+    descending: bool = False,
+    filters: Optional[List[sheet_query.CellFilter]] = None
+) -> Viewport:
+    """计算查询窗口
+    行范围优先使用 row_start/row_end，其次 after_row 游标，最后按 page 分页（指定区域时页码从区域第一行算起）；
+    一次最多 MAX_PAGE_SIZE 行，行列范围都限制在Sheet（或表格区域）内
+    指定排序或筛选时只能按 page 分页，见 _sorted_viewport
+    """
+    if sort_by is not None or filters:
+        if row_start is not None or row_end is not None or after_row is not None:
+            raise HTTPException(
+                status_code=400, detail="排序或筛选时不支持 row_start/row_end/after_row，请使用 page 分页"
+            )
+        return _sorted_viewport(
+            db, db_sheet, page, page_size, col_start, col_end, region_id, sort_by, descending, filters or []
+        )
 
-    # 将数据转换为二维数组格式
-    # 首先确定列数
-    column_count = db_sheet.column_count
+    row_lo, row_hi, col_lo, col_hi = _sheet_bounds(db, db_sheet, region_id)
 
-    # 生成表头（第一行数据或列索引）
-    headers = []
-    if total_rows > 0:
-        # 获取第一行作为表头
-        header_cells = {d.column_index: d.cell_value for d in data_records if d.row_index == 0}
-        if header_cells:
-            headers = [header_cells.get(i, f"列{i+1}") or f"列{i+1}" for i in range(column_count)]
-        else:
-            headers = [f"列{i+1}" for i in range(column_count)]
+    if row_start is not None or row_end is not None:
+        start_row = max(row_start, row_lo) if row_start is not None else row_lo
+        end_row = row_end + 1 if row_end is not None else start_row + page_size
+        end_row = min(end_row, start_row + MAX_PAGE_SIZE)
+    elif after_row is not None:
+        start_row = max(after_row + 1, row_lo)
+        end_row = start_row + page_size
     else:
-        headers = [f"列{i+1}" for i in range(column_count)]
+        start_row = row_lo + (page - 1) * page_size
+        end_row = start_row + page_size
+    page = (start_row - row_lo) // page_size + 1
+    end_row = max(min(end_row, row_hi), start_row)
+
+    start_col, end_col = _column_window(col_lo, col_hi, col_start, col_end)
+    return Viewport(
+        page=page,
+        start_row=start_row,
+        end_row=end_row,
+        start_col=start_col,
+        end_col=end_col,
+        next_after_row=end_row - 1 if end_row < row_hi else None
+    )
 
-    # 组织数据为二维数组
+
+def _dense_rows(data_records: List[Any], viewport: Viewport) -> Tuple[List[int], List[List[Any]]]:
+    """将窗口内的数据转换为二维数组，只包含有数据的行（排序或筛选时包含当前页的全部行），空单元格补空字符串
+    返回 (各行的行号, 行数据)，每行只包含窗口内的列
+    """
     data_dict = {}
     for record in data_records:
         if record.row_index not in data_dict:
             data_dict[record.row_index] = {}
         data_dict[record.row_index][record.column_index] = record.cell_value
 
-    # 转换为列表格式
+    columns = range(viewport.start_col, viewport.end_col)
+    if viewport.rows is not None:
+        rows = [[data_dict.get(row_idx, {}).get(col_idx, "") for col_idx in columns] for row_idx in viewport.rows]
+        return list(viewport.rows), rows
+
+    row_indexes = []
     rows = []
-    start_row = (page - 1) * page_size
-    for row_idx in range(start_row, min(start_row + page_size, total_rows + 1)):
+    for row_idx in range(viewport.start_row, viewport.end_row):
         if row_idx in data_dict:
-            row = [data_dict[row_idx].get(col_idx, "") for col_idx in range(column_count)]
-            rows.append(row)
-
-    # 获取合并单元格信息
-    merged_cells = crud.get_sheet_merged_cells(db, sheet_id)
-    merged_cells_info = [
-        schemas.MergedCellInfo(
-            start_row=mc.start_row,
-            start_col=mc.start_col,
-            end_row=mc.end_row,
-            end_col=mc.end_col
-        )
-        for mc in merged_cells
-    ]
-
-    # 获取图片信息（不包含二进制数据，只返回元信息）
-    images = crud.get_sheet_images(db, sheet_id)
-    images_info = [
-        schemas.ImageInfo(
-            id=img.id,
-            image_format=img.image_format,
-            anchor_row=img.anchor_row,
-            anchor_col=img.anchor_col,
-            width=img.width,
-            height=img.height
-        )
-        for img in images
-    ]
-
-    # 获取图表信息
-    charts = crud.get_sheet_charts(db, sheet_id)
-    charts_info = [
-        schemas.ChartInfo(
-            id=chart.id,
-            chart_type=chart.chart_type,
-            chart_title=chart.chart_title,
-            chart_data=chart.chart_data,
-            anchor_row=chart.anchor_row,
-            anchor_col=chart.anchor_col,
-            width=chart.width,
-            height=chart.height
+            row_indexes.append(row_idx)
+            rows.append([data_dict[row_idx].get(col_idx, "") for col_idx in columns])
+    return row_indexes, rows
+
+
+def _window_fields(viewport: Viewport) -> dict:
+    """响应中描述窗口的字段（行列号从0开始，col_end 包含在内）"""
+    return {
+        "page": viewport.page,
+        "next_after_row": viewport.next_after_row,
+        "matched_rows": viewport.matched_rows,
+        "row_start": viewport.start_row,
+        "col_start": viewport.start_col,
+        "col_end": viewport.end_col - 1
+    }
+
+
+def _columnar_cells(data_records: List[Any], viewport: Viewport) -> dict:
+    """列式格式的单元格字段，只包含非空单元格
+    排序或筛选时另外返回 row_indexes，行偏移为行在 row_indexes 中的位置
+    """
+    if viewport.rows is not None:
+        position = {row_idx: i for i, row_idx in enumerate(viewport.rows)}
+        cells = [(position[record.row_index], record.column_index, record.cell_value) for record in data_records]
+        return {
+            "row_start": viewport.start_row,
+            "row_indexes": viewport.rows,
+            "columns": row_blocks.group_by_column(cells, 0)
+        }
+    return {
+        "row_start": viewport.start_row,
+        "columns": row_blocks.group_by_column(
+            (record for record in data_records if record.row_index < viewport.end_row), viewport.start_row
         )
-        for chart in charts
-    ]
-
-    # 获取表格区域信息
-    table_regions = crud.get_sheet_table_regions(db, sheet_id)
-    table_regions_info = [
-        schemas.TableRegionInfo(
-            id=tr.id,
-            region_index=tr.region_index,
-            start_row=tr.start_row,
-            start_col=tr.start_col,
-            end_row=tr.end_row,
-            end_col=tr.end_col,
-            header_rows=tr.header_rows,
-            table_name=tr.table_name
+    }
+
+
+def _window_records(db: Session, db_sheet: models.ExcelSheet, viewport: Viewport) -> List[Any]:
+    """读取窗口内的单元格：排序或筛选时读取当前页的各行，否则读取连续的行范围"""
+    if viewport.rows is not None:
+        return crud.get_rows_data(
+            db, db_sheet.id, viewport.rows, viewport.start_col, viewport.end_col, db_sheet.storage_mode
         )
-        for tr in table_regions
-    ]
+    return crud.get_sheet_data(
+        db, db_sheet.id, viewport.start_row, viewport.end_row, storage_mode=db_sheet.storage_mode,
+        start_col=viewport.start_col, end_col=viewport.end_col
+    )
+
+
+def _query_etag_parts(viewport: Viewport, sort_by: Optional[int], sort_dir: str, filter_texts: List[str]) -> tuple:
+    """ETag 中的页码和排序筛选参数的摘要"""
+    if viewport.rows is None:
+        return ()
+    return (viewport.page, http_cache.query_digest(sort_by, sort_dir, *filter_texts))
+
+
+def _profile_version(db_sheet: models.ExcelSheet) -> int:
+    """列统计的版本（生成时间的微秒时间戳，未生成时为 0），用于 ETag：重建统计后表头行可能变化"""
+    profiled_at = db_sheet.columns_profiled_at
+    return int(profiled_at.timestamp() * 1_000_000) if profiled_at is not None else 0
+
+
+def _region_header_row(region: models.TableRegion) -> Optional[int]:
+    """表格区域的（最后一个）表头行号，没有表头时为 None"""
+    return region.start_row + region.header_rows - 1 if region.header_rows > 0 else None
 
-    return schemas.SheetDataResponse(
+
+def _header_row(db: Session, db_sheet: models.ExcelSheet, region_id: Optional[int] = None) -> Optional[int]:
+    """Sheet（或表格区域）的表头行号，没有表头时为 None
+    入库时识别的表头行记录在 header_row / 区域的 header_rows；未生成列统计的旧数据以第一行作为表头
+    """
+    if region_id is not None:
+        return _region_header_row(crud.get_sheet_table_region(db, db_sheet.id, region_id))
+    if db_sheet.columns_profiled_at is None:
+        return 0
+    return db_sheet.header_row
+
+
+def _row_labels(db: Session, db_sheet: models.ExcelSheet, row_idx: Optional[int], start_col: int, end_col: int) -> List[str]:
+    """[start_col, end_col) 各列的表头：取表头行的值，没有表头或值为空时使用列序号"""
+    header_cells = {}
+    if row_idx is not None and row_idx < db_sheet.row_count:
+        header_cells = {
+            d.column_index: d.cell_value
+            for d in crud.get_sheet_data(
+                db, db_sheet.id, row_idx, row_idx + 1, storage_mode=db_sheet.storage_mode,
+                start_col=start_col, end_col=end_col
+            )
+        }
+    return [header_cells.get(i) or f"列{i+1}" for i in range(start_col, end_col)]
+
+
+def _window_headers(
+    db: Session,
+    db_sheet: models.ExcelSheet,
+    region_id: Optional[int],
+    start_col: int,
+    end_col: int
+) -> List[str]:
+    """窗口内各列的表头，与页码无关：整个Sheet使用元信息中的表头，表格区域使用区域的表头行"""
+    if region_id is None:
+        return _get_sheet_meta(db, db_sheet)["headers"][start_col:end_col]
+    # 重建列统计后表头可能变化，缓存键带上统计生成时间
+    key = ("region_headers", region_id, db_sheet.columns_profiled_at)
+    cached = sheet_meta_cache.get(key)
+    if cached is None:
+        region = crud.get_sheet_table_region(db, db_sheet.id, region_id)
+        labels = _row_labels(db, db_sheet, _region_header_row(region), region.start_col, region.end_col + 1)
+        cached = (region.start_col, labels)
+        sheet_meta_cache.put(key, cached)
+    region_start, labels = cached
+    return labels[start_col - region_start:end_col - region_start]
+
+
+def _load_sheet_meta(db: Session, db_sheet: models.ExcelSheet) -> dict:
+    """查询Sheet元信息：表头行的值作为表头，以及合并单元格、图片、图表和表格区域"""
+    column_count = db_sheet.column_count
+    headers = _row_labels(db, db_sheet, _header_row(db, db_sheet), 0, column_count)
+
+    meta = schemas.SheetMeta(
+        sheet_id=db_sheet.id,
+        sheet_name=db_sheet.sheet_name,
+        total_rows=db_sheet.row_count,
+        total_columns=column_count,
+        headers=headers,
+        # 图片只返回元信息，不包含二进制数据
+        merged_cells=[schemas.MergedCellInfo.model_validate(mc) for mc in crud.get_sheet_merged_cells(db, db_sheet.id)],
+        images=[schemas.ImageInfo.model_validate(img) for img in crud.get_sheet_images(db, db_sheet.id)],
+        charts=[schemas.ChartInfo.model_validate(chart) for chart in crud.get_sheet_charts(db, db_sheet.id)],
+        table_regions=[schemas.TableRegionInfo.model_validate(tr) for tr in crud.get_sheet_table_regions(db, db_sheet.id)]
+    )
+    return meta.model_dump()
+
+
+def _get_sheet_meta(db: Session, db_sheet: models.ExcelSheet) -> dict:
+    """Sheet元信息，上传后只有重建列统计时表头可能变化，按 sheet_id 和统计生成时间缓存"""
+    key = (db_sheet.id, db_sheet.columns_profiled_at)
+    meta = sheet_meta_cache.get(key)
+    if meta is None:
+        meta = _load_sheet_meta(db, db_sheet)
+        sheet_meta_cache.put(key, meta)
+    return meta
+
+
+def _get_sheet_index(db: Session, db_sheet: models.ExcelSheet) -> spatial.SheetObjectIndex:
+    """Sheet合并单元格、图片和图表的空间索引，由元信息构建，按 sheet_id 缓存"""
+    index = sheet_index_cache.get(db_sheet.id)
+    if index is None:
+        meta = _get_sheet_meta(db, db_sheet)
+        index = spatial.SheetObjectIndex(meta["merged_cells"], meta["images"], meta["charts"])
+        sheet_index_cache.put(db_sheet.id, index)
+    return index
+
+
+@router.get(
+    "/files/{file_id}/sheets/{sheet_id}/data",
+    response_model=schemas.SheetDataResponse,
+    responses={200: {"content": {wire.COLUMNAR_JSON: {}, wire.MSGPACK: {}}}}
+)
+def get_sheet_data(
+    file_id: int,
+    sheet_id: int,
+    request: Request,
+    response: Response,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after_row: Optional[int] = Query(None, ge=-1, description="游标分页：返回该行号之后的 page_size 行，优先于 page"),
+    row_start: Optional[int] = Query(None, ge=0, description="窗口起始行（从0开始），优先于 after_row 和 page"),
+    row_end: Optional[int] = Query(None, ge=0, description="窗口结束行（包含），默认 row_start + page_size - 1"),
+    col_start: Optional[int] = Query(None, ge=0, description="窗口起始列（从0开始）"),
+    col_end: Optional[int] = Query(None, ge=0, description="窗口结束列（包含），默认到最后一列"),
+    region_id: Optional[int] = Query(None, description="只返回该表格区域内的单元格，与行列窗口取交集"),
+    sort_by: Optional[int] = Query(None, ge=0, description="按该列（从0开始）排序，表头行不参与排序"),
+    sort_dir: str = Query("asc", pattern="^(asc|desc)$", description="排序方向"),
+    filter_texts: List[str] = Query(
+        [], alias="filter", description="筛选条件 列号:操作[:值]，可以重复指定，全部满足的行才返回"
+    ),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """获取Sheet数据（分页），包含与当前窗口相交的合并单元格、图片和图表，以及全部表格区域
+    可以用 row_start/row_end/col_start/col_end 只取可见窗口，用 region_id 只取一个表格区域，
+    行列范围在数据库查询中过滤，窗口外的单元格不会读取
+    sort_by/sort_dir/filter 在服务端对表头之后的全部数据行排序和筛选，再按 page 分页
+    按 Accept 头返回默认 JSON、列式稀疏 JSON 或 MessagePack，格式说明见 app/wire.py
+    只需要单元格时使用 /sheets/{sheet_id}/cells，元信息使用 /sheets/{sheet_id}/meta 单独获取并缓存
+    """
+    media_type = wire.negotiate(request.headers.get("accept"))
+
+    # 验证Sheet存在且属于该用户的文件
+    db_sheet = crud.get_file_sheet(db, file_id, sheet_id, current_user.id)
+    if not db_sheet:
+        if not crud.user_file_exists(db, file_id, current_user.id):
+            raise HTTPException(status_code=404, detail="文件不存在")
+        raise HTTPException(status_code=404, detail="Sheet不存在")
+
+    viewport = _resolve_viewport(
+        db, db_sheet, page, page_size, after_row, row_start, row_end, col_start, col_end, region_id,
+        sort_by, sort_dir == "desc", _parse_filters(filter_texts)
+    )
+
+    # Sheet上传后不再变化，同一窗口、同一格式的响应相同，未变化时不再查询单元格
+    etag = http_cache.api_etag(
+        "data", sheet_id, viewport.start_row, viewport.end_row,
+        viewport.start_col, viewport.end_col, page_size, region_id, media_type, _profile_version(db_sheet),
+        *_query_etag_parts(viewport, sort_by, sort_dir, filter_texts)
+    )
+    if http_cache.etag_matches(request, etag):
+        return http_cache.not_modified(etag, REVALIDATE_CACHE_CONTROL, vary="Accept")
+    cache_headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+
+    # 获取窗口内的数据，总行数使用上传时记录的行数
+    total_rows = db_sheet.row_count
+    column_count = db_sheet.column_count
+    data_records = _window_records(db, db_sheet, viewport)
+
+    # 元信息从缓存读取；每一页都使用识别出的表头行（表格区域使用区域的表头行）
+    meta = _get_sheet_meta(db, db_sheet)
+    headers = _window_headers(db, db_sheet, region_id, viewport.start_col, viewport.end_col)
+    if viewport.rows is not None:
+        # 排序或筛选后行不再连续，合并单元格、图片和图表的位置不再对应，不返回
+        objects = {"merged_cells": [], "images": [], "charts": []}
+    else:
+        # 合并单元格、图片和图表只返回与窗口相交的部分，由空间索引查找
+        objects = _get_sheet_index(db, db_sheet).window(
+            viewport.start_row, viewport.end_row, viewport.start_col, viewport.end_col
+        )
+    result = dict(
         sheet_id=sheet_id,
         sheet_name=db_sheet.sheet_name,
-        total_rows=total_rows + 1,  # 包含表头行
+        total_rows=total_rows,  # 包含表头行
         total_columns=column_count,
-        page=page,
         page_size=page_size,
+        **_window_fields(viewport),
         headers=headers,
-        data=rows,
-        merged_cells=merged_cells_info,
-        images=images_info,
-        charts=charts_info,
-        table_regions=table_regions_info
+        merged_cells=objects["merged_cells"],
+        images=objects["images"],
+        charts=objects["charts"],
+        table_regions=meta["table_regions"]
+    )
+
+    if media_type != wire.JSON:
+        # 列式格式只包含非空单元格，直接编码，不经过 Pydantic 校验
+        result.update(_columnar_cells(data_records, viewport))
+        return wire.render(result, media_type, cache_headers)
+
+    response.headers.update(cache_headers)
+    response.headers["Vary"] = "Accept"
+    row_indexes, rows = _dense_rows(data_records, viewport)
+    return schemas.SheetDataResponse(**result, row_indexes=row_indexes, data=rows)
+
+
+@router.get("/sheets/{sheet_id}/meta", response_model=schemas.SheetMeta)
+def get_sheet_meta(
+    sheet_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """获取Sheet元信息：表头（入库时识别的表头行）、合并单元格、图片、图表和表格区域
+    服务端缓存；重建列统计后表头可能变化（ETag 随之变化），浏览器每次用 ETag 重新验证
+    """
+    db_sheet = crud.get_user_sheet(db, sheet_id, current_user.id)
+    if not db_sheet:
+        raise HTTPException(status_code=404, detail="Sheet不存在")
+
+    etag = http_cache.api_etag("meta", sheet_id, _profile_version(db_sheet))
+    if http_cache.etag_matches(request, etag):
+        return http_cache.not_modified(etag, REVALIDATE_CACHE_CONTROL)
+
+    content = json.dumps(_get_sheet_meta(db, db_sheet), ensure_ascii=False, separators=(",", ":"))
+    return Response(
+        content=content.encode("utf-8"),
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+    )
+
+
+@router.get("/sheets/{sheet_id}/columns", response_model=schemas.SheetColumnsResponse)
+def get_sheet_columns(
+    sheet_id: int,
+    request: Request,
+    response: Response,
+    region_id: Optional[int] = Query(None, description="返回该表格区域的列统计，默认为整个Sheet"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """获取各列的统计：推断类型、空值数、不同值个数（估计）、最小/最大值、数值直方图，以及识别出的表头行
+    统计在入库时生成，已有Sheet需要执行 python -m app.cli build-column-stats
+    """
+    db_sheet = crud.get_user_sheet(db, sheet_id, current_user.id)
+    if not db_sheet:
+        raise HTTPException(status_code=404, detail="Sheet不存在")
+    region_index = None
+    if region_id is not None:
+        region = crud.get_sheet_table_region(db, sheet_id, region_id)
+        if not region:
+            raise HTTPException(status_code=404, detail="表格区域不存在")
+        region_index = region.region_index
+    if db_sheet.columns_profiled_at is None:
+        raise HTTPException(status_code=404, detail="该Sheet尚未生成列统计")
+
+    etag = http_cache.api_etag("columns", sheet_id, region_id, _profile_version(db_sheet))
+    if http_cache.etag_matches(request, etag):
+        return http_cache.not_modified(etag, REVALIDATE_CACHE_CONTROL)
+    response.headers.update({"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL})
+
+    stats = crud.get_column_stats(db, sheet_id, region_index)
+    return schemas.SheetColumnsResponse(
+        sheet_id=sheet_id,
+        region_id=region_id,
+        header_row=_header_row(db, db_sheet, region_id),
+        data_rows=stats[0].non_null_count + stats[0].null_count if stats else 0,
+        columns=[schemas.ColumnStatInfo.model_validate(stat) for stat in stats]
+    )
+
+
+def _parse_aggregates(aggregate_texts: List[str]) -> List[aggregation.Aggregate]:
+    try:
+        return [aggregation.parse_aggregate(text) for text in aggregate_texts] or [aggregation.Aggregate("count", None)]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/sheets/{sheet_id}/aggregate", response_model=schemas.SheetAggregateResponse)
+def aggregate_sheet(
+    sheet_id: int,
+    request: Request,
+    response: Response,
+    group_by: List[int] = Query([], description="分组列号（从 0 开始），可以重复指定，至少一个"),
+    aggregate_texts: List[str] = Query(
+        [], alias="agg", description="统计项 函数[:列号]，函数为 sum/avg/count/min/max，可以重复指定，默认为 count"
+    ),
+    filter_texts: List[str] = Query([], alias="filter", description="筛选条件 列号:操作[:值]，规则与 data 接口相同"),
+    region_id: Optional[int] = Query(None, description="只统计该表格区域"),
+    limit: int = Query(1000, ge=1, le=aggregation.MAX_GROUPS, description="最多返回的分组数"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """按一列或多列分组，对其他列计算 sum/avg/count/min/max，统计表头行之后的全部数据行
+    结果按查询参数缓存在服务进程中，上传后数据不再变化，重复查询不再访问数据库
+    """
+    db_sheet = crud.get_user_sheet(db, sheet_id, current_user.id)
+    if not db_sheet:
+        raise HTTPException(status_code=404, detail="Sheet不存在")
+    aggregates = _parse_aggregates(aggregate_texts)
+    filters = _parse_filters(filter_texts)
+    if not group_by:
+        raise HTTPException(status_code=400, detail="至少指定一个分组列")
+    if len(group_by) > aggregation.MAX_GROUP_COLUMNS or len(aggregates) > aggregation.MAX_AGGREGATES:
+        raise HTTPException(status_code=400, detail="分组列或统计项过多")
+    row_lo, row_hi, col_lo, col_hi = _sheet_bounds(db, db_sheet, region_id)
+    columns = group_by + [a.column for a in aggregates if a.column is not None] + [f.column for f in filters]
+    if any(not col_lo <= col_idx < col_hi for col_idx in columns):
+        raise HTTPException(status_code=400, detail="分组、统计或筛选的列超出范围")
+
+    query_parts = (tuple(group_by), tuple(aggregate_texts), tuple(filter_texts), region_id, limit)
+    etag = http_cache.api_etag(
+        "aggregate", sheet_id, _profile_version(db_sheet), http_cache.query_digest(*query_parts)
+    )
+    if http_cache.etag_matches(request, etag):
+        return http_cache.not_modified(etag, REVALIDATE_CACHE_CONTROL)
+    response.headers.update({"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL})
+
+    # 重建列统计后表头行可能变化，统计范围随之变化，缓存键带上统计生成时间
+    key = ("aggregate", sheet_id, db_sheet.columns_profiled_at, *query_parts)
+    cached = aggregate_cache.get(key)
+    if cached is not None:
+        return cached
+
+    header_row = _header_row(db, db_sheet, region_id)
+    start_row = min(header_row + 1 if header_row is not None else row_lo, row_hi)
+    # 多取一个分组，判断是否还有更多
+    groups = crud.aggregate_sheet_rows(
+        db, db_sheet, start_row, row_hi, group_by, aggregates, filters, limit=limit + 1
+    )
+    headers = _window_headers(db, db_sheet, region_id, col_lo, col_hi)
+    result = schemas.SheetAggregateResponse(
+        sheet_id=sheet_id,
+        region_id=region_id,
+        group_by=group_by,
+        group_headers=[headers[col_idx - col_lo] for col_idx in group_by],
+        aggregates=[
+            schemas.AggregateColumn(
+                func=a.func,
+                column_index=a.column,
+                header=headers[a.column - col_lo] if a.column is not None else None
+            )
+            for a in aggregates
+        ],
+        groups=[schemas.AggregateGroup(keys=list(keys), values=values) for keys, values in groups[:limit]],
+        truncated=len(groups) > limit
+    )
+    aggregate_cache.put(key, result)
+    return result
+
+
+@router.get(
+    "/sheets/{sheet_id}/cells",
+    response_model=schemas.SheetCellsResponse,
+    responses={200: {"content": {wire.COLUMNAR_JSON: {}, wire.MSGPACK: {}}}}
+)
+def get_sheet_cells(
+    sheet_id: int,
+    request: Request,
+    response: Response,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after_row: Optional[int] = Query(None, ge=-1, description="游标分页：返回该行号之后的 page_size 行，优先于 page"),
+    row_start: Optional[int] = Query(None, ge=0, description="窗口起始行（从0开始），优先于 after_row 和 page"),
+    row_end: Optional[int] = Query(None, ge=0, description="窗口结束行（包含），默认 row_start + page_size - 1"),
+    col_start: Optional[int] = Query(None, ge=0, description="窗口起始列（从0开始）"),
+    col_end: Optional[int] = Query(None, ge=0, description="窗口结束列（包含），默认到最后一列"),
+    region_id: Optional[int] = Query(None, description="只返回该表格区域内的单元格，与行列窗口取交集"),
+    sort_by: Optional[int] = Query(None, ge=0, description="按该列（从0开始）排序，表头行不参与排序"),
+    sort_dir: str = Query("asc", pattern="^(asc|desc)$", description="排序方向"),
+    filter_texts: List[str] = Query(
+        [], alias="filter", description="筛选条件 列号:操作[:值]，可以重复指定，全部满足的行才返回"
+    ),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """获取Sheet单元格数据（分页），不含元信息，窗口参数和格式协商与数据接口相同"""
+    media_type = wire.negotiate(request.headers.get("accept"))
+
+    db_sheet = crud.get_user_sheet(db, sheet_id, current_user.id)
+    if not db_sheet:
+        raise HTTPException(status_code=404, detail="Sheet不存在")
+
+    viewport = _resolve_viewport(
+        db, db_sheet, page, page_size, after_row, row_start, row_end, col_start, col_end, region_id,
+        sort_by, sort_dir == "desc", _parse_filters(filter_texts)
+    )
+    etag = http_cache.api_etag(
+        "cells", sheet_id, viewport.start_row, viewport.end_row,
+        viewport.start_col, viewport.end_col, page_size, region_id, media_type, _profile_version(db_sheet),
+        *_query_etag_parts(viewport, sort_by, sort_dir, filter_texts)
+    )
+    if http_cache.etag_matches(request, etag):
+        return http_cache.not_modified(etag, REVALIDATE_CACHE_CONTROL, vary="Accept")
+    cache_headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+
+    data_records = _window_records(db, db_sheet, viewport)
+    result = dict(
+        sheet_id=sheet_id,
+        total_rows=db_sheet.row_count,
+        total_columns=db_sheet.column_count,
+        page_size=page_size,
+        **_window_fields(viewport)
+    )
+
+    if media_type != wire.JSON:
+        result.update(_columnar_cells(data_records, viewport))
+        return wire.render(result, media_type, cache_headers)
+
+    response.headers.update(cache_headers)
+    response.headers["Vary"] = "Accept"
+    row_indexes, rows = _dense_rows(data_records, viewport)
+    return schemas.SheetCellsResponse(**result, row_indexes=row_indexes, data=rows)
+
+
+def _iter_ndjson_rows(
+    sheet_id: int,
+    start_row: int,
+    end_row: int,
+    start_col: int,
+    end_col: int,
+    storage_mode: str
+) -> Iterator[bytes]:
+    """逐行输出 NDJSON，每行为 {"row": 行号, "values": [...]}，只输出有数据的行，values 只包含 [start_col, end_col) 列
+    使用独立的会话：依赖注入的会话在响应开始发送前就已关闭
+    """
+    column_count = end_col - start_col
+    db = SessionLocal()
+    try:
+        records = crud.iter_sheet_data(
+            db, sheet_id, start_row, end_row, storage_mode, start_col=start_col, end_col=end_col
+        )
+        buffer = []
+        buffered = 0
+        first_chunk = True
+        for row_idx, cells in groupby(records, key=attrgetter("row_index")):
+            values = [""] * column_count
+            for record in cells:
+                values[record.column_index - start_col] = record.cell_value
+            line = json.dumps({"row": row_idx, "values": values}, ensure_ascii=False, separators=(",", ":"))
+            buffer.append(line)
+            buffered += len(line)
+            # 第一行立即发送，之后攒够一定大小再发送，减少小块写入
+            if first_chunk or buffered >= NDJSON_FLUSH_SIZE:
+                buffer.append("")
+                yield "\n".join(buffer).encode("utf-8")
+                buffer = []
+                buffered = 0
+                first_chunk = False
+        if buffer:
+            buffer.append("")
+            yield "\n".join(buffer).encode("utf-8")
+    finally:
+        db.close()
+
+
+@router.get("/files/{file_id}/sheets/{sheet_id}/rows.ndjson")
+def stream_sheet_rows(
+    file_id: int,
+    sheet_id: int,
+    start_row: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, description="最多返回的行数范围，默认到Sheet末尾"),
+    col_start: Optional[int] = Query(None, ge=0, description="起始列（从0开始）"),
+    col_end: Optional[int] = Query(None, ge=0, description="结束列（包含），默认到最后一列"),
+    region_id: Optional[int] = Query(None, description="只返回该表格区域内的单元格"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """以 NDJSON 流式返回Sheet的行，边读取边发送，适合一次加载整个Sheet或一个表格区域"""
+    db_sheet = crud.get_file_sheet(db, file_id, sheet_id, current_user.id)
+    if not db_sheet:
+        if not crud.user_file_exists(db, file_id, current_user.id):
+            raise HTTPException(status_code=404, detail="文件不存在")
+        raise HTTPException(status_code=404, detail="Sheet不存在")
+
+    row_lo, row_hi, col_lo, col_hi = _sheet_bounds(db, db_sheet, region_id)
+    start_row = max(start_row, row_lo)
+    end_row = row_hi if limit is None else min(start_row + limit, row_hi)
+    start_col, end_col = _column_window(col_lo, col_hi, col_start, col_end)
+    return StreamingResponse(
+        _iter_ndjson_rows(sheet_id, start_row, end_row, start_col, end_col, db_sheet.storage_mode),
+        media_type="application/x-ndjson",
+        headers={
+            "X-Total-Rows": str(db_sheet.row_count),
+            "X-Total-Columns": str(db_sheet.column_count),
+            "X-Col-Start": str(start_col),
+            # 关闭 nginx 的代理缓冲，行数据到达即转发
+            "X-Accel-Buffering": "no"
+        }
     )
 
 
 @router.get("/files/{file_id}/download")
 def download_file(
     file_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -584,6 +811,11 @@ def download_file(
     if not db_file:
         raise HTTPException(status_code=404, detail="文件不存在")
 
+    # 文件内容按哈希寻址、不会变化，浏览器已缓存时不再读取存储
+    etag = http_cache.make_etag(db_file.content_hash)
+    if http_cache.etag_matches(request, etag):
+        return http_cache.not_modified(etag, IMMUTABLE_CACHE_CONTROL)
+
     # 确定Content-Type
     ext = get_file_extension(db_file.filename)
     if ext == ".xlsx":
@@ -593,55 +825,168 @@ def download_file(
 
     # 处理中文文件名
     encoded_filename = quote(db_file.filename)
+    headers = {
+        "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}",
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL
+    }
 
+    db_content = db_file.content
+    headers["Accept-Ranges"] = "bytes"
+    if db_content.storage_key:
+        store = get_blob_store()
+        size = db_content.file_size
+        byte_range = http_cache.parse_range(request, size, etag)
+        if byte_range:
+            # 断点续传/分段下载：定位到请求的位置读取，不读取整个文件
+            start, end = byte_range
+            return StreamingResponse(
+                store.iter_range(db_content.storage_key, start, end),
+                status_code=206,
+                media_type=media_type,
+                headers={**headers, **http_cache.partial_headers(start, end, size)}
+            )
+        local_path = store.local_path(db_content.storage_key)
+        if local_path:
+            # 本地存储直接发送文件，不经过数据库和内存
+            return FileResponse(local_path, media_type=media_type, headers=headers)
+        return StreamingResponse(
+            store.iter_chunks(db_content.storage_key),
+            media_type=media_type,
+            headers={**headers, "Content-Length": str(size)}
+        )
+
+    # 尚未迁移到外部存储的旧数据：范围请求由数据库截取，不加载整个文件
+    size = crud.get_content_data_length(db, db_content.id)
+    byte_range = http_cache.parse_range(request, size, etag)
+    if byte_range:
+        start, end = byte_range
+        return Response(
+            content=crud.read_content_data_range(db, db_content.id, start, end - start + 1),
+            status_code=206,
+            media_type=media_type,
+            headers={**headers, **http_cache.partial_headers(start, end, size)}
+        )
     return StreamingResponse(
-        BytesIO(db_file.file_data),
+        _iter_content_data(db_content.id, size),
         media_type=media_type,
-        headers={
-            "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"
-        }
+        headers={**headers, "Content-Length": str(size)}
     )
 
 
+def _iter_content_data(content_id: int, size: int) -> Iterator[bytes]:
+    """分块输出保存在数据库中的原始文件，每块由数据库截取，不加载整个文件
+    使用独立的会话：依赖注入的会话在响应开始发送前就已关闭
+    """
+    db = SessionLocal()
+    try:
+        for start in range(0, size, LEGACY_DOWNLOAD_CHUNK_SIZE):
+            yield crud.read_content_data_range(db, content_id, start, LEGACY_DOWNLOAD_CHUNK_SIZE)
+    finally:
+        db.close()
+
+
+# 图片格式对应的 Content-Type
+IMAGE_MEDIA_TYPES = {
+    'png': 'image/png',
+    'jpeg': 'image/jpeg',
+    'jpg': 'image/jpeg',
+    'gif': 'image/gif',
+    'bmp': 'image/bmp',
+    'webp': 'image/webp',
+}
+
+
+def _image_media_type(image_format: str) -> str:
+    return IMAGE_MEDIA_TYPES.get(image_format.lower(), 'application/octet-stream')
+
+
+def _get_user_image(db: Session, image_id: int, user_id: int) -> models.SheetImage:
+    """获取图片记录（不加载图片数据）并验证权限"""
+    db_image = crud.get_sheet_image_by_id(db, image_id)
+    if not db_image:
+        raise HTTPException(status_code=404, detail="图片不存在")
+    if not crud.user_has_sheet(db, db_image.sheet_id, user_id):
+        raise HTTPException(status_code=403, detail="无权访问此图片")
+    return db_image
+
+
 @router.get("/images/{image_id}")
 def get_image(
     image_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """获取图片二进制数据"""
-    db_image = crud.get_sheet_image_by_id(db, image_id)
-    if not db_image:
-        raise HTTPException(status_code=404, detail="图片不存在")
-
-    # 验证权限
-    sheet = db.query(models.ExcelSheet).filter(
-        models.ExcelSheet.id == db_image.sheet_id
-    ).first()
-    if not sheet:
-        raise HTTPException(status_code=404, detail="Sheet不存在")
-
-    db_file = crud.get_file_by_id(db, sheet.file_id, user_id=current_user.id)
-    if not db_file:
-        raise HTTPException(status_code=403, detail="无权访问此图片")
-
-    # 确定Content-Type
-    format_to_mime = {
-        'png': 'image/png',
-        'jpeg': 'image/jpeg',
-        'jpg': 'image/jpeg',
-        'gif': 'image/gif',
-        'bmp': 'image/bmp',
-        'webp': 'image/webp',
-    }
-    media_type = format_to_mime.get(db_image.image_format.lower(), 'application/octet-stream')
+    db_image = _get_user_image(db, image_id, current_user.id)
+
+    # 图片上传后不再变化，浏览器已缓存时不读取图片数据
+    etag = http_cache.make_etag("img", image_id)
+    if http_cache.etag_matches(request, etag):
+        return http_cache.not_modified(etag, IMMUTABLE_CACHE_CONTROL)
+
+    media_type = _image_media_type(db_image.image_format)
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if request.headers.get("range"):
+        # 范围请求由数据库截取，不加载整张图片
+        size = crud.get_image_data_length(db, image_id)
+        byte_range = http_cache.parse_range(request, size, etag)
+        if byte_range:
+            start, end = byte_range
+            return Response(
+                content=crud.read_image_data_range(db, image_id, start, end - start + 1),
+                status_code=206,
+                media_type=media_type,
+                headers={**headers, **http_cache.partial_headers(start, end, size)}
+            )
 
     return Response(
         content=db_image.image_data,
-        media_type=media_type
+        media_type=media_type,
+        headers=headers
     )
 
 
+@router.get("/images/{image_id}/thumb")
+def get_image_thumbnail(
+    image_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """获取图片缩略图，原图足够小时返回原图
+    上传时生成；旧数据在首次访问时生成并保存
+    """
+    db_image = _get_user_image(db, image_id, current_user.id)
+
+    etag = http_cache.make_etag("thumb", image_id)
+    if http_cache.etag_matches(request, etag):
+        return http_cache.not_modified(etag, IMMUTABLE_CACHE_CONTROL)
+
+    if db_image.thumb_format is None:
+        if not thumbnails.available():
+            # 无法生成缩略图，返回原图，不允许长期缓存（安装 Pillow 后可以生成）
+            return Response(
+                content=db_image.image_data,
+                media_type=_image_media_type(db_image.image_format),
+                headers={"Cache-Control": REVALIDATE_CACHE_CONTROL}
+            )
+        crud.generate_image_thumbnail(db, db_image)
+        db.refresh(db_image)
+
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    thumb_data = db_image.thumb_data
+    if thumb_data is None:
+        # 原图不超过缩略图尺寸
+        return Response(
+            content=db_image.image_data,
+            media_type=_image_media_type(db_image.image_format),
+            headers=headers
+        )
+    return Response(content=thumb_data, media_type=_image_media_type(db_image.thumb_format), headers=headers)
+
+
 @router.delete("/files/{file_id}", response_model=schemas.MessageResponse)
 def delete_file(
     file_id: int,
@@ -652,6 +997,5 @@ def delete_file(
     db_file = crud.get_file_by_id(db, file_id, user_id=current_user.id)
     if not db_file:
         raise HTTPException(status_code=404, detail="文件不存在")
-    db.delete(db_file)
-    db.commit()
+    crud.delete_file(db, db_file.id)
     return schemas.MessageResponse(message="删除成功")
@@ -0,0 +1,22 @@
+"""解析任务相关 API 路由"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from .. import crud, models, schemas
+from ..auth import get_current_user
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}", response_model=schemas.JobInfo)
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """查询解析任务状态"""
+    db_job = crud.get_ingest_job(db, job_id, user_id=current_user.id)
+    if not db_job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return schemas.JobInfo.model_validate(db_job)
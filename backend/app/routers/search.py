@@ -0,0 +1,75 @@
+"""单元格全文搜索 API 路由"""
+from collections import defaultdict
+from typing import Any, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..config import MAX_SEARCH_LIMIT
+from .. import crud, models, schemas, search
+from ..auth import get_current_user
+
+router = APIRouter(prefix="/api", tags=["search"])
+
+# 每批读取的候选数为 limit 的倍数：索引按词匹配后还要按原值检查，被排除的候选由后续批次补足
+CANDIDATE_FACTOR = 2
+
+
+def _candidate_values(db: Session, candidates: List[Any]) -> List[Tuple[Any, Optional[str]]]:
+    """按Sheet批量读取候选单元格的值，返回 (候选, 值)，顺序与候选相同"""
+    cells_by_sheet = defaultdict(set)
+    storage_modes = {}
+    for hit in candidates:
+        cells_by_sheet[hit.sheet_id].add((hit.row_index, hit.column_index))
+        storage_modes[hit.sheet_id] = hit.storage_mode
+    values = {
+        sheet_id: crud.get_cell_values(db, sheet_id, cells, storage_modes[sheet_id])
+        for sheet_id, cells in cells_by_sheet.items()
+    }
+    return [(hit, values[hit.sheet_id].get((hit.row_index, hit.column_index))) for hit in candidates]
+
+
+@router.get("/search", response_model=schemas.SearchResponse)
+def search_cells(
+    q: str = Query(..., min_length=1, max_length=200, description="搜索内容，多个词用空格分隔，单元格需包含全部词"),
+    file_id: Optional[int] = Query(None, description="只在该文件中搜索"),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_LIMIT),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """在当前用户的所有文件中搜索单元格，返回 (文件, Sheet, 行, 列, 摘要)
+    使用入库后建立的倒排索引（cell_tokens），不扫描单元格数据
+    """
+    terms = search.query_terms(q)
+    if not terms:
+        return schemas.SearchResponse(query=q, items=[])
+
+    batch_size = limit * CANDIDATE_FACTOR
+    items = []
+    truncated = False
+    after = None
+    # 逐批读取候选并按原值检查，直到找到 limit 个结果（再多找到一个说明还有更多）或候选用完；
+    # 下一批从上一批最后一个候选之后开始（键集分页），不重新扫描已读过的候选
+    while not truncated:
+        candidates = crud.search_cells(db, current_user.id, terms, file_id=file_id, limit=batch_size, after=after)
+        for hit, value in _candidate_values(db, candidates):
+            if value is None or not search.matches(value, q):
+                continue
+            if len(items) == limit:
+                truncated = True
+                break
+            items.append(schemas.SearchHit(
+                file_id=hit.file_id,
+                filename=hit.filename,
+                sheet_id=hit.sheet_id,
+                sheet_name=hit.sheet_name,
+                row_index=hit.row_index,
+                column_index=hit.column_index,
+                snippet=search.make_snippet(value, q)
+            ))
+        if len(candidates) < batch_size:
+            break
+        last = candidates[-1]
+        after = (last.file_id, last.sheet_id, last.row_index, last.column_index)
+    return schemas.SearchResponse(query=q, items=items, truncated=truncated)
@@ -0,0 +1,60 @@
+"""行块存储：每 N 行单元格按列编码、压缩后存为一条记录"""
+import json
+import zlib
+from collections import namedtuple
+from typing import Any, Iterable, Iterator, List, Tuple
+
+# 与 models.ExcelData 字段同名，读取接口对两种存储方式保持一致
+CellRecord = namedtuple("CellRecord", ["row_index", "column_index", "cell_value"])
+
+
+def group_by_column(cells: Iterable[Tuple[int, int, Any]], start_row: int) -> List[list]:
+    """按列组织单元格：[[列号, [行偏移...], [值...]], ...]，列号升序，行偏移相对 start_row"""
+    columns = {}
+    for row_idx, col_idx, value in cells:
+        offsets, values = columns.setdefault(col_idx, ([], []))
+        offsets.append(row_idx - start_row)
+        values.append(value)
+    return [[col_idx, offsets, values] for col_idx, (offsets, values) in sorted(columns.items())]
+
+
+def encode_block(cells: List[Tuple[int, int, Any]], start_row: int) -> bytes:
+    """编码一个行块
+    cells: 块内单元格 (row_index, column_index, value)，值已转换为字符串
+    按列组织为 [[列号, [行偏移...], [值...]], ...]，再用 zlib 压缩
+    """
+    payload = group_by_column(cells, start_row)
+    return zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def decode_block(data: bytes, start_row: int) -> List[CellRecord]:
+    """解码一个行块，按 (行, 列) 排序返回"""
+    payload = json.loads(zlib.decompress(data).decode("utf-8"))
+    records = [
+        CellRecord(start_row + offset, col_idx, value)
+        for col_idx, offsets, values in payload
+        for offset, value in zip(offsets, values)
+    ]
+    records.sort()
+    return records
+
+
+def iter_blocks(
+    cells: Iterable[Tuple[int, int, Any]],
+    block_size: int
+) -> Iterator[Tuple[int, int, List[Tuple[int, int, Any]]]]:
+    """把按行有序的单元格流切分为行块
+    返回 (起始行, 结束行, 块内单元格)，起始行按 block_size 对齐，结束行为块内最后一个单元格所在行
+    """
+    current_block = None
+    block_cells = []
+    for row_idx, col_idx, value in cells:
+        block_no = row_idx // block_size
+        if block_no != current_block:
+            if block_cells:
+                yield current_block * block_size, block_cells[-1][0], block_cells
+            current_block = block_no
+            block_cells = []
+        block_cells.append((row_idx, col_idx, value))
+    if block_cells:
+        yield current_block * block_size, block_cells[-1][0], block_cells
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Union
 from pydantic import BaseModel
 
 
@@ -149,7 +149,15 @@ class SheetDataResponse(BaseModel):
     total_columns: int
     page: int
     page_size: int
+    next_after_row: Optional[int] = None
+    # 排序或筛选时匹配的数据行数（不含表头），此时按 page 分页，data 按排序后的顺序排列
+    matched_rows: Optional[int] = None
+    # 数据窗口（行列号从0开始，col_end 包含在内），headers 和 data 的每一行只包含窗口内的列
+    row_start: int = 0
+    col_start: int = 0
+    col_end: int = -1
     headers: List[str]
+    row_indexes: List[int] = []  # data 中每一行对应的行号
     data: List[List[Any]]
     merged_cells: List[MergedCellInfo] = []
     images: List[ImageInfo] = []
@@ -157,13 +165,129 @@ class SheetDataResponse(BaseModel):
     table_regions: List[TableRegionInfo] = []
 
 
+class SheetMeta(BaseModel):
+    """Sheet元信息响应：上传后不再变化，可以长期缓存"""
+    sheet_id: int
+    sheet_name: str
+    total_rows: int
+    total_columns: int
+    headers: List[str]
+    merged_cells: List[MergedCellInfo] = []
+    images: List[ImageInfo] = []
+    charts: List[ChartInfo] = []
+    table_regions: List[TableRegionInfo] = []
+
+
+class SheetCellsResponse(BaseModel):
+    """Sheet单元格数据响应（不含元信息）"""
+    sheet_id: int
+    total_rows: int
+    total_columns: int
+    page: int
+    page_size: int
+    next_after_row: Optional[int] = None
+    matched_rows: Optional[int] = None
+    row_start: int = 0
+    col_start: int = 0
+    col_end: int = -1
+    row_indexes: List[int] = []
+    data: List[List[Any]]
+
+
+class ColumnStatInfo(BaseModel):
+    """一列的统计"""
+    column_index: int
+    header: Optional[str] = None
+    inferred_type: str  # number/date/boolean/text/mixed/empty
+    non_null_count: int
+    null_count: int
+    distinct_count: int  # HyperLogLog 估计值（不同值较少时为精确值）
+    min_value: Optional[str] = None
+    max_value: Optional[str] = None
+    histogram: Optional[dict] = None  # {"edges": [...], "counts": [...]}，仅数值列
+
+    class Config:
+        from_attributes = True
+
+
+class SheetColumnsResponse(BaseModel):
+    """列统计响应"""
+    sheet_id: int
+    region_id: Optional[int] = None
+    header_row: Optional[int] = None  # 表头所在行号，没有表头时为空
+    data_rows: int  # 参与统计的数据行数（不含表头和空行）
+    columns: List[ColumnStatInfo]
+
+
+class AggregateColumn(BaseModel):
+    """统计项"""
+    func: str  # sum/avg/count/min/max
+    column_index: Optional[int] = None  # count 不指定列时为空，表示分组的行数
+    header: Optional[str] = None
+
+
+class AggregateGroup(BaseModel):
+    """一个分组：分组列的值和各统计项的结果"""
+    keys: List[Optional[str]]  # 与 group_by 顺序相同，空单元格为空
+    values: List[Optional[Union[int, float, str]]]  # 与 aggregates 顺序相同，没有可统计的值时为空；日期、文本的 min/max 为文本
+
+
+class SheetAggregateResponse(BaseModel):
+    """分组统计响应"""
+    sheet_id: int
+    region_id: Optional[int] = None
+    group_by: List[int]
+    group_headers: List[str]
+    aggregates: List[AggregateColumn]
+    groups: List[AggregateGroup]
+    truncated: bool = False  # 分组数超过 limit，只返回了前 limit 个
+
+
 class UploadResponse(BaseModel):
     """上传响应"""
-    id: int
+    job_id: int
     filename: str
+    status: str
     message: str
 
 
+class JobInfo(BaseModel):
+    """解析任务状态响应"""
+    id: int
+    filename: str
+    file_size: int
+    status: str
+    current_sheet: int
+    sheet_count: int
+    cell_count: int = 0
+    insert_rate: Optional[int] = None
+    file_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 class MessageResponse(BaseModel):
     """通用消息响应"""
     message: str
+
+
+class SearchHit(BaseModel):
+    """搜索结果：命中的单元格"""
+    file_id: int
+    filename: str
+    sheet_id: int
+    sheet_name: str
+    row_index: int
+    column_index: int
+    snippet: str  # 单元格值中匹配位置附近的内容
+
+
+class SearchResponse(BaseModel):
+    """搜索响应"""
+    query: str
+    items: List[SearchHit]
+    truncated: bool = False  # 是否还有更多结果未返回
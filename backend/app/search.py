@@ -0,0 +1,102 @@
+"""单元格全文搜索：分词规则和结果摘要
+
+入库时把每个单元格的值拆成搜索词写入 cell_tokens 表（倒排索引），搜索时用相同规则拆分搜索词：
+- 英文、数字按词拆分（转为小写），搜索时按词前缀匹配，例如 "sale" 可以找到 "Sales"
+- 中文、日文、韩文没有分隔符，按相邻两个字（二元组）拆分，每段最后一个字单独作为一个词，
+  单个字的搜索词按前缀匹配
+索引只用于缩小范围，候选单元格再按原值检查是否包含每个搜索词，排除二元组拼出的误匹配
+"""
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Tuple, Any
+
+# 搜索词最大长度，超出部分截断（与 cell_tokens.token 列长度一致）
+MAX_TOKEN_LENGTH = 32
+# 每个单元格最多索引的搜索词数，长文本只索引前面部分
+MAX_CELL_TOKENS = 64
+# 一次搜索最多使用的词项数（取最长的几个，越长越有区分度）
+MAX_QUERY_TERMS = 8
+# 摘要在匹配位置前后保留的字符数
+SNIPPET_BEFORE = 30
+SNIPPET_AFTER = 60
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_TOKEN_RE = re.compile(f"([{_CJK}]+)|([^\\W_{_CJK}]+)")
+
+
+class QueryTerm(NamedTuple):
+    """搜索词项：prefix 为 True 时匹配以 token 开头的词"""
+    token: str
+    prefix: bool
+
+
+def _iter_tokens(text: str) -> Iterator[str]:
+    for cjk, word in _TOKEN_RE.findall(text.lower()):
+        if cjk:
+            for i in range(len(cjk) - 1):
+                yield cjk[i:i + 2]
+            yield cjk[-1]
+        else:
+            yield word[:MAX_TOKEN_LENGTH]
+
+
+def cell_tokens(value: str) -> List[str]:
+    """单元格值的搜索词（去重，保持出现顺序）"""
+    tokens = []
+    seen = set()
+    for token in _iter_tokens(value):
+        if token not in seen:
+            seen.add(token)
+            tokens.append(token)
+            if len(tokens) >= MAX_CELL_TOKENS:
+                break
+    return tokens
+
+
+def iter_cell_tokens(cells: Iterable[Tuple[int, int, Any]]) -> Iterator[Tuple[str, int, int]]:
+    """由 (行, 列, 值) 生成 (搜索词, 行, 列)"""
+    for row_idx, col_idx, value in cells:
+        if value is None:
+            continue
+        for token in cell_tokens(str(value)):
+            yield token, row_idx, col_idx
+
+
+def query_terms(query: str) -> List[QueryTerm]:
+    """把搜索内容拆成词项，规则与入库分词相同"""
+    terms = {}
+    for cjk, word in _TOKEN_RE.findall(query.lower()):
+        if word:
+            terms.setdefault(word[:MAX_TOKEN_LENGTH], True)
+        elif len(cjk) == 1:
+            terms.setdefault(cjk, True)
+        else:
+            for i in range(len(cjk) - 1):
+                terms[cjk[i:i + 2]] = False
+    ranked = sorted(terms.items(), key=lambda item: len(item[0]), reverse=True)[:MAX_QUERY_TERMS]
+    return [QueryTerm(token, prefix) for token, prefix in ranked]
+
+
+def _query_parts(query: str) -> List[str]:
+    return [part for part in query.lower().split() if part]
+
+
+def matches(value: str, query: str) -> bool:
+    """单元格值是否包含搜索内容中以空白分隔的每一部分（不区分大小写）"""
+    text = value.lower()
+    return all(part in text for part in _query_parts(query))
+
+
+def make_snippet(value: str, query: str) -> str:
+    """围绕第一个匹配位置截取的摘要，截断处用省略号表示"""
+    if len(value) <= SNIPPET_BEFORE + SNIPPET_AFTER:
+        return value
+    parts = _query_parts(query)
+    position = max(value.lower().find(parts[0]), 0) if parts else 0
+    start = max(position - SNIPPET_BEFORE, 0)
+    end = min(position + SNIPPET_AFTER, len(value))
+    snippet = value[start:end]
+    if start > 0:
+        snippet = "…" + snippet
+    if end < len(value):
+        snippet = snippet + "…"
+    return snippet
@@ -0,0 +1,197 @@
+"""Sheet数据的服务端排序和筛选
+
+单元格入库时按解析出的原生类型记录值类型和对应的类型化值（excel_data 的 value_type/num_value/date_value），
+按单元格存储时排序和筛选在数据库中完成；行块存储没有类型化列，由 sort_filter_rows 在 Python 中按相同规则处理，
+值类型由字符串推断（infer_typed_value），因此以文本形式保存的数字（如 "010"）在行块存储中按数字处理
+
+排序时不同类型的值分段排列：升序为 数字/布尔 → 日期 → 文本，降序时反过来，没有值的行始终排在最后
+"""
+import math
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# 值类型
+NUMBER = "n"
+DATE = "d"
+BOOL = "b"
+TEXT = "s"
+
+# 升序时各类型的先后顺序（布尔值按 0/1 与数字一起排序）
+TYPE_ORDER = {NUMBER: 0, BOOL: 0, DATE: 1, TEXT: 2}
+
+FILTER_OPS = ("eq", "ne", "gt", "ge", "lt", "le", "contains", "startswith", "empty", "notempty")
+# 不需要比较值的操作
+_UNARY_OPS = ("empty", "notempty")
+
+# (类型, 数值, 日期)
+TypedValue = Tuple[Optional[str], Optional[float], Optional[datetime]]
+
+
+def typed_value(value: Any) -> TypedValue:
+    """解析得到的原生值对应的类型化值；时间、时长等没有对应列的类型按文本处理"""
+    if value is None:
+        return None, None, None
+    if isinstance(value, bool):
+        return BOOL, float(value), None
+    if isinstance(value, (int, float)):
+        number = float(value)
+        if math.isfinite(number):
+            return NUMBER, number, None
+        return TEXT, None, None
+    if isinstance(value, datetime):
+        return DATE, None, value
+    if isinstance(value, date):
+        return DATE, None, datetime.combine(value, time())
+    return TEXT, None, None
+
+
+def _parse_number(text: str) -> Optional[float]:
+    try:
+        number = float(text)
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _parse_datetime(text: str) -> Optional[datetime]:
+    # 只识别 str(datetime) 和 ISO 格式，避免把 "2024" 之类的数字当作日期
+    if len(text) < 10 or text[4] != "-":
+        return None
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def infer_typed_value(text: Optional[str]) -> TypedValue:
+    """从存储的字符串推断类型化值（行块存储和类型化列上线前入库的数据没有类型信息）"""
+    if text is None:
+        return None, None, None
+    if text in ("True", "False"):
+        return BOOL, float(text == "True"), None
+    number = _parse_number(text)
+    if number is not None:
+        return NUMBER, number, None
+    moment = _parse_datetime(text)
+    if moment is not None:
+        return DATE, None, moment
+    return TEXT, None, None
+
+
+class CellFilter(NamedTuple):
+    """筛选条件：列号、操作和比较值"""
+    column: int
+    op: str
+    value: Optional[str]
+
+
+def parse_filter(text: str) -> CellFilter:
+    """解析 "列号:操作[:值]"，例如 "2:gt:100"、"0:contains:北京"、"3:empty"；格式错误时抛出 ValueError"""
+    column, _, rest = text.partition(":")
+    op, sep, value = rest.partition(":")
+    try:
+        column_index = int(column)
+    except ValueError:
+        raise ValueError(f"筛选条件格式错误: {text}")
+    if column_index < 0 or op not in FILTER_OPS:
+        raise ValueError(f"筛选条件格式错误: {text}")
+    if op in _UNARY_OPS:
+        return CellFilter(column_index, op, None)
+    if not sep:
+        raise ValueError(f"筛选条件缺少比较值: {text}")
+    return CellFilter(column_index, op, value)
+
+
+def filter_operand(value: str) -> Tuple[str, Any]:
+    """比较值的类型：数字、ISO 日期、true/false，其余按文本比较"""
+    lowered = value.lower()
+    if lowered in ("true", "false"):
+        return BOOL, float(lowered == "true")
+    number = _parse_number(value)
+    if number is not None:
+        return NUMBER, number
+    moment = _parse_datetime(value)
+    if moment is not None:
+        return DATE, moment
+    return TEXT, value
+
+
+def compare_values(op: str, left: Any, right: Any) -> bool:
+    """按 eq/gt/ge/lt/le 比较（也用于列式副本的 NumPy 数组，逐个元素比较）"""
+    if op == "eq":
+        return left == right
+    if op == "gt":
+        return left > right
+    if op == "ge":
+        return left >= right
+    if op == "lt":
+        return left < right
+    return left <= right
+
+
+def _positive_match(text: Optional[str], cell_filter: CellFilter) -> bool:
+    """单元格是否满足条件（ne/empty 取反前的形式：eq/notempty）"""
+    if text is None or text == "":
+        return False
+    op = cell_filter.op
+    if op in ("empty", "notempty"):
+        return True
+    if op == "ne":
+        op = "eq"
+    if op == "contains":
+        return cell_filter.value.lower() in text.lower()
+    if op == "startswith":
+        return text.lower().startswith(cell_filter.value.lower())
+
+    operand_type, operand = filter_operand(cell_filter.value)
+    value_type, number, moment = infer_typed_value(text)
+    if operand_type in (NUMBER, BOOL):
+        if value_type not in (NUMBER, BOOL) or (operand_type == BOOL) != (value_type == BOOL):
+            return False
+        return compare_values(op, number, operand)
+    if operand_type == DATE:
+        return value_type == DATE and compare_values(op, moment, operand)
+    if op == "eq":
+        return text.lower() == operand.lower()
+    return value_type == TEXT and compare_values(op, text, operand)
+
+
+def negated(cell_filter: CellFilter) -> bool:
+    """ne/empty 表示"没有满足对应正向条件的单元格"，包括该列没有值的行"""
+    return cell_filter.op in ("ne", "empty")
+
+
+def sort_key(text: str) -> tuple:
+    """按分段规则排序的键：(类型顺序, 值)"""
+    value_type, number, moment = infer_typed_value(text)
+    rank = TYPE_ORDER[value_type]
+    if value_type == TEXT:
+        return rank, text
+    return rank, number if moment is None else moment
+
+
+def sort_filter_rows(
+    rows: Iterable[Tuple[int, Dict[int, Optional[str]]]],
+    filters: List[CellFilter],
+    sort_column: Optional[int] = None,
+    descending: bool = False
+) -> List[int]:
+    """在 Python 中筛选并排序行，rows 为按行号顺序的 (行号, {列号: 值})，返回排序后的行号"""
+    matched = []
+    for row_idx, values in rows:
+        if all(_positive_match(values.get(f.column), f) != negated(f) for f in filters):
+            matched.append((row_idx, values))
+    if sort_column is None:
+        return [row_idx for row_idx, _ in matched]
+
+    with_value = []
+    missing = []
+    for row_idx, values in matched:
+        text = values.get(sort_column)
+        if text is None or text == "":
+            missing.append(row_idx)
+        else:
+            with_value.append((sort_key(text), row_idx))
+    # 排序是稳定的（reverse 时也是），同值的行保持行号顺序
+    with_value.sort(key=lambda item: item[0], reverse=descending)
+    return [row_idx for _, row_idx in with_value] + missing
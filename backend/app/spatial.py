@@ -0,0 +1,96 @@
+"""Sheet对象的空间索引：按行列窗口查找合并单元格、图片和图表
+
+上传后Sheet的对象不再变化，使用静态打包的 R 树：矩形按 (起始行, 起始列) 排序，
+每 NODE_SIZE 个打包为一个节点，逐层向上合并外接矩形。查询时从根开始只进入与窗口相交的节点，
+合并单元格多为小范围，按行排序后同一节点的行范围很集中，查询只访问窗口附近的少量节点
+"""
+from typing import Any, Iterable, List, Sequence, Tuple
+
+# 每个节点包含的子节点（叶子层为矩形）个数
+NODE_SIZE = 16
+
+# (起始行, 起始列, 结束行, 结束列)，均包含在内
+Rect = Tuple[int, int, int, int]
+
+# 图片、图表的尺寸（像素）换算为单元格数时使用的 Excel 默认列宽和行高
+DEFAULT_COLUMN_WIDTH_PX = 64
+DEFAULT_ROW_HEIGHT_PX = 20
+
+
+def _bounding_rect(rects: Sequence[Rect]) -> Rect:
+    return (
+        min(rect[0] for rect in rects),
+        min(rect[1] for rect in rects),
+        max(rect[2] for rect in rects),
+        max(rect[3] for rect in rects)
+    )
+
+
+def _object_rect(obj: dict) -> Rect:
+    """图片、图表覆盖的单元格范围：从锚点单元格开始，宽高按默认列宽、行高换算为单元格数
+    锚点单元格内可能有偏移，结束行列各多算一格；没有尺寸时只占锚点单元格
+    """
+    row, col = obj["anchor_row"], obj["anchor_col"]
+    rows = -(-(obj.get("height") or 0) // DEFAULT_ROW_HEIGHT_PX)
+    columns = -(-(obj.get("width") or 0) // DEFAULT_COLUMN_WIDTH_PX)
+    return row, col, row + rows, col + columns
+
+
+def _intersects(rect: Rect, window: Rect) -> bool:
+    return (rect[0] <= window[2] and rect[2] >= window[0]
+            and rect[1] <= window[3] and rect[3] >= window[1])
+
+
+class RectIndex:
+    """矩形的静态 R 树，search 返回与窗口相交的对象"""
+
+    def __init__(self, entries: Iterable[Tuple[Rect, Any]]):
+        entries = sorted(entries, key=lambda entry: (entry[0][0], entry[0][1]))
+        self._items = [item for _, item in entries]
+        level = [rect for rect, _ in entries]
+        # _levels[0] 为叶子层，最后一层为根节点下的各节点
+        self._levels: List[List[Rect]] = [level]
+        while len(level) > NODE_SIZE:
+            level = [_bounding_rect(level[i:i + NODE_SIZE]) for i in range(0, len(level), NODE_SIZE)]
+            self._levels.append(level)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def search(self, window: Rect) -> List[Any]:
+        """与窗口 (起始行, 起始列, 结束行, 结束列)（包含边界）相交的对象，按起始行、起始列排序"""
+        top = len(self._levels) - 1
+        candidates = [i for i, rect in enumerate(self._levels[top]) if _intersects(rect, window)]
+        for depth in range(top, 0, -1):
+            child_count = len(self._levels[depth - 1])
+            children = self._levels[depth - 1]
+            next_candidates = []
+            for node in candidates:
+                for child in range(node * NODE_SIZE, min((node + 1) * NODE_SIZE, child_count)):
+                    if _intersects(children[child], window):
+                        next_candidates.append(child)
+            candidates = next_candidates
+        return [self._items[i] for i in candidates]
+
+
+class SheetObjectIndex:
+    """一个Sheet的合并单元格、图片和图表（元信息中的字典）的空间索引"""
+
+    def __init__(self, merged_cells: List[dict], images: List[dict], charts: List[dict]):
+        self.merged_cells = RectIndex(
+            ((mc["start_row"], mc["start_col"], mc["end_row"], mc["end_col"]), mc) for mc in merged_cells
+        )
+        # 图片和图表按覆盖的单元格范围索引，锚点在窗口外、但有一部分显示在窗口内的对象也会返回
+        self.images = RectIndex((_object_rect(img), img) for img in images)
+        self.charts = RectIndex((_object_rect(chart), chart) for chart in charts)
+
+    def window(self, start_row: int, end_row: int, start_col: int, end_col: int) -> dict:
+        """与 [start_row, end_row) 行、[start_col, end_col) 列窗口相交的对象"""
+        if start_row >= end_row or start_col >= end_col:
+            return {"merged_cells": [], "images": [], "charts": []}
+        window = (start_row, start_col, end_row - 1, end_col - 1)
+        return {
+            "merged_cells": self.merged_cells.search(window),
+            "images": self.images.search(window),
+            "charts": self.charts.search(window)
+        }
@@ -0,0 +1,56 @@
+"""内嵌图片缩略图：等比缩小到 THUMBNAIL_SIZE 以内，需要安装 Pillow"""
+import io
+import logging
+from typing import Optional, Tuple
+
+from .config import THUMBNAIL_SIZE, THUMBNAIL_FORMAT
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+
+def available() -> bool:
+    """是否可以生成缩略图"""
+    return Image is not None
+
+
+def make_thumbnail(data: bytes, size: int = THUMBNAIL_SIZE) -> Optional[Tuple[bytes, str]]:
+    """生成缩略图，返回 (数据, 格式)
+    原图不超过缩略图尺寸、无法识别或未安装 Pillow 时返回 None，直接使用原图
+    """
+    if Image is None or not data:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if img.width <= size and img.height <= size:
+                return None
+            # 只解码需要的分辨率（JPEG 可以按比例缩小解码）
+            img.draft("RGB", (size, size))
+            img.thumbnail((size, size))
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+            out = io.BytesIO()
+            if THUMBNAIL_FORMAT == "webp":
+                img.save(out, format="WEBP", quality=80, method=4)
+            else:
+                img.save(out, format="PNG", optimize=True)
+            return out.getvalue(), THUMBNAIL_FORMAT
+    except Exception as e:
+        logger.warning("生成缩略图失败: %s", e)
+        return None
+
+
+def add_thumbnails(images: Optional[list]) -> Optional[list]:
+    """为解析结果中的图片生成缩略图（写入 thumb_data/thumb_format）"""
+    for img in images or []:
+        thumb = make_thumbnail(img["data"])
+        if thumb:
+            img["thumb_data"], img["thumb_format"] = thumb
+        elif available():
+            # 已检查过，不需要缩略图，缩略图接口直接使用原图
+            img["thumb_format"] = img["format"]
+    return images
@@ -0,0 +1,154 @@
+"""流式接收上传文件：边接收边写入暂存文件、累计大小并计算 SHA-256"""
+import os
+import uuid
+import hashlib
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import Request
+
+from .config import MAX_FILE_SIZE, ALLOWED_EXTENSIONS, UPLOAD_SPOOL_DIR
+
+# multipart 边界和各部分头部的额外开销上限，用于根据 Content-Length 提前拒绝
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+@dataclass
+class SpooledUpload:
+    """已写入暂存目录的上传文件"""
+    path: str
+    filename: str
+    size: int
+    sha256: str
+
+    def discard(self) -> None:
+        """删除暂存文件"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _file_too_large() -> HTTPException:
+    """请求体过大（413），根据 Content-Length 提前拒绝和接收过程中超出限制时都使用"""
+    return HTTPException(status_code=413, detail=f"文件大小超出限制（最大{MAX_FILE_SIZE // 1024 // 1024}MB）")
+
+
+class _FilePartReceiver:
+    """multipart 解析回调：只保存指定字段的文件内容，其余字段忽略"""
+
+    def __init__(self, field_name: str):
+        self.field_name = field_name
+        self.filename: Optional[str] = None
+        self.path: Optional[str] = None
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._file = None
+        self._writing = False
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        if name != self.field_name or b"filename" not in options or self.path is not None:
+            return
+
+        filename = options[b"filename"].decode("utf-8", errors="replace")
+        ext = os.path.splitext(filename)[1].lower()
+        if ext not in ALLOWED_EXTENSIONS:
+            raise HTTPException(status_code=400, detail=f"不支持的文件格式，仅支持: {', '.join(ALLOWED_EXTENSIONS)}")
+
+        os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+        self.filename = filename
+        # 保留扩展名，openpyxl 依据扩展名判断文件格式
+        self.path = os.path.join(UPLOAD_SPOOL_DIR, uuid.uuid4().hex + ext)
+        self._file = open(self.path, "wb")
+        self._writing = True
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self._writing:
+            return
+        self.size += end - start
+        if self.size > MAX_FILE_SIZE:
+            raise _file_too_large()
+        chunk = data[start:end]
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def on_part_end(self) -> None:
+        if self._writing:
+            self._file.close()
+            self._writing = False
+
+    def close(self) -> None:
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+
+    def discard(self) -> None:
+        self.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+
+async def receive_upload(request: Request, field_name: str = "file") -> SpooledUpload:
+    """从 multipart 请求体中流式接收文件，超出大小限制时立即拒绝"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_FILE_SIZE + MULTIPART_OVERHEAD:
+        raise _file_too_large()
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="请使用 multipart/form-data 上传文件")
+
+    receiver = _FilePartReceiver(field_name)
+    parser = MultipartParser(params[b"boundary"], receiver.callbacks())
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+    except Exception:
+        receiver.discard()
+        raise
+    finally:
+        receiver.close()
+
+    if receiver.path is None:
+        raise HTTPException(status_code=400, detail="未找到上传的文件")
+
+    return SpooledUpload(
+        path=receiver.path,
+        filename=receiver.filename,
+        size=receiver.size,
+        sha256=receiver.sha256
+    )
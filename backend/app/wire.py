@@ -0,0 +1,72 @@
+"""Sheet数据的传输格式，按请求的 Accept 头协商
+
+- application/json（默认）：二维数组，空单元格补 ""
+- application/vnd.excel.columnar+json：按列组织的稀疏格式，只包含非空单元格
+- application/x-msgpack：与列式格式结构相同，用 MessagePack 编码（需要安装 msgpack）
+
+列式格式中 columns 为 [[列号, [行偏移...], [值...]], ...]，行偏移相对 row_start，
+与行块存储的编码方式一致；其余字段与默认格式相同
+排序或筛选时行不再连续，另外返回 row_indexes（按顺序排列的行号），行偏移为行在 row_indexes 中的位置
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.responses import Response
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.excel.columnar+json"
+MSGPACK = "application/x-msgpack"
+
+# 客户端可能使用的 MessagePack 类型名
+_MSGPACK_ALIASES = ("application/x-msgpack", "application/msgpack", "application/vnd.msgpack")
+
+
+def _parse_accept(accept: str) -> List[Tuple[str, float]]:
+    """解析 Accept 头为 [(类型, q值), ...]，保持原有顺序"""
+    media_ranges = []
+    for item in accept.split(","):
+        parts = [part.strip() for part in item.split(";")]
+        media_type = parts[0].lower()
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        media_ranges.append((media_type, quality))
+    return media_ranges
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """选择响应格式：取 q 值最高的可用格式，相同时按 Accept 中的顺序，无法匹配时使用默认 JSON"""
+    if not accept:
+        return JSON
+    best, best_quality = JSON, 0.0
+    for media_type, quality in _parse_accept(accept):
+        if media_type in _MSGPACK_ALIASES:
+            if msgpack is None:
+                continue
+            media_type = MSGPACK
+        elif media_type not in (COLUMNAR_JSON, JSON):
+            continue
+        if quality > best_quality:
+            best, best_quality = media_type, quality
+    return best
+
+
+def render(payload: Dict[str, Any], media_type: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """编码列式格式的响应（默认 JSON 格式由路由的 response_model 处理）"""
+    if media_type == MSGPACK:
+        content = msgpack.packb(payload, use_bin_type=True)
+    else:
+        content = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return Response(content=content, media_type=media_type, headers={**(headers or {}), "Vary": "Accept"})
@@ -0,0 +1,238 @@
+"""原生 .xlsx 读取：直接读取压缩包中的 XML，流式解析Sheet单元格
+
+只解析入库需要的部分：工作簿结构、共享字符串、数字格式（用于识别日期）和Sheet数据，
+单元格值的转换规则与 openpyxl（data_only=True）保持一致
+"""
+import sys
+import zipfile
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from xml.etree.ElementTree import iterparse, fromstring
+
+from openpyxl.packaging.relationship import get_dependents, get_rels_path
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.cell import column_index_from_string, range_boundaries
+from openpyxl.utils.datetime import MAC_EPOCH, WINDOWS_EPOCH, from_excel, from_ISO8601
+
+SHEET_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+_SHEET_TAG = f"{{{SHEET_MAIN_NS}}}sheet"
+_WORKBOOK_PR_TAG = f"{{{SHEET_MAIN_NS}}}workbookPr"
+_SI_TAG = f"{{{SHEET_MAIN_NS}}}si"
+_T_TAG = f"{{{SHEET_MAIN_NS}}}t"
+_R_TAG = f"{{{SHEET_MAIN_NS}}}r"
+_NUM_FMT_TAG = f"{{{SHEET_MAIN_NS}}}numFmt"
+_CELL_XFS_TAG = f"{{{SHEET_MAIN_NS}}}cellXfs"
+_XF_TAG = f"{{{SHEET_MAIN_NS}}}xf"
+_SHEET_DATA_TAG = f"{{{SHEET_MAIN_NS}}}sheetData"
+_ROW_TAG = f"{{{SHEET_MAIN_NS}}}row"
+_V_TAG = f"{{{SHEET_MAIN_NS}}}v"
+_IS_TAG = f"{{{SHEET_MAIN_NS}}}is"
+_MERGE_CELL_TAG = f"{{{SHEET_MAIN_NS}}}mergeCell"
+_RID_ATTR = f"{{{REL_NS}}}id"
+
+_DIGITS = "0123456789"
+
+# 列字母到列号的缓存，同一列在每一行都会出现
+_column_cache: Dict[str, int] = {}
+
+
+def _column_index(coordinate: str) -> int:
+    """单元格坐标（如 "AB12"）对应的列号（从1开始）"""
+    letters = coordinate.rstrip(_DIGITS)
+    column = _column_cache.get(letters)
+    if column is None:
+        column = _column_cache[letters] = column_index_from_string(letters)
+    return column
+
+
+def _cast_number(value: str):
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def _text_content(element) -> str:
+    """富文本/内联字符串的文本：<t> 加上各个 <r><t>，忽略注音 <rPh>"""
+    snippets = []
+    plain = element.find(_T_TAG)
+    if plain is not None and plain.text is not None:
+        snippets.append(plain.text)
+    for run in element.iterfind(_R_TAG):
+        text = run.findtext(_T_TAG)
+        if text:
+            snippets.append(text)
+    return "".join(snippets)
+
+
+class XlsxSheet:
+    """工作簿中的一个Sheet
+    rows() 逐行返回单元格，遍历结束后 merged_cells 才完整
+    """
+
+    def __init__(self, reader: "XlsxReader", name: str, path: Optional[str]):
+        self.reader = reader
+        self.name = name
+        # 图表Sheet没有单元格数据，path 为 None
+        self.path = path
+        self.merged_cells: List[Tuple[int, int, int, int]] = []
+
+    def rows(self) -> Iterator[Tuple[int, List[Tuple[int, object]]]]:
+        """逐行返回 (行号, [(列号, 值), ...])，行列号从0开始，只返回包含单元格的行"""
+        if self.path is None:
+            return
+        reader = self.reader
+        shared_strings = reader.shared_strings
+        date_styles = reader.date_styles
+        timedelta_styles = reader.timedelta_styles
+        epoch = reader.epoch
+
+        row_counter = 0
+        sheet_data = None
+        src = reader.archive.open(self.path)
+        try:
+            for event, element in iterparse(src, events=("start", "end")):
+                if event == "start":
+                    if element.tag == _SHEET_DATA_TAG:
+                        sheet_data = element
+                    continue
+
+                tag = element.tag
+                if tag == _ROW_TAG:
+                    row_attr = element.get("r")
+                    if row_attr is not None:
+                        row_counter = int(float(row_attr))
+                    else:
+                        row_counter += 1
+                    col_counter = 0
+                    values = []
+                    for cell in element:
+                        coordinate = cell.get("r")
+                        if coordinate:
+                            col_counter = _column_index(coordinate)
+                        else:
+                            col_counter += 1
+
+                        data_type = cell.get("t", "n")
+                        if data_type == "inlineStr":
+                            child = cell.find(_IS_TAG)
+                            value = _text_content(child) if child is not None else None
+                        else:
+                            value = cell.findtext(_V_TAG) or None
+                            if value is not None:
+                                if data_type == "n":
+                                    value = _cast_number(value)
+                                    style_id = int(cell.get("s", 0))
+                                    if style_id in date_styles:
+                                        try:
+                                            value = from_excel(
+                                                value, epoch, timedelta=style_id in timedelta_styles
+                                            )
+                                        except (OverflowError, ValueError):
+                                            value = "#VALUE!"
+                                elif data_type == "s":
+                                    value = shared_strings[int(value)]
+                                elif data_type == "b":
+                                    value = bool(int(value))
+                                elif data_type == "d":
+                                    value = from_ISO8601(value)
+                        values.append((col_counter - 1, value))
+
+                    # 处理完的行从树中移除，内存占用与Sheet大小无关
+                    if sheet_data is not None:
+                        sheet_data.clear()
+                    else:
+                        element.clear()
+                    if values:
+                        yield row_counter - 1, values
+
+                elif tag == _MERGE_CELL_TAG:
+                    min_col, min_row, max_col, max_row = range_boundaries(element.get("ref"))
+                    self.merged_cells.append((min_row - 1, min_col - 1, max_row - 1, max_col - 1))
+        finally:
+            src.close()
+
+
+class XlsxReader:
+    """直接读取 .xlsx 压缩包"""
+
+    def __init__(self, file_path: str):
+        self.archive = zipfile.ZipFile(file_path)
+        try:
+            self._load()
+        except Exception:
+            self.archive.close()
+            raise
+
+    def _load(self) -> None:
+        archive = self.archive
+        package_rels = get_dependents(archive, "_rels/.rels")
+        workbook_path = next(
+            rel.target for rel in package_rels.Relationship
+            if rel.Type.endswith("/officeDocument")
+        )
+        workbook_rels = get_dependents(archive, get_rels_path(workbook_path))
+        rels_by_id = {rel.Id: rel for rel in workbook_rels.Relationship}
+
+        # 工作簿：Sheet顺序、名称和日期基准
+        self.epoch = WINDOWS_EPOCH
+        self.sheets: List[XlsxSheet] = []
+        root = fromstring(archive.read(workbook_path))
+        workbook_pr = root.find(f".//{_WORKBOOK_PR_TAG}")
+        if workbook_pr is not None and workbook_pr.get("date1904", "").lower() in ("1", "true"):
+            self.epoch = MAC_EPOCH
+        for sheet in root.iter(_SHEET_TAG):
+            rel = rels_by_id.get(sheet.get(_RID_ATTR))
+            path = None
+            if rel is not None and rel.Type.endswith("/worksheet"):
+                path = rel.target
+            self.sheets.append(XlsxSheet(self, sheet.get("name"), path))
+
+        self.shared_strings: List[str] = []
+        self.date_styles: Set[int] = set()
+        self.timedelta_styles: Set[int] = set()
+        for rel in workbook_rels.Relationship:
+            if rel.target not in archive.namelist():
+                continue
+            if rel.Type.endswith("/sharedStrings"):
+                self.shared_strings = self._read_shared_strings(rel.target)
+            elif rel.Type.endswith("/styles"):
+                self._read_styles(rel.target)
+
+    def _read_shared_strings(self, path: str) -> List[str]:
+        """读取共享字符串表，字符串做驻留处理，相同文本共用一个对象"""
+        strings = []
+        with self.archive.open(path) as src:
+            for _, element in iterparse(src):
+                if element.tag == _SI_TAG:
+                    text = _text_content(element).replace("x005F_", "")
+                    strings.append(sys.intern(text))
+                    element.clear()
+        return strings
+
+    def _read_styles(self, path: str) -> None:
+        """找出数字格式为日期/时长的单元格样式"""
+        root = fromstring(self.archive.read(path))
+        custom_formats = {
+            int(num_fmt.get("numFmtId")): num_fmt.get("formatCode")
+            for num_fmt in root.iter(_NUM_FMT_TAG)
+        }
+        cell_xfs = root.find(_CELL_XFS_TAG)
+        if cell_xfs is None:
+            return
+        for idx, xf in enumerate(cell_xfs.iterfind(_XF_TAG)):
+            num_fmt_id = int(xf.get("numFmtId", 0))
+            fmt = custom_formats.get(num_fmt_id, BUILTIN_FORMATS.get(num_fmt_id))
+            if fmt is None:
+                continue
+            if is_date_format(fmt):
+                self.date_styles.add(idx)
+            if is_timedelta_format(fmt):
+                self.timedelta_styles.add(idx)
+
+    @property
+    def sheetnames(self) -> List[str]:
+        return [sheet.name for sheet in self.sheets]
+
+    def close(self) -> None:
+        self.archive.close()
@@ -0,0 +1,127 @@
+"""分组统计性能：生成大Sheet后分别测量首次统计（生成列式副本）、服务重启后（从 column_vectors 表读取）
+和进程内缓存命中时的耗时
+
+用法（在 backend 目录下运行）:
+    python -m benchmarks.bench_aggregate [--rows N] [--mode cells|blocks] [--database-url URL]
+
+不指定数据库时使用临时目录中的 SQLite 数据库
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def _prepare_database(database_url: str) -> None:
+    os.environ["DATABASE_URL"] = database_url
+    if database_url.startswith("sqlite"):
+        from sqlalchemy import BigInteger
+        from sqlalchemy.ext.compiler import compiles
+
+        @compiles(BigInteger, "sqlite")
+        def _sqlite_big_integer(type_, compiler, **kw):
+            # SQLite 只有 INTEGER 主键才会自增
+            return "INTEGER"
+
+
+def generate_cells(rows: int):
+    """表头 + rows 行：类别、地区、金额（少量文本）、日期"""
+    rng = random.Random(42)
+    categories = [f"类别{i}" for i in range(200)]
+    regions = ["北京", "上海", "广州", "深圳", "杭州", "beijing", "Beijing"]
+    start = datetime(2020, 1, 1)
+    yield from ((0, col_idx, header) for col_idx, header in enumerate(["类别", "地区", "金额", "日期"]))
+    for row_idx in range(1, rows + 1):
+        yield row_idx, 0, rng.choice(categories)
+        yield row_idx, 1, rng.choice(regions)
+        yield row_idx, 2, "缺失" if row_idx % 997 == 0 else round(rng.uniform(-100, 1000), 2)
+        yield row_idx, 3, start + timedelta(minutes=row_idx)
+
+
+def create_sheet(db, rows: int, mode: str):
+    from app import crud, models
+
+    content = crud.create_excel_content(db, f"bench-{time.time()}", "", 0)
+    db_sheet = models.ExcelSheet(
+        content_id=content.id, sheet_name="bench", sheet_index=0,
+        row_count=rows + 1, column_count=4, storage_mode=mode
+    )
+    db.add(db_sheet)
+    db.flush()
+    if mode == "blocks":
+        crud.bulk_create_row_blocks(db, db_sheet.id, (
+            (row_idx, col_idx, str(value)) for row_idx, col_idx, value in generate_cells(rows)
+        ))
+    else:
+        crud.bulk_create_excel_data(db, db_sheet.id, generate_cells(rows))
+    db.commit()
+    return db_sheet
+
+
+QUERIES = {
+    "按类别: count/sum/avg/min/max 金额": ([0], ["count", "sum:2", "avg:2", "min:2", "max:2"], []),
+    "按类别+地区: sum 金额, min/max 日期": ([0, 1], ["sum:2", "min:3", "max:3"], []),
+    "筛选 金额>500 后按地区: count/avg": ([1], ["count", "avg:2"], ["2:gt:500"]),
+}
+
+
+def timed(func) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="分组统计性能")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="数据行数")
+    parser.add_argument("--mode", choices=("cells", "blocks"), default="cells", help="单元格存储方式")
+    parser.add_argument("--database-url", default=None, help="数据库连接，默认为临时 SQLite 数据库")
+    args = parser.parse_args(argv)
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench-aggregate-")
+    _prepare_database(args.database_url or "sqlite:///" + os.path.join(tmp_dir, "bench.db"))
+
+    from app import aggregation, crud, models, sheet_query
+    from app.cache import column_vector_cache
+    from app.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    started = time.perf_counter()
+    db_sheet = create_sheet(db, args.rows, args.mode)
+    print(f"生成 {args.rows} 行（{args.mode}）: {time.perf_counter() - started:.1f}s")
+
+    try:
+        for name, (group_by, aggregate_texts, filter_texts) in QUERIES.items():
+            aggregates = [aggregation.parse_aggregate(text) for text in aggregate_texts]
+            filters = [sheet_query.parse_filter(text) for text in filter_texts]
+
+            def run():
+                return crud.aggregate_sheet_rows(
+                    db, db_sheet, 1, db_sheet.row_count, group_by, aggregates, filters, limit=aggregation.MAX_GROUPS
+                )
+
+            # 首次统计：读取单元格生成列式副本并保存
+            db.query(models.ColumnVector).filter(models.ColumnVector.sheet_id == db_sheet.id).delete()
+            db.commit()
+            column_vector_cache.clear()
+            first = timed(run)
+            # 服务重启后：进程内缓存为空，从 column_vectors 表读取
+            column_vector_cache.clear()
+            restarted = timed(run)
+            warm = min(timed(run) for _ in range(3))
+            print(name)
+            print(f"    首次（生成列式副本）: {first:.3f}s  重启后: {restarted:.3f}s  缓存命中: {warm:.3f}s"
+                  f"  （{len(run())} 个分组）")
+    finally:
+        db.close()
+        if not args.database_url:
+            os.remove(os.path.join(tmp_dir, "bench.db"))
+            os.rmdir(tmp_dir)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,142 @@
+""".xls 解析性能对比：原实现（加载格式信息、逐坐标读取两遍）与当前入库使用的流式解析
+
+用法（在 backend 目录下运行）:
+    python -m benchmarks.bench_xls [FILE ...] [--rows N] [--cols N] [--repeat N]
+
+不指定文件时用 xlwt 生成测试文件（需要 pip install xlwt）
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import xlrd
+
+from app.parser import detect_table_regions, iter_xls
+
+
+def legacy_parse_xls(file_path: str) -> list:
+    """优化前的实现，仅用于对比"""
+    workbook = xlrd.open_workbook(file_path, formatting_info=True)
+    sheets_data = []
+    for idx in range(workbook.nsheets):
+        sheet = workbook.sheet_by_index(idx)
+        rows = []
+        for row_idx in range(sheet.nrows):
+            row = []
+            for col_idx in range(sheet.ncols):
+                value = sheet.cell_value(row_idx, col_idx)
+                row.append(value if value != "" else None)
+            rows.append(row)
+        cells = []
+        for row_idx in range(sheet.nrows):
+            for col_idx in range(sheet.ncols):
+                value = sheet.cell_value(row_idx, col_idx)
+                if value != "":
+                    cells.append((row_idx, col_idx, value))
+        merged_cells = [
+            (row_start, col_start, row_end - 1, col_end - 1)
+            for row_start, row_end, col_start, col_end in sheet.merged_cells
+        ]
+        sheets_data.append({
+            "name": sheet.name,
+            "row_count": sheet.nrows,
+            "column_count": sheet.ncols,
+            "cells": cells,
+            "merged_cells": merged_cells,
+            "table_regions": detect_table_regions(rows, sheet.ncols)
+        })
+    return sheets_data
+
+
+def stream_parse_xls(file_path: str) -> None:
+    """入库时的解析方式：逐个Sheet流式遍历单元格"""
+    for sheet_info in iter_xls(file_path):
+        for _ in sheet_info["cells"]:
+            pass
+
+
+def generate_xls(rows: int, cols: int) -> str:
+    try:
+        import xlwt
+    except ImportError:
+        sys.exit("生成测试文件需要 xlwt: pip install xlwt，或直接指定 .xls 文件")
+
+    # 模拟常见的业务报表：带样式的数据区、右侧大片只有格式的空白单元格、少量合并单元格
+    styles = [
+        xlwt.easyxf("font: bold on; borders: left thin, right thin"),
+        xlwt.easyxf(num_format_str="#,##0.00"),
+        xlwt.easyxf(num_format_str="yyyy-mm-dd"),
+        xlwt.easyxf("pattern: pattern solid, fore_colour light_yellow"),
+    ]
+    blank_style = xlwt.easyxf("borders: bottom thin")
+    workbook = xlwt.Workbook()
+    # xlwt 每个Sheet最多 65536 行
+    for sheet_no in range((rows + 65535) // 65536):
+        sheet = workbook.add_sheet(f"Sheet{sheet_no + 1}", cell_overwrite_ok=True)
+        sheet_rows = min(65536, rows - sheet_no * 65536)
+        for row_idx in range(sheet_rows):
+            for col_idx in range(cols):
+                value = row_idx * col_idx if col_idx % 2 else f"类别{(row_idx * 7 + col_idx) % 300}"
+                sheet.write(row_idx, col_idx, value, styles[col_idx % len(styles)])
+            for col_idx in range(cols, cols * 2):
+                sheet.write(row_idx, col_idx, None, blank_style)
+        for row_idx in range(0, sheet_rows - 1, 1000):
+            sheet.merge(row_idx, row_idx + 1, 0, 1)
+    fd, path = tempfile.mkstemp(suffix=".xls")
+    os.close(fd)
+    workbook.save(path)
+    return path
+
+
+def best_of(func, file_path: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(file_path)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def peak_memory(func, file_path: str) -> int:
+    """单独运行一次统计内存峰值（tracemalloc 会拖慢速度，不与计时混在一起）"""
+    tracemalloc.start()
+    try:
+        func(file_path)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=".xls 解析性能对比")
+    parser.add_argument("files", nargs="*", help=".xls 文件路径")
+    parser.add_argument("--rows", type=int, default=60000, help="生成测试文件的行数")
+    parser.add_argument("--cols", type=int, default=20, help="生成测试文件的列数")
+    parser.add_argument("--repeat", type=int, default=3, help="每种实现运行的次数，取最快一次")
+    args = parser.parse_args(argv)
+
+    generated = None
+    files = args.files
+    if not files:
+        generated = generate_xls(args.rows, args.cols)
+        files = [generated]
+
+    try:
+        for file_path in files:
+            legacy = best_of(legacy_parse_xls, file_path, args.repeat)
+            current = best_of(stream_parse_xls, file_path, args.repeat)
+            legacy_peak = peak_memory(legacy_parse_xls, file_path) / 1024 / 1024
+            current_peak = peak_memory(stream_parse_xls, file_path) / 1024 / 1024
+            print(f"{file_path} ({os.path.getsize(file_path) // 1024} KB)")
+            print(f"    原实现: {legacy:.2f}s  内存峰值 {legacy_peak:.0f} MB")
+            print(f"    当前:   {current:.2f}s  内存峰值 {current_peak:.0f} MB  （{legacy / current:.1f} 倍）")
+    finally:
+        if generated:
+            os.remove(generated)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,20 @@
+-- 后台解析任务表迁移脚本
+-- 执行前请备份数据库
+
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    user_id INT NOT NULL,
+    file_id INT NULL COMMENT '解析完成后生成的文件ID',
+    filename VARCHAR(255) NOT NULL COMMENT '原始文件名',
+    file_size BIGINT NOT NULL COMMENT '文件大小(字节)',
+    spool_path VARCHAR(1024) NULL COMMENT '待解析文件暂存路径',
+    status VARCHAR(20) NOT NULL DEFAULT 'queued' COMMENT '任务状态(queued/parsing/inserting/done/failed)',
+    current_sheet INT NOT NULL DEFAULT 0 COMMENT '正在解析的Sheet序号(从1开始)',
+    sheet_count INT NOT NULL DEFAULT 0 COMMENT 'Sheet总数',
+    error TEXT NULL COMMENT '失败原因',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (file_id) REFERENCES excel_files(id) ON DELETE SET NULL,
+    INDEX idx_ingest_jobs_user_id (user_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,6 @@
+-- 解析任务写入统计迁移脚本
+-- 执行前请备份数据库
+
+ALTER TABLE ingest_jobs
+    ADD COLUMN cell_count BIGINT NOT NULL DEFAULT 0 COMMENT '写入的单元格数' AFTER sheet_count,
+    ADD COLUMN insert_rate INT NULL COMMENT '单元格写入速度(行/秒)' AFTER cell_count;
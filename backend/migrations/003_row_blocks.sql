@@ -0,0 +1,19 @@
+-- 行块存储迁移脚本
+-- 执行前请备份数据库
+-- 已有数据可在迁移后执行 `python -m app.cli convert-blocks` 转换为行块存储
+
+-- 1. Sheet 记录单元格存储方式
+ALTER TABLE excel_sheets
+    ADD COLUMN storage_mode VARCHAR(10) NOT NULL DEFAULT 'cells' COMMENT '单元格存储方式(cells/blocks)';
+
+-- 2. 创建行块表
+CREATE TABLE IF NOT EXISTS sheet_row_blocks (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    sheet_id INT NOT NULL,
+    start_row INT NOT NULL COMMENT '起始行号',
+    end_row INT NOT NULL COMMENT '结束行号(包含)',
+    cell_count INT NOT NULL DEFAULT 0 COMMENT '块内单元格数',
+    block_data MEDIUMBLOB NOT NULL COMMENT '压缩后的列式编码数据',
+    FOREIGN KEY (sheet_id) REFERENCES excel_sheets(id) ON DELETE CASCADE,
+    INDEX idx_row_blocks_sheet_start (sheet_id, start_row)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
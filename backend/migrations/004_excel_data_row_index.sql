@@ -0,0 +1,8 @@
+-- 单元格数据复合索引迁移脚本
+-- 执行前请备份数据库（大表建索引耗时较长）
+
+-- 1. 创建 (sheet_id, row_index, column_index) 复合索引
+CREATE INDEX idx_excel_data_sheet_row_col ON excel_data(sheet_id, row_index, column_index);
+
+-- 2. 删除被复合索引覆盖的单列索引
+DROP INDEX ix_excel_data_sheet_id ON excel_data;
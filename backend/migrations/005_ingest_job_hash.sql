@@ -0,0 +1,5 @@
+-- 解析任务内容哈希迁移脚本
+-- 执行前请备份数据库
+
+ALTER TABLE ingest_jobs
+    ADD COLUMN content_hash VARCHAR(64) NULL COMMENT '文件内容SHA-256' AFTER spool_path;
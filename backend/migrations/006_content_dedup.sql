@@ -0,0 +1,55 @@
+-- 文件内容去重迁移脚本
+-- 执行前请备份数据库
+-- 原始文件数据从 excel_files 移到 excel_contents，Sheet 改为归属于内容，
+-- 同一用户重复上传的相同文件共享同一份内容（ref_count 记录引用数）
+
+-- 1. 创建内容表
+CREATE TABLE IF NOT EXISTS excel_contents (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    content_hash VARCHAR(64) NOT NULL COMMENT '文件内容SHA-256',
+    file_data LONGBLOB NOT NULL COMMENT '文件二进制数据',
+    ref_count INT NOT NULL DEFAULT 1 COMMENT '引用该内容的文件数',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    legacy_file_id INT NULL,
+    INDEX ix_excel_contents_content_hash (content_hash)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 2. 为每个已有文件生成一条内容记录
+INSERT INTO excel_contents (content_hash, file_data, ref_count, created_at, legacy_file_id)
+SELECT SHA2(file_data, 256), file_data, 1, created_at, id FROM excel_files;
+
+-- 3. excel_files 关联内容
+ALTER TABLE excel_files
+    ADD COLUMN content_id INT NULL AFTER user_id,
+    ADD COLUMN content_hash VARCHAR(64) NULL COMMENT '文件内容SHA-256' AFTER filename;
+
+UPDATE excel_files f
+JOIN excel_contents c ON c.legacy_file_id = f.id
+SET f.content_id = c.id, f.content_hash = c.content_hash;
+
+ALTER TABLE excel_files
+    MODIFY COLUMN content_id INT NOT NULL,
+    MODIFY COLUMN content_hash VARCHAR(64) NOT NULL COMMENT '文件内容SHA-256',
+    ADD CONSTRAINT fk_excel_files_content FOREIGN KEY (content_id) REFERENCES excel_contents(id),
+    ADD INDEX ix_excel_files_content_id (content_id),
+    ADD INDEX idx_excel_files_user_hash (user_id, content_hash);
+
+-- 4. excel_sheets 改为归属于内容
+ALTER TABLE excel_sheets ADD COLUMN content_id INT NULL AFTER id;
+
+UPDATE excel_sheets s
+JOIN excel_files f ON s.file_id = f.id
+SET s.content_id = f.content_id;
+
+ALTER TABLE excel_sheets
+    MODIFY COLUMN content_id INT NOT NULL,
+    ADD CONSTRAINT fk_excel_sheets_content FOREIGN KEY (content_id) REFERENCES excel_contents(id) ON DELETE CASCADE,
+    ADD INDEX ix_excel_sheets_content_id (content_id);
+
+-- 原 file_id 外键由建表时自动命名，如名称不同请先执行 SHOW CREATE TABLE excel_sheets 确认
+ALTER TABLE excel_sheets DROP FOREIGN KEY excel_sheets_ibfk_1;
+ALTER TABLE excel_sheets DROP COLUMN file_id;
+
+-- 5. 清理
+ALTER TABLE excel_files DROP COLUMN file_data;
+ALTER TABLE excel_contents DROP COLUMN legacy_file_id;
@@ -0,0 +1,8 @@
+-- 外部文件存储迁移脚本
+-- 执行前请备份数据库
+-- 迁移后执行 `python -m app.cli migrate-blobs` 把已有的原始文件转存到外部存储
+
+ALTER TABLE excel_contents
+    ADD COLUMN storage_key VARCHAR(255) NULL COMMENT '外部存储中的对象键' AFTER content_hash,
+    ADD COLUMN file_size BIGINT NULL COMMENT '文件大小(字节)' AFTER file_data,
+    MODIFY COLUMN file_data LONGBLOB NULL COMMENT '文件二进制数据(未迁移到外部存储的旧数据)';
@@ -0,0 +1,7 @@
+-- 图片缩略图迁移脚本
+-- 执行前请备份数据库
+-- 已有图片的缩略图在首次访问 /api/images/{id}/thumb 时生成，也可以执行 `python -m app.cli make-thumbnails` 批量生成
+
+ALTER TABLE sheet_images
+    ADD COLUMN thumb_data MEDIUMBLOB NULL COMMENT '缩略图二进制数据' AFTER height,
+    ADD COLUMN thumb_format VARCHAR(20) NULL COMMENT '缩略图格式，为空表示尚未生成；没有缩略图数据时使用原图' AFTER thumb_data;
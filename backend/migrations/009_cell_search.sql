@@ -0,0 +1,19 @@
+-- 单元格全文搜索迁移脚本
+-- 执行前请备份数据库
+-- 新上传的文件在入库时写入搜索索引，已有文件执行 `python -m app.cli build-search-index` 补建
+
+-- 1. 创建搜索词表（倒排索引）
+CREATE TABLE IF NOT EXISTS cell_tokens (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    sheet_id INT NOT NULL,
+    token VARCHAR(32) NOT NULL COMMENT '搜索词（小写）',
+    row_index INT NOT NULL COMMENT '行号',
+    column_index INT NOT NULL COMMENT '列号',
+    INDEX ix_cell_tokens_sheet_id (sheet_id),
+    INDEX idx_cell_tokens_token_cell (token, sheet_id, row_index, column_index),
+    CONSTRAINT fk_cell_tokens_sheet FOREIGN KEY (sheet_id) REFERENCES excel_sheets(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 2. 记录Sheet是否已建立搜索索引
+ALTER TABLE excel_sheets
+    ADD COLUMN search_indexed TINYINT(1) NOT NULL DEFAULT 0 COMMENT '单元格是否已写入搜索索引' AFTER storage_mode;
@@ -0,0 +1,27 @@
+-- 类型化单元格值迁移脚本
+-- 执行前请备份数据库（大表加列和建索引耗时较长）
+-- 新入库的单元格按解析出的原生类型写入；已有数据按存储的字符串推断类型（与 app/sheet_query.py 的规则一致）
+
+-- 1. 添加类型化值列
+ALTER TABLE excel_data
+    ADD COLUMN value_type CHAR(1) NULL COMMENT '值类型(n 数字/d 日期/b 布尔/s 文本)' AFTER cell_value,
+    ADD COLUMN num_value DOUBLE NULL COMMENT '数字值(布尔值为 0/1)' AFTER value_type,
+    ADD COLUMN date_value DATETIME NULL COMMENT '日期时间值' AFTER num_value;
+
+-- 2. 由已有的字符串值填充
+UPDATE excel_data SET value_type = 'b', num_value = (cell_value = 'True')
+WHERE cell_value IN ('True', 'False');
+
+UPDATE excel_data SET value_type = 'n', num_value = cell_value + 0
+WHERE value_type IS NULL AND cell_value REGEXP '^[-+]?([0-9]+[.]?[0-9]*|[.][0-9]+)([eE][-+]?[0-9]+)?$';
+
+UPDATE excel_data SET value_type = 'd', date_value = CAST(cell_value AS DATETIME)
+WHERE value_type IS NULL AND cell_value REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}( [0-9]{2}:[0-9]{2}:[0-9]{2}(\\.[0-9]+)?)?$';
+
+UPDATE excel_data SET value_type = 's'
+WHERE value_type IS NULL AND cell_value IS NOT NULL;
+
+-- 3. 按列排序和筛选的索引
+CREATE INDEX idx_excel_data_sheet_col_num ON excel_data(sheet_id, column_index, num_value);
+CREATE INDEX idx_excel_data_sheet_col_date ON excel_data(sheet_id, column_index, date_value);
+CREATE INDEX idx_excel_data_sheet_col_text ON excel_data(sheet_id, column_index, cell_value(64));
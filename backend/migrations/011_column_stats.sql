@@ -0,0 +1,26 @@
+-- 列统计与表头识别迁移脚本
+-- 执行前请备份数据库
+-- 新上传的文件在入库时生成列统计，已有文件执行 `python -m app.cli build-column-stats` 补建
+
+-- 1. 创建列统计表
+CREATE TABLE IF NOT EXISTS column_stats (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    sheet_id INT NOT NULL,
+    region_index INT NULL COMMENT '表格区域序号(为空表示整个Sheet)',
+    column_index INT NOT NULL COMMENT '列号',
+    header VARCHAR(255) NULL COMMENT '表头',
+    inferred_type VARCHAR(16) NOT NULL COMMENT '推断类型(number/date/boolean/text/mixed/empty)',
+    non_null_count INT NOT NULL DEFAULT 0 COMMENT '非空值个数',
+    null_count INT NOT NULL DEFAULT 0 COMMENT '空值个数',
+    distinct_count INT NOT NULL DEFAULT 0 COMMENT '不同值个数(估计)',
+    min_value VARCHAR(255) NULL COMMENT '最小值',
+    max_value VARCHAR(255) NULL COMMENT '最大值',
+    histogram JSON NULL COMMENT '数值直方图',
+    INDEX idx_column_stats_sheet_region_col (sheet_id, region_index, column_index),
+    CONSTRAINT fk_column_stats_sheet FOREIGN KEY (sheet_id) REFERENCES excel_sheets(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 2. 记录Sheet的表头行和统计生成时间
+ALTER TABLE excel_sheets
+    ADD COLUMN header_row INT NULL COMMENT '表头所在行号(没有表头时为空)' AFTER search_indexed,
+    ADD COLUMN columns_profiled_at DATETIME NULL COMMENT '生成列统计的时间' AFTER header_row;
@@ -0,0 +1,23 @@
+-- 搜索词按用户过滤迁移脚本
+-- 执行前请备份数据库
+-- 搜索词表加上文件所属用户，搜索只在当前用户的数据中按词查找，常见词不再扫描其他用户的搜索词
+
+-- 1. 添加用户列并按文件归属回填（文件内容只在同一用户的文件间共享）
+ALTER TABLE cell_tokens
+    ADD COLUMN user_id INT NULL COMMENT '文件所属用户(文件内容只在同一用户的文件间共享)' AFTER id;
+
+UPDATE cell_tokens t
+    JOIN excel_sheets s ON s.id = t.sheet_id
+    JOIN (SELECT content_id, MIN(user_id) AS user_id FROM excel_files GROUP BY content_id) f
+        ON f.content_id = s.content_id
+SET t.user_id = f.user_id;
+
+-- 没有文件引用的内容搜索不到，删除其搜索词
+DELETE FROM cell_tokens WHERE user_id IS NULL;
+
+ALTER TABLE cell_tokens MODIFY COLUMN user_id INT NOT NULL COMMENT '文件所属用户(文件内容只在同一用户的文件间共享)';
+
+-- 2. 索引以用户开头
+ALTER TABLE cell_tokens
+    ADD INDEX idx_cell_tokens_user_token_cell (user_id, token, sheet_id, row_index, column_index),
+    DROP INDEX idx_cell_tokens_token_cell;
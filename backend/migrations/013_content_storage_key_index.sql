@@ -0,0 +1,5 @@
+-- 内容记录对象键索引迁移脚本
+-- 执行前请备份数据库
+-- 删除文件时按对象键加锁检查外部存储对象是否仍被引用，与同时进行的解析任务互斥，需要该索引避免锁住整张表
+
+CREATE INDEX ix_excel_contents_storage_key ON excel_contents (storage_key);
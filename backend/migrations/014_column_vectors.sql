@@ -0,0 +1,13 @@
+-- 分组统计列式副本迁移脚本
+-- 执行前请备份数据库
+-- 列式副本在首次统计该列时生成，已有文件不需要补建；大 Sheet 可以用 python -m app.cli build-column-vectors 预先生成
+
+CREATE TABLE IF NOT EXISTS column_vectors (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    sheet_id INT NOT NULL,
+    column_index INT NOT NULL COMMENT '列号',
+    vector_data LONGBLOB NOT NULL COMMENT '压缩后的列式数据',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '生成时间',
+    UNIQUE INDEX idx_column_vectors_sheet_col (sheet_id, column_index),
+    CONSTRAINT fk_column_vectors_sheet FOREIGN KEY (sheet_id) REFERENCES excel_sheets(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,111 @@
+"""测试公共设置：使用临时目录中的 SQLite 数据库和本地文件存储
+
+配置在导入 app 之前通过环境变量设置；解析任务在当前进程中同步执行，不启动进程池
+"""
+import io
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+_TMP_DIR = tempfile.mkdtemp(prefix="excel-manager-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_TMP_DIR, "test.db")
+os.environ["BLOB_STORE"] = "local"
+os.environ["BLOB_STORE_PATH"] = os.path.join(_TMP_DIR, "blobs")
+
+from sqlalchemy import BigInteger, event  # noqa: E402
+from sqlalchemy.ext.compiler import compiles  # noqa: E402
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_big_integer(type_, compiler, **kw):
+    # SQLite 只有 INTEGER 主键才会自增
+    return "INTEGER"
+
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import auth, crud, ingest  # noqa: E402
+from app.blobstore import get_blob_store  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.parser import iter_workbook  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def user(db):
+    username = f"user{datetime.now().timestamp():.6f}".replace(".", "")
+    return crud.create_user(db, username, f"{username}@example.com", auth.hash_password("secret1"))
+
+
+@pytest.fixture
+def client(db, user):
+    session_id = auth.create_session_id()
+    crud.create_session(db, session_id, user.id, datetime.now() + timedelta(hours=1))
+    test_client = TestClient(app)
+    test_client.headers["Authorization"] = f"Bearer {session_id}"
+    return test_client
+
+
+def _sample_workbook() -> bytes:
+    """两列数据、一个合并单元格和一张图片"""
+    import openpyxl
+    from openpyxl.drawing.image import Image as SheetImage
+    from PIL import Image
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["名称", "数量"])
+    for i in range(30):
+        sheet.append([f"item{i}", i])
+    sheet.merge_cells("A2:A3")
+    picture = io.BytesIO()
+    Image.new("RGB", (8, 8), "red").save(picture, format="PNG")
+    picture.seek(0)
+    sheet.add_image(SheetImage(picture), "D2")
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+@pytest.fixture
+def uploaded_file(db, user, tmp_path):
+    """按解析任务的流程入库一个文件
+
+    SQLite 只允许一个写事务，解析任务的进度会话在文件事务进行中无法提交，
+    因此这里直接调用 run_ingest_job 使用的解析和入库函数
+    """
+    data = _sample_workbook()
+    path = tmp_path / "sample.xlsx"
+    path.write_bytes(data)
+    content_hash = f"hash{user.id}"
+    sheets = ingest._checked_parse(iter_workbook(str(path), ".xlsx", workers=1))
+    db_file, _ = ingest.save_parsed_workbook(db, "sample.xlsx", len(data), content_hash, user.id, sheets)
+    get_blob_store().put_file(content_hash, str(path))
+    db.commit()
+    return db_file
+
+
+@pytest.fixture
+def statements():
+    """记录执行的 SQL 语句"""
+    recorded = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        recorded.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield recorded
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,77 @@
+"""分组统计在两种存储方式下结果相同"""
+import io
+from datetime import datetime
+
+import openpyxl
+import pytest
+
+from app import ingest
+from app.parser import iter_workbook
+
+KEYS = ["abc", "ABC", "Abc", "abc ", None, "北京"]
+
+QUERIES = [
+    {"group_by": [0], "agg": ["count", "count:1", "sum:1", "avg:1", "min:1", "max:1", "min:2", "max:2", "count:3"]},
+    {"group_by": [0, 3], "agg": ["count", "sum:1", "max:2"]},
+    {"group_by": [3], "agg": ["count", "min:0", "max:0"]},
+    {"group_by": [0], "agg": ["count", "sum:1"], "filter": ["0:eq:abc"]},
+    {"group_by": [0], "agg": ["count", "sum:1"], "filter": ["0:contains:B"]},
+    {"group_by": [0], "agg": ["count", "avg:1"], "filter": ["1:gt:10", "1:ne:15"]},
+    {"group_by": [0], "agg": ["count"], "filter": ["2:ge:2024-01-10"]},
+    {"group_by": [0], "agg": ["count"], "filter": ["3:eq:true"]},
+    {"group_by": [3], "agg": ["count"], "filter": ["0:empty"]},
+    {"group_by": [0], "agg": ["count"], "filter": ["0:gt:Abc"]},
+]
+
+
+def _workbook() -> bytes:
+    """分组键只有大小写或空格不同；金额中有文本，标记列为布尔值"""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["键", "金额", "日期", "标记"])
+    for i in range(60):
+        amount = "缺失" if i % 7 == 0 else (i * 1.5 if i % 2 else i)
+        sheet.append([KEYS[i % len(KEYS)], amount, datetime(2024, 1, 1 + i % 28, i % 24), i % 3 == 0])
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+def _ingest(db, user, path, size, mode, monkeypatch):
+    monkeypatch.setattr(ingest, "CELL_STORAGE_MODE", mode)
+    sheets = ingest._checked_parse(iter_workbook(str(path), ".xlsx", workers=1))
+    db_file, _ = ingest.save_parsed_workbook(db, f"{mode}.xlsx", size, f"aggregate-{mode}{user.id}", user.id, sheets)
+    db.commit()
+    return db_file.content.sheets[0]
+
+
+@pytest.fixture
+def sheets(db, user, tmp_path, monkeypatch):
+    data = _workbook()
+    path = tmp_path / "aggregate.xlsx"
+    path.write_bytes(data)
+    cells = _ingest(db, user, path, len(data), "cells", monkeypatch)
+    blocks = _ingest(db, user, path, len(data), "blocks", monkeypatch)
+    assert (cells.storage_mode, blocks.storage_mode) == ("cells", "blocks")
+    return cells.id, blocks.id
+
+
+def _aggregate(client, sheet_id, query):
+    response = client.get(f"/api/sheets/{sheet_id}/aggregate", params=query)
+    assert response.status_code == 200, response.text
+    return response.json()["groups"]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_same_result_in_both_storage_modes(client, sheets, query):
+    cells_id, blocks_id = sheets
+    groups = _aggregate(client, cells_id, query)
+    assert groups
+    assert _aggregate(client, blocks_id, query) == groups
+
+
+def test_group_keys_case_sensitive(client, sheets):
+    for sheet_id in sheets:
+        groups = _aggregate(client, sheet_id, {"group_by": 0, "agg": ["count", "count:3"]})
+        assert [group["keys"][0] for group in groups] == ["ABC", "Abc", "abc", "abc ", "北京", None]
+        assert [group["values"] for group in groups] == [[10, 10]] * 6
@@ -0,0 +1,69 @@
+"""元信息、数据和图片权限检查接口不读取原始文件和图片数据列"""
+import re
+
+import pytest
+
+from app.cache import sheet_index_cache, sheet_meta_cache
+
+BLOB_COLUMNS = re.compile(r"\b(file_data|image_data|thumb_data)\b")
+
+
+def _blob_statements(statements):
+    return [statement for statement in statements if BLOB_COLUMNS.search(statement)]
+
+
+def _first_sheet_and_image(client, file_id):
+    sheet_id = client.get(f"/api/files/{file_id}").json()["sheets"][0]["id"]
+    images = client.get(f"/api/sheets/{sheet_id}/meta").json()["images"]
+    return sheet_id, images[0]["id"]
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    # 元信息缓存命中时不查询数据库，测试需要走完整的查询路径
+    sheet_meta_cache.clear()
+    sheet_index_cache.clear()
+
+
+def test_file_list(client, uploaded_file, statements):
+    response = client.get("/api/files")
+    assert response.status_code == 200
+    assert response.json()["total"] >= 1
+    assert statements
+    assert _blob_statements(statements) == []
+
+
+def test_file_detail(client, uploaded_file, statements):
+    response = client.get(f"/api/files/{uploaded_file.id}")
+    assert response.status_code == 200
+    assert statements
+    assert _blob_statements(statements) == []
+
+
+@pytest.mark.parametrize("path", [
+    "/api/files/{file_id}/sheets/{sheet_id}/data",
+    "/api/sheets/{sheet_id}/cells",
+    "/api/sheets/{sheet_id}/meta",
+])
+def test_sheet_data(client, uploaded_file, statements, path):
+    sheet_id, _ = _first_sheet_and_image(client, uploaded_file.id)
+    sheet_meta_cache.clear()
+    sheet_index_cache.clear()
+    statements.clear()
+    response = client.get(path.format(file_id=uploaded_file.id, sheet_id=sheet_id), params={"page": 2, "page_size": 10})
+    assert response.status_code == 200
+    assert statements
+    assert _blob_statements(statements) == []
+
+
+@pytest.mark.parametrize("suffix", ["", "/thumb"])
+def test_image_authorization(client, uploaded_file, statements, suffix):
+    _, image_id = _first_sheet_and_image(client, uploaded_file.id)
+    url = f"/api/images/{image_id}{suffix}"
+    etag = client.get(url).headers["etag"]
+    statements.clear()
+    # 浏览器已缓存图片时只做权限检查，不读取图片数据
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert statements
+    assert _blob_statements(statements) == []
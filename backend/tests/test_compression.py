@@ -0,0 +1,42 @@
+"""响应压缩：可压缩类型的响应都带 Vary: Accept-Encoding"""
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from app.compression import CompressionMiddleware
+
+
+def _app() -> Starlette:
+    routes = [
+        Route("/large", lambda request: JSONResponse({"data": "x" * 2000})),
+        Route("/small", lambda request: JSONResponse({"data": "x"})),
+        Route("/image", lambda request: Response(b"x" * 2000, media_type="image/png")),
+    ]
+    app = Starlette(routes=routes)
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, encodings=["gzip"])
+    return app
+
+
+@pytest.fixture
+def client():
+    return TestClient(_app())
+
+
+@pytest.mark.parametrize("path", ["/large", "/small"])
+@pytest.mark.parametrize("accept_encoding", ["gzip", "identity"])
+def test_vary_on_compressible_responses(client, path, accept_encoding):
+    response = client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+    assert response.status_code == 200
+    assert response.headers["Vary"] == "Accept-Encoding"
+    compressed = path == "/large" and accept_encoding == "gzip"
+    assert response.headers.get("Content-Encoding") == ("gzip" if compressed else None)
+
+
+def test_no_vary_on_other_types(client):
+    response = client.get("/image", headers={"Accept-Encoding": "gzip"})
+
+    assert "Vary" not in response.headers
+    assert "Content-Encoding" not in response.headers
@@ -0,0 +1,30 @@
+"""重建列统计后表头可能变化，依赖表头的接口必须重新验证"""
+from datetime import datetime
+
+import pytest
+
+from app.http_cache import REVALIDATE_CACHE_CONTROL
+
+PATHS = ["/api/sheets/{sheet_id}/meta", "/api/sheets/{sheet_id}/cells", "/api/files/{file_id}/sheets/{sheet_id}/data"]
+
+
+@pytest.fixture
+def sheet(db, uploaded_file):
+    return uploaded_file.content.sheets[0]
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_etag_changes_after_reprofiling(client, db, uploaded_file, sheet, path):
+    url = path.format(file_id=uploaded_file.id, sheet_id=sheet.id)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == REVALIDATE_CACHE_CONTROL
+    etag = response.headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    sheet.columns_profiled_at = datetime(2030, 1, 1)
+    db.commit()
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
@@ -0,0 +1,57 @@
+"""解析任务的状态变化"""
+import io
+
+import openpyxl
+import pytest
+
+from app import crud, ingest, models
+from app.database import SessionLocal
+
+
+def _workbook(sheet_count: int) -> bytes:
+    workbook = openpyxl.Workbook()
+    for i in range(sheet_count):
+        sheet = workbook.active if i == 0 else workbook.create_sheet()
+        sheet.title = f"S{i}"
+        sheet.append(["名称", "数量"])
+        sheet.append([f"item{i}", i])
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+@pytest.fixture
+def recorded_updates(monkeypatch):
+    """记录任务状态更新；写入过程中的进度只记录不提交（SQLite 同时只允许一个写事务）"""
+    updates = []
+    update_ingest_job = crud.update_ingest_job
+
+    def record(db, job_id, **fields):
+        with SessionLocal() as reader:
+            job = crud.get_ingest_job(reader, job_id)
+            committed = reader.query(models.ExcelFile).filter_by(user_id=job.user_id).count() > 0
+        updates.append((fields, committed))
+        if fields.get("status") in ("done", "failed"):
+            update_ingest_job(db, job_id, **fields)
+
+    monkeypatch.setattr(ingest.crud, "update_ingest_job", record)
+    return updates
+
+
+def test_status_order(db, user, tmp_path, recorded_updates):
+    data = _workbook(2)
+    spool_path = tmp_path / "upload.xlsx"
+    spool_path.write_bytes(data)
+    job = crud.create_ingest_job(db, user.id, "book.xlsx", len(data), str(spool_path), content_hash=f"status{user.id}")
+
+    ingest.run_ingest_job(job.id)
+
+    statuses = [fields.get("status") for fields, _ in recorded_updates]
+    assert statuses == ["parsing", "inserting", "inserting", "done"]
+    # 写入阶段从第一个Sheet开始，文件事务提交后才标记完成
+    assert [fields["current_sheet"] for fields, _ in recorded_updates[1:3]] == [1, 2]
+    assert [committed for _, committed in recorded_updates] == [False, False, False, True]
+    db.refresh(job)
+    assert job.status == "done"
+    assert job.sheet_count == 2
+    assert job.file_id is not None
@@ -0,0 +1,59 @@
+"""按Sheet并行解析"""
+import openpyxl
+import pytest
+
+from app import ingest
+from app.parser import _materialize, _sheet_sizes, iter_sheets_parallel, parse_xlsx
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    """第 2 个Sheet远大于其他Sheet"""
+    workbook = openpyxl.Workbook()
+    for i, rows in enumerate((5, 2000, 5, 5)):
+        sheet = workbook.active if i == 0 else workbook.create_sheet()
+        sheet.title = f"S{i}"
+        for row in range(rows):
+            sheet.append([f"s{i}r{row}", row, row * 0.5])
+    sheet.merge_cells("A1:B2")
+    path = tmp_path / "sheets.xlsx"
+    workbook.save(path)
+    return str(path)
+
+
+def _parse_parallel(path, max_sheet_bytes):
+    sheets, streamed = [], []
+    for sheet_info in iter_sheets_parallel(path, ".xlsx", 2, max_sheet_bytes=max_sheet_bytes):
+        # 子进程的结果已展开为列表，当前进程流式解析的Sheet为生成器
+        streamed.append(not isinstance(sheet_info["cells"], list))
+        sheets.append(_materialize(sheet_info))
+    return sheets, streamed
+
+
+def test_large_sheet_streamed_in_current_process(workbook_path):
+    sizes = _sheet_sizes(workbook_path, ".xlsx")
+    assert sizes[1] > max(sizes[0], sizes[2], sizes[3])
+
+    sheets, streamed = _parse_parallel(workbook_path, sizes[1] - 1)
+
+    assert streamed == [False, True, False, False]
+    assert sheets == parse_xlsx(workbook_path)
+
+
+def test_all_sheets_large(workbook_path):
+    sheets, streamed = _parse_parallel(workbook_path, 0)
+
+    assert streamed == [True, True, True, True]
+    assert sheets == parse_xlsx(workbook_path)
+
+
+@pytest.mark.parametrize("parse_workers, ingest_workers, cpu_count, expected", [
+    (4, 2, 16, 4),
+    (8, 2, 8, 4),
+    (4, 4, 4, 1),
+    (4, 0, 2, 2),
+    (1, 1, 16, 1),
+])
+def test_job_parse_workers_capped_by_cpu_share(parse_workers, ingest_workers, cpu_count, expected):
+    """解析任务嵌套启动的进程池按 CPU 核数平均分给 INGEST_WORKERS 个任务"""
+    assert ingest.job_parse_workers(parse_workers, ingest_workers, cpu_count) == expected
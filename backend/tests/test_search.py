@@ -0,0 +1,71 @@
+"""全文搜索：候选按键集分批读取，按原值排除拆分带来的误匹配"""
+import io
+
+import openpyxl
+import pytest
+
+from app import crud, ingest
+from app.parser import iter_workbook
+from app.routers import search as search_router
+
+
+def _workbook() -> bytes:
+    """第一列交替为匹配的值和只在索引中匹配的值（同时包含 销售、售额 两个词，但不包含 销售额）"""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for i in range(20):
+        sheet.append([f"销售额{i}" if i % 3 == 0 else "销售 售额", i])
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+@pytest.fixture
+def file_ids(db, user, tmp_path):
+    data = _workbook()
+    path = tmp_path / "search.xlsx"
+    path.write_bytes(data)
+    ids = []
+    for i in range(2):
+        sheets = ingest._checked_parse(iter_workbook(str(path), ".xlsx", workers=1))
+        db_file, _ = ingest.save_parsed_workbook(db, f"search{i}.xlsx", len(data), f"search{i}-{user.id}", user.id, sheets)
+        db.commit()
+        ingest._index_file(db, db_file)
+        ids.append(db_file.id)
+    return ids
+
+
+def test_search_in_batches(client, file_ids, monkeypatch):
+    monkeypatch.setattr(search_router, "CANDIDATE_FACTOR", 1)
+    batches = []
+    original = crud.search_cells
+
+    def search_cells(*args, **kwargs):
+        candidates = original(*args, **kwargs)
+        # 下一批从上一批最后一个候选之后读取，不用 OFFSET 重新跳过已读过的候选
+        assert kwargs["after"] == (batches[-1][-1] if batches else None)
+        batches.append([(hit.file_id, hit.sheet_id, hit.row_index, hit.column_index) for hit in candidates])
+        return candidates
+
+    monkeypatch.setattr(crud, "search_cells", search_cells)
+    expected = [(file_id, row) for file_id in reversed(file_ids) for row in range(0, 20, 3)]
+
+    response = client.get("/api/search", params={"q": "销售额", "limit": len(expected)})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [(item["file_id"], item["row_index"]) for item in body["items"]] == expected
+    assert [item["snippet"] for item in body["items"][:2]] == ["销售额0", "销售额3"]
+    assert body["truncated"] is False
+    # 每批从上一批最后一个候选之后开始，每个候选只读取一次
+    read = [candidate for batch in batches for candidate in batch]
+    assert len(batches) > 2
+    assert read == sorted(set(read), key=lambda c: (-c[0], c[1], c[2], c[3]))
+
+
+def test_search_truncated(client, file_ids):
+    response = client.get("/api/search", params={"q": "销售额", "limit": 3})
+
+    body = response.json()
+    assert [(item["file_id"], item["row_index"]) for item in body["items"]] == [(file_ids[1], row) for row in (0, 3, 6)]
+    assert body["truncated"] is True
@@ -0,0 +1,37 @@
+"""Sheet对象空间索引的窗口查询"""
+from app.spatial import SheetObjectIndex
+
+
+def _index():
+    merged_cells = [{"start_row": 10, "start_col": 0, "end_row": 12, "end_col": 3}]
+    # 图片覆盖 10 列（640 像素）、10 行（200 像素）；图表没有尺寸
+    images = [{"id": 1, "anchor_row": 0, "anchor_col": 0, "width": 640, "height": 200}]
+    charts = [{"id": 2, "anchor_row": 30, "anchor_col": 5, "width": None, "height": None}]
+    return SheetObjectIndex(merged_cells, images, charts)
+
+
+def test_object_with_anchor_outside_window():
+    index = _index()
+
+    found = index.window(5, 9, 3, 7)
+
+    assert [img["id"] for img in found["images"]] == [1]
+    assert found["merged_cells"] == []
+
+
+def test_object_extent():
+    index = _index()
+
+    # 紧邻图片右下角之外的窗口
+    assert index.window(11, 20, 0, 20)["images"] == []
+    assert index.window(0, 20, 11, 20)["images"] == []
+    # 合并范围的最后一列
+    assert len(index.window(12, 13, 3, 4)["merged_cells"]) == 1
+
+
+def test_object_without_size_at_anchor():
+    index = _index()
+
+    assert [chart["id"] for chart in index.window(30, 31, 5, 6)["charts"]] == [2]
+    assert index.window(31, 40, 0, 20)["charts"] == []
+    assert index.window(0, 40, 6, 20)["charts"] == []
@@ -0,0 +1,31 @@
+"""上传文件超出大小限制时返回 413"""
+import pytest
+
+from app import uploads
+
+LIMIT = 1024
+
+
+@pytest.fixture(autouse=True)
+def small_limit(monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_FILE_SIZE", LIMIT)
+
+
+def _post(client, size, **kwargs):
+    return client.post("/api/upload", files={"file": ("big.xlsx", b"x" * size)}, **kwargs)
+
+
+def test_rejected_by_content_length(client):
+    response = _post(client, LIMIT + uploads.MULTIPART_OVERHEAD + 1)
+
+    assert response.status_code == 413
+
+
+def test_rejected_while_streaming(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_SPOOL_DIR", str(tmp_path))
+
+    # Content-Length 在允许的 multipart 开销以内，接收到超出限制的数据时拒绝
+    response = _post(client, LIMIT + 1)
+
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []
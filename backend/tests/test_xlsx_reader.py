@@ -0,0 +1,185 @@
+"""原生 .xlsx 读取与 openpyxl 的解析结果一致"""
+import os
+import subprocess
+import sys
+import zipfile
+from datetime import datetime
+
+import openpyxl
+import pytest
+
+from app.parser import parse_xlsx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/worksheets/sheet2.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>
+</Types>"""
+
+_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+ xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets>
+<sheet name="数据" sheetId="1" r:id="rId1"/>
+<sheet name="稀疏" sheetId="2" r:id="rId2"/>
+</sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet2.xml"/>
+<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+<Relationship Id="rId4" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>
+</Relationships>"""
+
+# 样式 1: 内置日期格式 14；样式 2: 自定义日期时间格式；样式 3: 两位小数
+_STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm"/></numFmts>
+<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="1"><fill><patternFill patternType="none"/></fill></fills>
+<borders count="1"><border/></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="4">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="2" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+</cellXfs>
+</styleSheet>"""
+
+# 第 3 个共享字符串为富文本，多段文本需要拼接
+_SHARED_STRINGS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="5" uniqueCount="5">
+<si><t>名称</t></si>
+<si><t>日期</t></si>
+<si><r><rPr><b/></rPr><t>富</t></r><r><t xml:space="preserve">文本 </t></r></si>
+<si><t>合并标题</t></si>
+<si><t xml:space="preserve">  前后空格  </t></si>
+</sst>"""
+
+_SHEET1 = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<dimension ref="A1:E6"/>
+<sheetData>
+<row r="1"><c r="A1" t="s"><v>3</v></c></row>
+<row r="2">
+<c r="A2" t="s"><v>0</v></c><c r="B2" t="s"><v>1</v></c><c r="C2" t="inlineStr"><is><t>内联</t></is></c>
+<c r="D2" t="inlineStr"><is><r><t>内联</t></r><r><t>富文本</t></r></is></c>
+</row>
+<row r="3">
+<c r="A3" t="s"><v>2</v></c><c r="B3" s="1"><v>45292</v></c><c r="C3" t="b"><v>1</v></c>
+<c r="D3"><v>42</v></c><c r="E3" s="3"><v>3.5</v></c>
+</row>
+<row r="4">
+<c r="A4" t="s"><v>4</v></c><c r="B4" s="2"><v>45292.5</v></c><c r="C4" t="b"><v>0</v></c>
+<c r="D4"><v>-0.125</v></c><c r="E4" t="str"><f>"公式"&amp;"文本"</f><v>公式文本</v></c>
+</row>
+<row r="6"><c r="A6"><v>1E+20</v></c><c r="C6" t="inlineStr"><is><t></t></is></c><c r="E6"><f>D3*2</f><v>84</v></c></row>
+</sheetData>
+<mergeCells count="2"><mergeCell ref="A1:E1"/><mergeCell ref="B5:C6"/></mergeCells>
+</worksheet>"""
+
+# 只有少数单元格、没有 dimension 的稀疏Sheet，最后一行省略行号和单元格引用
+_SHEET2 = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<sheetData>
+<row r="2"><c r="B2" t="s"><v>0</v></c></row>
+<row r="7"><c r="D7"><v>7</v></c><c r="H7" t="b"><v>1</v></c></row>
+<row r="9" spans="1:1"/>
+<row r="12"><c r="A12" s="1"><v>1</v></c></row>
+<row><c t="s"><v>1</v></c><c/><c><v>5</v></c></row>
+</sheetData>
+</worksheet>"""
+
+
+@pytest.fixture
+def handmade_xlsx(tmp_path):
+    """手写 XML 的工作簿，覆盖共享字符串、内联字符串、日期、布尔值、合并单元格和稀疏行"""
+    path = tmp_path / "handmade.xlsx"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("xl/workbook.xml", _WORKBOOK)
+        archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        archive.writestr("xl/styles.xml", _STYLES)
+        archive.writestr("xl/sharedStrings.xml", _SHARED_STRINGS)
+        archive.writestr("xl/worksheets/sheet1.xml", _SHEET1)
+        archive.writestr("xl/worksheets/sheet2.xml", _SHEET2)
+    return str(path)
+
+
+@pytest.fixture
+def openpyxl_xlsx(tmp_path):
+    """openpyxl 生成的工作簿（openpyxl 把字符串写为内联字符串）"""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Sheet1"
+    sheet.append(["名称", "数量", "日期", "启用"])
+    sheet.append(["甲", 1, datetime(2024, 1, 2), True])
+    sheet.append(["乙", 2.25, datetime(2024, 3, 4, 5, 6, 7), False])
+    sheet["F10"] = "远处的单元格"
+    sheet["B20"] = 0
+    sheet.merge_cells("A5:C6")
+    sheet["A5"] = "合并"
+    empty = workbook.create_sheet("空Sheet")
+    empty["A1"] = None
+    path = tmp_path / "generated.xlsx"
+    workbook.save(path)
+    return str(path)
+
+
+def _assert_same(file_path):
+    native = parse_xlsx(file_path, engine="native")
+    fallback = parse_xlsx(file_path, engine="openpyxl")
+    assert [sheet["name"] for sheet in native] == [sheet["name"] for sheet in fallback]
+    for native_sheet, fallback_sheet in zip(native, fallback):
+        assert native_sheet.keys() == fallback_sheet.keys()
+        for key in fallback_sheet:
+            assert native_sheet[key] == fallback_sheet[key], f"Sheet {fallback_sheet['name']}: {key}"
+    return native
+
+
+def test_handmade_workbook(handmade_xlsx):
+    sheets = _assert_same(handmade_xlsx)
+    cells = {(row, column): value for row, column, value in sheets[0]["cells"]}
+    assert cells[(0, 0)] == "合并标题"
+    assert cells[(2, 0)] == "富文本 "
+    assert cells[(1, 3)] == "内联富文本"
+    assert cells[(2, 1)] == datetime(2024, 1, 1)
+    assert cells[(2, 2)] is True
+    assert sheets[0]["merged_cells"] == [(0, 0, 0, 4), (4, 1, 5, 2)]
+    assert sheets[1]["row_count"] == 13
+
+
+def test_openpyxl_workbook(openpyxl_xlsx):
+    sheets = _assert_same(openpyxl_xlsx)
+    assert sheets[0]["merged_cells"]
+
+
+def test_unknown_engine_rejected(tmp_path):
+    with pytest.raises(ValueError, match="bogus"):
+        parse_xlsx(str(tmp_path / "missing.xlsx"), engine="bogus")
+
+
+def test_unknown_engine_fails_at_startup():
+    """XLSX_ENGINE 配置错误时导入解析模块即失败，不静默改用 native"""
+    env = {**os.environ, "XLSX_ENGINE": "bogus"}
+    result = subprocess.run(
+        [sys.executable, "-c", "import app.parser"], cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    assert result.returncode != 0
+    assert "ValueError" in result.stderr and "bogus" in result.stderr
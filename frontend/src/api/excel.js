@@ -1,4 +1,5 @@
 import axios from 'axios'
+import { decode as decodeMsgpack } from '@msgpack/msgpack'
 import { ElMessage } from 'element-plus'
 
 const api = axios.create({
@@ -58,6 +59,23 @@ export const uploadFile = (file, onProgress) => {
   })
 }
 
+// 查询解析任务状态
+export const getJob = (jobId) => {
+  return api.get(`/jobs/${jobId}`)
+}
+
+// 轮询解析任务直到完成或失败
+export const waitForJob = async (jobId, onStatus, interval = 1000) => {
+  for (;;) {
+    const { data } = await getJob(jobId)
+    if (onStatus) onStatus(data)
+    if (data.status === 'done' || data.status === 'failed') {
+      return data
+    }
+    await new Promise(resolve => setTimeout(resolve, interval))
+  }
+}
+
 // 获取文件列表
 export const getFiles = (skip = 0, limit = 20) => {
   return api.get('/files', { params: { skip, limit } })
@@ -68,18 +86,174 @@ export const getFileDetail = (fileId) => {
   return api.get(`/files/${fileId}`)
 }
 
-// 获取Sheet数据
-export const getSheetData = (fileId, sheetId, page = 1, pageSize = 50) => {
-  return api.get(`/files/${fileId}/sheets/${sheetId}/data`, {
-    params: { page, page_size: pageSize }
+// Sheet数据的传输格式，与后端 app/wire.py 保持一致
+const COLUMNAR_JSON = 'application/vnd.excel.columnar+json'
+const MSGPACK = 'application/x-msgpack'
+
+// 列式稀疏格式还原为二维数组：columns 为 [[列号, [行偏移...], [值...]], ...]，
+// 与默认 JSON 格式一致，只保留有数据的行，每行只包含 [col_start, col_end] 列，空单元格补 ''
+// 排序或筛选时响应带有 row_indexes，行偏移为行在 row_indexes 中的位置，按该顺序输出
+export const expandColumnar = (payload) => {
+  const { columns, ...rest } = payload
+  const colStart = payload.col_start ?? 0
+  const width = (payload.col_end ?? payload.total_columns - 1) - colStart + 1
+  const rows = new Map()
+  for (const [col, offsets, values] of columns) {
+    for (let i = 0; i < offsets.length; i++) {
+      let row = rows.get(offsets[i])
+      if (!row) {
+        row = new Array(width).fill('')
+        rows.set(offsets[i], row)
+      }
+      row[col - colStart] = values[i]
+    }
+  }
+  if (payload.row_indexes) {
+    const emptyRow = () => new Array(width).fill('')
+    return {
+      ...rest,
+      data: payload.row_indexes.map((_, position) => rows.get(position) || emptyRow())
+    }
+  }
+  const offsets = [...rows.keys()].sort((a, b) => a - b)
+  return {
+    ...rest,
+    row_indexes: offsets.map(offset => payload.row_start + offset),
+    data: offsets.map(offset => rows.get(offset))
+  }
+}
+
+// 按响应的 Content-Type 解码 MessagePack / 列式 JSON / 默认 JSON
+const decodeSheetData = (buffer, contentType = '') => {
+  if (contentType.includes('msgpack')) {
+    return expandColumnar(decodeMsgpack(new Uint8Array(buffer)))
+  }
+  const payload = JSON.parse(new TextDecoder().decode(buffer))
+  return contentType.startsWith(COLUMNAR_JSON) ? expandColumnar(payload) : payload
+}
+
+// 请求单元格数据，优先使用 MessagePack，response.data 始终为默认格式的结构
+const getCompactSheetData = (url, params) => {
+  return api.get(url, {
+    params,
+    // 数组参数（filter）按 filter=a&filter=b 发送
+    paramsSerializer: { indexes: null },
+    headers: { Accept: `${MSGPACK}, ${COLUMNAR_JSON};q=0.9, application/json;q=0.8` },
+    responseType: 'arraybuffer'
+  }).then(response => {
+    response.data = decodeSheetData(response.data, response.headers['content-type'])
+    return response
+  })
+}
+
+// 行列窗口和表格区域参数：{ rowStart, rowEnd, colStart, colEnd, regionId }，行列号从0开始，结束位置包含在内
+const viewportParams = ({ rowStart, rowEnd, colStart, colEnd, regionId } = {}) => {
+  const params = { row_start: rowStart, row_end: rowEnd, col_start: colStart, col_end: colEnd, region_id: regionId }
+  return Object.fromEntries(Object.entries(params).filter(([, value]) => value !== undefined && value !== null))
+}
+
+// 获取Sheet数据（含元信息）
+export const getSheetData = (fileId, sheetId, page = 1, pageSize = 50, viewport = {}) => {
+  return getCompactSheetData(`/files/${fileId}/sheets/${sheetId}/data`, {
+    page, page_size: pageSize, ...viewportParams(viewport)
   })
 }
 
+// 获取Sheet元信息（表头、合并单元格、图片、图表、表格区域），上传后不再变化，浏览器会缓存
+export const getSheetMeta = (sheetId) => {
+  return api.get(`/sheets/${sheetId}/meta`)
+}
+
+// 排序和筛选参数：{ sortBy, sortDir, filters }，filters 为 ['列号:操作[:值]', ...]，只能与 page 分页一起使用
+const queryParams = ({ sortBy, sortDir, filters } = {}) => {
+  const params = {}
+  if (sortBy !== undefined && sortBy !== null) {
+    params.sort_by = sortBy
+    params.sort_dir = sortDir || 'asc'
+  }
+  if (filters && filters.length > 0) params.filter = filters
+  return params
+}
+
+// 获取各列的统计（推断类型、空值数、不同值个数、最小/最大值、直方图）和识别出的表头行
+export const getSheetColumns = (sheetId, regionId) => {
+  return api.get(`/sheets/${sheetId}/columns`, { params: regionId ? { region_id: regionId } : {} })
+}
+
+// 分组统计：groupBy 为分组列号数组，aggregates 为 ['sum:3', 'count', ...]，options 为 { regionId, filters, limit }
+export const aggregateSheet = (sheetId, groupBy, aggregates = [], { regionId, filters, limit } = {}) => {
+  const params = { group_by: groupBy, agg: aggregates }
+  if (regionId) params.region_id = regionId
+  if (filters && filters.length > 0) params.filter = filters
+  if (limit) params.limit = limit
+  return api.get(`/sheets/${sheetId}/aggregate`, { params, paramsSerializer: { indexes: null } })
+}
+
+// 获取Sheet单元格数据（不含元信息），query 为排序和筛选参数，响应的 matched_rows 为匹配的行数
+export const getSheetCells = (sheetId, page = 1, pageSize = 50, viewport = {}, query = {}) => {
+  return getCompactSheetData(`/sheets/${sheetId}/cells`, {
+    page, page_size: pageSize, ...viewportParams(viewport), ...queryParams(query)
+  })
+}
+
+// 流式读取Sheet的行（NDJSON），每收到一批完整的行调用一次 onRows(rows)
+// rows 为 [{ row, values }]，指定 colStart/colEnd/regionId 时 values 只包含对应的列，可通过 signal 中止
+export const streamSheetRows = async (fileId, sheetId, {
+  startRow = 0, limit, colStart, colEnd, regionId, onRows, signal
+} = {}) => {
+  const params = new URLSearchParams({ start_row: startRow })
+  if (limit) params.set('limit', limit)
+  const { col_start, col_end, region_id } = viewportParams({ colStart, colEnd, regionId })
+  if (col_start !== undefined) params.set('col_start', col_start)
+  if (col_end !== undefined) params.set('col_end', col_end)
+  if (region_id !== undefined) params.set('region_id', region_id)
+  const token = localStorage.getItem('session_token')
+  const response = await fetch(`/api/files/${fileId}/sheets/${sheetId}/rows.ndjson?${params}`, {
+    headers: token ? { Authorization: `Bearer ${token}` } : {},
+    credentials: 'include',
+    signal
+  })
+  if (!response.ok) {
+    throw new Error(`获取数据失败: ${response.status}`)
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let pending = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) break
+    pending += decoder.decode(value, { stream: true })
+    const lines = pending.split('\n')
+    // 最后一段可能是不完整的行，留到下一次
+    pending = lines.pop()
+    if (lines.length > 0) {
+      onRows(lines.map(line => JSON.parse(line)))
+    }
+  }
+  pending += decoder.decode()
+  if (pending.trim()) {
+    onRows([JSON.parse(pending)])
+  }
+}
+
+// 在当前用户的所有文件中搜索单元格，返回 { items: [{ file_id, filename, sheet_id, sheet_name, row_index, column_index, snippet }], truncated }
+export const searchCells = (q, { fileId, limit = 20 } = {}) => {
+  const params = { q, limit }
+  if (fileId) params.file_id = fileId
+  return api.get('/search', { params })
+}
+
 // 获取图片URL
 export const getImageUrl = (imageId) => {
   return `/api/images/${imageId}`
 }
 
+// 获取图片缩略图URL（原图足够小时返回原图）
+export const getThumbnailUrl = (imageId) => {
+  return `/api/images/${imageId}/thumb`
+}
+
 // 下载文件
 export const downloadFile = (fileId, filename) => {
   return api.get(`/files/${fileId}/download`, {